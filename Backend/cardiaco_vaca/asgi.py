@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cardiaco_vaca.settings')
 
 application = get_asgi_application()
+
+# Inicia el buffer de ingesta diferida (y reproduce spools pendientes) si está activo
+from temp_car.utils.bufferIngesta import iniciar_buffer_ingesta  # noqa: E402
+from temp_car.utils.cacheHato import iniciar_cache_hato  # noqa: E402
+
+iniciar_buffer_ingesta()
+iniciar_cache_hato()  # Calienta la caché del estado del hato (/monitor/herd/)
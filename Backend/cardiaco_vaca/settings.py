@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
+import json
 import os
 from django.urls import reverse_lazy
 from pathlib import Path
@@ -56,7 +57,19 @@ SESSION_COOKIE_HTTPONLY = True  # La cookie no es accesible desde JavaScript
 SESSION_COOKIE_SECURE = False  # Cambiar a True en producción (HTTPS)
 SESSION_COOKIE_SAMESITE = 'Lax'  # Protección contra CSRF
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True  # La sesión expira cuando se cierra el navegador
-SESSION_SAVE_EVERY_REQUEST = True  # Guardar sesión en cada request
+# Guardar la sesión en cada request; desactivado: SessionTimeoutMiddleware marca la actividad por ventanas
+SESSION_SAVE_EVERY_REQUEST = os.environ.get('SESSION_SAVE_EVERY_REQUEST', 'False').lower() == 'true'
+SESSION_ACTIVIDAD_GRANULARIDAD = int(os.environ.get('SESSION_ACTIVIDAD_GRANULARIDAD', 60))  # Segundos mínimos entre escrituras de last_activity
+# Motor de sesiones: db (defecto), cached_db, cache (requiere una caché compartida entre workers) o signed_cookies
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('SESSION_BACKEND', 'db')
+
+# Caché de Django; con varios workers y SESSION_BACKEND=cache/cached_db debe ser compartida (Redis, Memcached)
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
 
 #handler404 = 'temp_car.views.error_404_view'
 
@@ -94,6 +107,84 @@ CSRF_TRUSTED_ORIGINS = [
 #API_SLASH
 APPEND_SLASH = False
 
+# Configuración de la API del Arduino
+ARDUINO_API_KEY = os.environ.get('ARDUINO_API_KEY', 'sk_arduino_controlbovino_2024')
+ARDUINO_LOTE_MAXIMO = int(os.environ.get('ARDUINO_LOTE_MAXIMO', 500))  # Lecturas máximas por petición batch
+
+# App móvil: token de rest_framework.authtoken en Authorization: Token <token>
+API_MOVIL_TOKEN_TTL = int(os.environ.get('API_MOVIL_TOKEN_TTL', 300))  # Segundos que un token resuelto queda en la caché del proceso
+API_MOVIL_TOKEN_REVALIDACION = int(os.environ.get('API_MOVIL_TOKEN_REVALIDACION', 5))  # Segundos entre comprobaciones en la base de un token en caché (lo que tarda un logout en notarse en otros workers)
+API_MOVIL_SESION = os.environ.get('API_MOVIL_SESION', 'True').lower() == 'true'  # Acepta también la sesión de Django (versiones de la app sin token); poner en False cuando todas envíen el token
+API_MOVIL_SYNC_MAXIMO = int(os.environ.get('API_MOVIL_SYNC_MAXIMO', 200))  # Controles máximos por petición a /api/movil/sync/
+API_MOVIL_SYNC_DIAS = int(os.environ.get('API_MOVIL_SYNC_DIAS', 2))  # Días atrás aceptados para lecturas controladas sin conexión
+API_MOVIL_CAMBIOS_LIMITE = int(os.environ.get('API_MOVIL_CAMBIOS_LIMITE', 500))  # Filas máximas por secuencia en /api/movil/cambios/
+API_MOVIL_CAMBIOS_MARGEN = int(os.environ.get('API_MOVIL_CAMBIOS_MARGEN', 5))  # Segundos que espera una fila antes de que el cursor de cambios la pase (transacciones que confirman fuera de orden)
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'temp_car.utils.auth_utils.TokenMovilAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+}
+
+# Ingesta de lecturas: 'directo' guarda en la petición, 'diferido' encola y guarda por lotes en segundo plano
+ARDUINO_INGESTA_MODO = os.environ.get('ARDUINO_INGESTA_MODO', 'directo')
+ARDUINO_BUFFER_DIRECTORIO = os.environ.get('ARDUINO_BUFFER_DIRECTORIO', os.path.join(BASE_DIR, 'spool'))
+ARDUINO_BUFFER_CAPACIDAD = int(os.environ.get('ARDUINO_BUFFER_CAPACIDAD', 5000))  # Lecturas pendientes por proceso antes de responder 429
+ARDUINO_BUFFER_LOTE = int(os.environ.get('ARDUINO_BUFFER_LOTE', 200))  # Lecturas por commit
+ARDUINO_BUFFER_INTERVALO = float(os.environ.get('ARDUINO_BUFFER_INTERVALO', 2.0))  # Segundos máximos antes de vaciar
+ARDUINO_BUFFER_FSYNC = os.environ.get('ARDUINO_BUFFER_FSYNC', 'False').lower() == 'true'  # fsync del spool en cada lectura
+
+# Monitoreo en vivo (Server-Sent Events en /monitor/stream/)
+MONITOR_SSE_LATIDO = int(os.environ.get('MONITOR_SSE_LATIDO', 15))  # Segundos entre comentarios keep-alive
+MONITOR_SSE_SINCRONIZACION = int(os.environ.get('MONITOR_SSE_SINCRONIZACION', 5))  # Segundos entre consultas del hilo que trae lo escrito por otros workers (0 = desactivado)
+MONITOR_SSE_DURACION_WSGI = int(os.environ.get('MONITOR_SSE_DURACION_WSGI', 25))  # Bajo WSGI el stream se cierra y el navegador reconecta
+MONITOR_SSE_DURACION_ASGI = int(os.environ.get('MONITOR_SSE_DURACION_ASGI', 1800))  # Duración máxima de una conexión bajo ASGI
+
+# Caché en memoria del estado del hato (/monitor/herd/)
+HATO_CACHE_SINCRONIZACION = float(os.environ.get('HATO_CACHE_SINCRONIZACION', 2))  # Segundos entre consultas de filas nuevas de otros workers
+HATO_CACHE_REFRESCO = int(os.environ.get('HATO_CACHE_REFRESCO', 300))  # Segundos entre recargas completas
+VERSIONES_COLLAR_SINCRONIZACION = float(os.environ.get('VERSIONES_COLLAR_SINCRONIZACION', 2))  # Segundos entre lecturas de cambios de otros workers para los ETag
+
+# Series para gráficas de rangos largos (/monitor/serie/)
+SERIE_PUNTOS_POR_DEFECTO = int(os.environ.get('SERIE_PUNTOS_POR_DEFECTO', 500))  # Puntos por serie tras la reducción LTTB
+SERIE_PUNTOS_MAXIMO = int(os.environ.get('SERIE_PUNTOS_MAXIMO', 5000))  # Tope del parámetro puntos
+SERIE_DIAS_POR_DEFECTO = int(os.environ.get('SERIE_DIAS_POR_DEFECTO', 7))  # Rango cuando no se envían desde/hasta
+
+# Detección de anomalías sobre el historial (comando detectar_anomalias)
+ANOMALIAS_VENTANA_HORAS = int(os.environ.get('ANOMALIAS_VENTANA_HORAS', 6))  # Horas analizadas en cada ejecución
+ANOMALIAS_LINEA_BASE_HORAS = int(os.environ.get('ANOMALIAS_LINEA_BASE_HORAS', 24))  # Historia previa que forma la línea base de cada lectura
+ANOMALIAS_Z_UMBRAL = float(os.environ.get('ANOMALIAS_Z_UMBRAL', 3))  # |z| desde el que una lectura se marca
+ANOMALIAS_EWMA_ALFA = float(os.environ.get('ANOMALIAS_EWMA_ALFA', 0.1))  # Peso de la lectura nueva en la EWMA de temperatura
+ANOMALIAS_FIEBRE_UMBRAL = float(os.environ.get('ANOMALIAS_FIEBRE_UMBRAL', 39.5))  # °C de fiebre para los tramos sostenidos
+ANOMALIAS_FIEBRE_MINUTOS = int(os.environ.get('ANOMALIAS_FIEBRE_MINUTOS', 30))  # Duración mínima de la fiebre sostenida
+
+# Motor de reglas de alertas en la ingesta del Arduino (utils/reglasAlertas.py)
+ALERTAS_ACTIVAS = os.environ.get('ALERTAS_ACTIVAS', 'True').lower() == 'true'
+ALERTAS_REGLAS = os.environ.get('ALERTAS_REGLAS', 'temperatura_extrema,fiebre_sostenida,subida_temperatura,pulsaciones_anormales')  # Reglas evaluadas, separadas por coma
+ALERTAS_VENTANA = int(os.environ.get('ALERTAS_VENTANA', 6))  # Últimas lecturas por collar para las medias de la ventana
+ALERTAS_FIEBRE_UMBRAL = float(os.environ.get('ALERTAS_FIEBRE_UMBRAL', 39.5))  # °C desde los que se cuenta el tiempo con fiebre
+ALERTAS_FIEBRE_MINUTOS = int(os.environ.get('ALERTAS_FIEBRE_MINUTOS', 30))  # Minutos sobre el umbral para la alerta de fiebre sostenida
+ALERTAS_SUBIDA_GRADOS = float(os.environ.get('ALERTAS_SUBIDA_GRADOS', 0.8))  # °C de la media de la ventana sobre la media larga
+ALERTAS_PULSACIONES_MINIMO = int(os.environ.get('ALERTAS_PULSACIONES_MINIMO', 50))  # BPM medios por debajo de los que se alerta
+ALERTAS_PULSACIONES_MAXIMO = int(os.environ.get('ALERTAS_PULSACIONES_MAXIMO', 100))  # BPM medios por encima de los que se alerta
+ALERTAS_SUPRESION_MINUTOS = int(os.environ.get('ALERTAS_SUPRESION_MINUTOS', 30))  # Una alerta cerrada hace menos que esto se reabre en vez de duplicarse
+
+# Reportes PDF generados en segundo plano y guardados en caché en disco
+REPORTES_PDF_DIRECTORIO = os.environ.get('REPORTES_PDF_DIRECTORIO', os.path.join(BASE_DIR, 'cache', 'reportes'))
+REPORTES_PDF_WORKERS = int(os.environ.get('REPORTES_PDF_WORKERS', 2))  # Hilos de xhtml2pdf por proceso
+REPORTES_PDF_TIEMPO_MAXIMO = int(os.environ.get('REPORTES_PDF_TIEMPO_MAXIMO', 600))  # Segundos antes de reencolar un trabajo sin terminar
+REPORTES_PDF_CADUCIDAD_DIAS = int(os.environ.get('REPORTES_PDF_CADUCIDAD_DIAS', 30))  # Días sin descargas antes de borrar un PDF
+
+# Métricas de rendimiento por vista (/metrics) y log de peticiones lentas
+METRICAS_ACTIVAS = os.environ.get('METRICAS_ACTIVAS', 'True').lower() == 'true'
+METRICAS_VENTANA = int(os.environ.get('METRICAS_VENTANA', 1000))  # Peticiones recientes por vista para los percentiles
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')  # Token para el scraper de Prometheus: Authorization: Bearer <token>
+METRICAS_PUBLICAS = os.environ.get('METRICAS_PUBLICAS', 'False').lower() == 'true'  # /metrics sin token ni sesión de staff (solo redes privadas)
+METRICAS_UMBRAL_LENTA_MS = int(os.environ.get('METRICAS_UMBRAL_LENTA_MS', 1000))  # Duración a partir de la cual una petición es lenta
+METRICAS_UMBRAL_CONSULTAS = int(os.environ.get('METRICAS_UMBRAL_CONSULTAS', 50))  # Consultas SQL a partir de las cuales una petición es lenta
+METRICAS_UMBRALES_VISTA = json.loads(os.environ.get('METRICAS_UMBRALES_VISTA', '{}'))  # Umbral en ms por nombre de URL, p. ej. {"generar_pdf": 3000}
+
 #AUTH_USER_MODEL = 'temp_car.CustomUser'
 # Application definition
 
@@ -112,12 +203,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'temp_car.middleware.RequestId.RequestIdMiddleware',  # Id de petición para los logs (debe ir primero)
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'temp_car.middleware.Metricas.MetricasMiddleware',  # Tiempo, consultas y tiempo de BD por vista
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'temp_car.middleware.TokenMovil.TokenMovilMiddleware',  # Token de la app móvil en /api/movil/ (sin sesión)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -267,6 +361,18 @@ DEFAULT_FROM_EMAIL = 'vacauniversidad@gmail.com'  # Reemplaza con tu dirección
 
 LOGS_DIR = os.path.join(BASE_DIR, 'logs')
 os.makedirs(LOGS_DIR, exist_ok=True)
+# Índice persistente de saltos de línea de los logs (conteo incremental del visor)
+LOGS_INDICE_ARCHIVO = os.environ.get('LOGS_INDICE_ARCHIVO', os.path.join(BASE_DIR, 'cache', 'indice_logs.json'))
+# Índice de búsqueda de texto completo de los logs (SQLite FTS5, /logs/search/)
+LOGS_BUSQUEDA_DB = os.environ.get('LOGS_BUSQUEDA_DB', os.path.join(BASE_DIR, 'cache', 'busqueda_logs.sqlite3'))
+LOGS_STREAM_INTERVALO = float(os.environ.get('LOGS_STREAM_INTERVALO', 1))  # Segundos entre consultas del archivo en /logs/stream/
+
+# Escritura de logs en un hilo aparte (QueueHandler/QueueListener), fuera del hilo de la petición
+LOG_COLA_ACTIVA = os.environ.get('LOG_COLA_ACTIVA', 'True').lower() == 'true'
+# Nivel por defecto de los loggers de temp_car (en producción no se emiten los DEBUG)
+LOG_NIVEL_DEFECTO = os.environ.get('LOG_NIVEL_DEFECTO', 'DEBUG' if DEBUG else 'INFO').upper()
+# Niveles por logger, p. ej. {"temp_car.arduino": "WARNING", "temp_car.movil": "DEBUG"}
+LOG_NIVELES = json.loads(os.environ.get('LOG_NIVELES', '{}'))
 
 LOGGING = {
     'version': 1,
@@ -287,8 +393,15 @@ LOGGING = {
             'style': '{',
             'datefmt': '%Y-%m-%d %H:%M:%S',
         },
+        # Una línea JSON por registro, con request_id y los campos de extra={...}
+        'json': {
+            '()': 'temp_car.logging_utils.FormateadorJSON',
+        },
     },
     'filters': {
+        'request_id': {
+            '()': 'temp_car.logging_utils.FiltroRequestId',
+        },
         'require_debug_false': {
             '()': 'django.utils.log.RequireDebugFalse',
         },
@@ -339,6 +452,25 @@ LOGGING = {
             'backupCount': 5,
             'formatter': 'verbose',
         },
+        # Archivo para peticiones lentas (MetricasMiddleware)
+        'slow_file': {
+            'level': 'WARNING',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': os.path.join(LOGS_DIR, 'lentas.log'),
+            'maxBytes': 1024 * 1024 * 10,  # 10MB
+            'backupCount': 5,
+            'formatter': 'verbose',
+        },
+        # Archivo estructurado (JSON lines) de los loggers de temp_car
+        'json_file': {
+            'level': 'DEBUG',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': os.path.join(LOGS_DIR, 'estructurado.log'),
+            'maxBytes': 1024 * 1024 * 10,  # 10MB
+            'backupCount': 5,
+            'formatter': 'json',
+            'filters': ['request_id'],
+        },
         # Archivo para requests HTTP
         'request_file': {
             'level': 'DEBUG',
@@ -358,26 +490,44 @@ LOGGING = {
         },
         # Logger para las aplicaciones personalizadas
         'temp_car': {
-            'handlers': ['console', 'file', 'api_file', 'error_file'],
-            'level': 'DEBUG',
+            'handlers': ['console', 'file', 'api_file', 'json_file', 'error_file'],
+            'level': LOG_NIVEL_DEFECTO,
             'propagate': False,
         },
         # Logger para vistas
         'temp_car.views': {
-            'handlers': ['console', 'api_file', 'error_file'],
-            'level': 'DEBUG',
+            'handlers': ['console', 'api_file', 'json_file', 'error_file'],
+            'level': LOG_NIVEL_DEFECTO,
+            'propagate': False,
+        },
+        # Logger para la ingesta de lecturas de los collares
+        'temp_car.arduino': {
+            'handlers': ['console', 'api_file', 'json_file', 'error_file'],
+            'level': LOG_NIVEL_DEFECTO,
+            'propagate': False,
+        },
+        # Logger para las APIs de la aplicación móvil
+        'temp_car.movil': {
+            'handlers': ['console', 'api_file', 'json_file', 'error_file'],
+            'level': LOG_NIVEL_DEFECTO,
+            'propagate': False,
+        },
+        # Logger para los controles de monitoreo
+        'temp_car.controles': {
+            'handlers': ['console', 'api_file', 'json_file', 'error_file'],
+            'level': LOG_NIVEL_DEFECTO,
             'propagate': False,
         },
         # Logger para modelos
         'temp_car.models': {
             'handlers': ['console', 'file', 'error_file'],
-            'level': 'DEBUG',
+            'level': LOG_NIVEL_DEFECTO,
             'propagate': False,
         },
         # Logger para formularios
         'temp_car.forms': {
             'handlers': ['console', 'file', 'error_file'],
-            'level': 'DEBUG',
+            'level': LOG_NIVEL_DEFECTO,
             'propagate': False,
         },
         # Logger para base de datos
@@ -386,6 +536,12 @@ LOGGING = {
         #    'level': 'DEBUG' if DEBUG else 'INFO',
         #    'propagate': False,
         #},
+        # Logger para peticiones lentas
+        'temp_car.lentas': {
+            'handlers': ['console', 'slow_file'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
         # Logger para requests
         'django.request': {
             'handlers': ['console', 'request_file', 'error_file'],
@@ -400,6 +556,14 @@ LOGGING = {
         },
     },
 }
+
+# Niveles configurados por logger desde el entorno
+for _nombre, _nivel in LOG_NIVELES.items():
+    LOGGING['loggers'].setdefault(_nombre, {
+        'handlers': ['console', 'file', 'json_file', 'error_file'],
+        'propagate': False,
+    })['level'] = str(_nivel).upper()
+
 # Configuraciones de seguridad para producción
 if not DEBUG:
     SECURE_BROWSER_XSS_FILTER = True
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cardiaco_vaca.settings')
 
 application = get_wsgi_application()
+
+# Inicia el buffer de ingesta diferida (y reproduce spools pendientes) si está activo
+from temp_car.utils.bufferIngesta import iniciar_buffer_ingesta  # noqa: E402
+from temp_car.utils.cacheHato import iniciar_cache_hato  # noqa: E402
+
+iniciar_buffer_ingesta()
+iniciar_cache_hato()  # Calienta la caché del estado del hato (/monitor/herd/)
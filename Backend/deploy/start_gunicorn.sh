@@ -20,4 +20,4 @@ fi
 # Activar venv
 source "$VENV/bin/activate"
 # Ejecutar gunicorn (socket dentro del RuntimeDirectory creado por systemd)
-exec gunicorn --access-logfile - --error-logfile - --workers 3 --bind unix:/run/gunicorn-controlbovino/gunicorn-controlbovino.sock cardiaco_vaca.wsgi:application
+exec gunicorn --access-logfile - --error-logfile - --workers 3 --worker-class uvicorn_worker.UvicornWorker --bind unix:/run/gunicorn-controlbovino/gunicorn-controlbovino.sock cardiaco_vaca.asgi:application
@@ -32,7 +32,7 @@ module.exports = {
     {
       name: 'control-bovino-backend-gunicorn',
       script: '/home/administrador/ControlBovinoVFinal/venv/bin/gunicorn',
-      args: 'cardiaco_vaca.wsgi:application --bind 0.0.0.0:3000 --workers 4 --timeout 120',
+      args: 'cardiaco_vaca.asgi:application --bind 0.0.0.0:3000 --workers 4 --worker-class uvicorn_worker.UvicornWorker --timeout 120',
       cwd: '/home/administrador/ControlBovinoVFinal/Backend',
       env: {
         PYTHONUNBUFFERED: 1,
@@ -49,6 +49,25 @@ module.exports = {
       min_uptime: '10s',
       only: 'production',
     },
+    {
+      // Detección de anomalías sobre el historial: se ejecuta y termina, PM2 la relanza cada 5 minutos
+      name: 'control-bovino-anomalias',
+      script: 'manage.py',
+      interpreter: '/home/administrador/ControlBovinoVFinal/venv/bin/python',
+      args: 'detectar_anomalias',
+      cwd: '/home/administrador/ControlBovinoVFinal/Backend',
+      env: {
+        PYTHONUNBUFFERED: 1,
+        DJANGO_SETTINGS_MODULE: 'cardiaco_vaca.settings',
+      },
+      instances: 1,
+      exec_mode: 'fork',
+      cron_restart: '*/5 * * * *',
+      autorestart: false,
+      error_file: 'logs/anomalias-error.log',
+      out_file: 'logs/anomalias-out.log',
+      log_date_format: 'YYYY-MM-DD HH:mm:ss',
+    },
   ],
 
   deploy: {
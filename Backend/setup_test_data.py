@@ -11,7 +11,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cardiaco_vaca.settings')
 django.setup()
 
 from django.contrib.auth.models import User
-from temp_car.models import PersonalInfo, Bovinos, Temperatura, Pulsaciones, Lectura
+from temp_car.models import PersonalInfo, Bovinos, Lectura
 from datetime import datetime
 
 def create_test_users():
@@ -80,12 +80,9 @@ def verify_bovinos():
         )
         
         # Crear una lectura de prueba
-        temp = Temperatura.objects.create(valor=38)
-        puls = Pulsaciones.objects.create(valor=55)
-        
         Lectura.objects.create(
-            id_Temperatura=temp,
-            id_Pulsaciones=puls,
+            temperatura=38,
+            pulsaciones=55,
             id_Bovino=bovino,
             fecha_lectura=datetime.now().date(),
             hora_lectura=datetime.now().time()
@@ -102,13 +102,19 @@ class LecturaAdmin(admin.ModelAdmin):
     search_fields = ['id_Bovino__nombre', 'id_Lectura']
     ordering = ['-fecha_lectura', '-hora_lectura']
     date_hierarchy = 'fecha_lectura'
+    list_select_related = ['id_Bovino']
+    raw_id_fields = ['id_Temperatura', 'id_Pulsaciones']
     
     fieldsets = (
         ('Bovino', {
             'fields': ('id_Bovino',)
         }),
         ('Mediciones', {
-            'fields': ('id_Temperatura', 'id_Pulsaciones')
+            'fields': ('temperatura', 'pulsaciones', 'fuente')
+        }),
+        ('Registros legacy', {
+            'fields': ('id_Temperatura', 'id_Pulsaciones'),
+            'classes': ('collapse',)
         }),
         ('Fecha y Hora', {
             'fields': ('fecha_lectura', 'hora_lectura'),
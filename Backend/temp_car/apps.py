@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class TempCarConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'temp_car'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        from django.conf import settings
+
+        if settings.LOG_COLA_ACTIVA:
+            from .logging_utils import iniciar_cola_logging
+
+            iniciar_cola_logging(settings.LOGGING.get('loggers', {}))
@@ -1,18 +1,181 @@
 """
 Módulo centralizado de logging para el Sistema de Control Bovino
 Proporciona funciones de logging para APIs, modelos y vistas
+
+Además de los loggers, define el pipeline no bloqueante: cada logger
+configurado en settings.LOGGING escribe en una cola (QueueHandler) y un único
+hilo (QueueListener) hace el formateo y la escritura en disco. Los registros
+llevan el id de la petición (RequestIdMiddleware) y pueden escribirse como
+líneas JSON con FormateadorJSON.
 """
 
+import atexit
+import contextvars
+import copy
 import logging
 import json
-from datetime import datetime
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 
 # Obtener loggers específicos
 logger = logging.getLogger('temp_car')
 api_logger = logging.getLogger('temp_car.views')
+arduino_logger = logging.getLogger('temp_car.arduino')
+movil_logger = logging.getLogger('temp_car.movil')
+controles_logger = logging.getLogger('temp_car.controles')
 db_logger = logging.getLogger('django.db.backends')
 request_logger = logging.getLogger('django.request')
 
+
+# ----------------------------------------------------------------------
+# Id de petición
+# ----------------------------------------------------------------------
+
+SIN_REQUEST_ID = '-'
+
+_request_id = contextvars.ContextVar('temp_car_request_id', default=SIN_REQUEST_ID)
+
+
+def obtener_request_id():
+    """Id de la petición en curso ('-' fuera de una petición)"""
+    return _request_id.get()
+
+
+def asignar_request_id(valor):
+    """Fija el id de la petición en curso; devuelve el token para liberarlo"""
+    return _request_id.set(valor)
+
+
+def liberar_request_id(token):
+    _request_id.reset(token)
+
+
+class FiltroRequestId(logging.Filter):
+    """Agrega record.request_id; no lo pisa si el registro ya lo trae de la cola"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = _request_id.get()
+        return True
+
+
+# ----------------------------------------------------------------------
+# Formato JSON
+# ----------------------------------------------------------------------
+
+# Atributos propios de LogRecord; el resto son los campos pasados en extra={...}
+_CAMPOS_LOGRECORD = frozenset(vars(logging.makeLogRecord({}))) | {
+    'message', 'asctime', 'request_id', 'logger_cola',
+}
+
+
+class FormateadorJSON(logging.Formatter):
+    """Un objeto JSON por línea con los campos de extra={...} bajo 'datos'"""
+
+    def format(self, record):
+        datos = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', SIN_REQUEST_ID),
+            'mensaje': record.getMessage(),
+            'funcion': record.funcName,
+            'linea': record.lineno,
+        }
+        extra = {clave: valor for clave, valor in vars(record).items() if clave not in _CAMPOS_LOGRECORD}
+        if extra:
+            datos['datos'] = extra
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            datos['excepcion'] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+# ----------------------------------------------------------------------
+# Cola de logging
+# ----------------------------------------------------------------------
+
+class _ManejadorCola(QueueHandler):
+    """
+    QueueHandler de un logger concreto
+
+    Resuelve el mensaje y la traza en el hilo de la petición (los argumentos
+    pueden cambiar después) y marca el registro con el logger de origen para
+    que el listener lo entregue a los handlers de ese logger.
+    """
+
+    def __init__(self, cola, destino):
+        super().__init__(cola)
+        self.destino = destino
+        self.addFilter(FiltroRequestId())
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.logger_cola = self.destino
+        return record
+
+
+class _ListenerPorLogger(QueueListener):
+    """Un solo hilo para todos los loggers; cada registro va a los handlers de su logger"""
+
+    def __init__(self, cola, rutas):
+        super().__init__(cola, respect_handler_level=True)
+        self.rutas = rutas
+
+    def handle(self, record):
+        for handler in self.rutas.get(getattr(record, 'logger_cola', None), ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+_listener = None
+
+
+def iniciar_cola_logging(nombres):
+    """
+    Reemplaza los handlers de los loggers indicados por un QueueHandler
+
+    Se llama una vez por proceso desde TempCarConfig.ready(), después de que
+    Django aplicó settings.LOGGING; los niveles de cada logger no cambian.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    cola = queue.SimpleQueue()
+    rutas = {}
+    for nombre in nombres:
+        registrador = logging.getLogger(nombre)
+        handlers = list(registrador.handlers)
+        if not handlers:
+            continue
+        rutas[nombre] = handlers
+        for handler in handlers:
+            registrador.removeHandler(handler)
+        registrador.addHandler(_ManejadorCola(cola, nombre))
+
+    if not rutas:
+        return
+    _listener = _ListenerPorLogger(cola, rutas)
+    _listener.start()
+    atexit.register(detener_cola_logging)
+
+
+def detener_cola_logging():
+    """Vacía la cola y detiene el hilo de escritura"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 class APILogger:
     """Clase para logging de APIs REST"""
     
@@ -117,25 +280,32 @@ class ArduinoLogger:
     """Clase para logging de datos del Arduino"""
     
     @staticmethod
-    def log_arduino_data(collar_id, bovino_name, temp, pulse):
+    def log_arduino_data(collar_id, bovino_name, temp, pulse, lectura_id=None):
         """Registra datos recibidos del Arduino"""
-        api_logger.info(
-            f"ARDUINO DATA | Collar: {collar_id} | "
-            f"Bovino: {bovino_name} | Temp: {temp}°C | Pulse: {pulse} bpm"
+        arduino_logger.info(
+            "ARDUINO DATA | Collar: %s | Bovino: %s | Temp: %s°C | Pulse: %s bpm",
+            collar_id, bovino_name, temp, pulse,
+            extra={'collar_id': collar_id, 'lectura_id': lectura_id, 'temperatura': temp, 'pulsaciones': pulse},
         )
     
     @staticmethod
     def log_arduino_error(error):
-        """Registra error en lectura Arduino"""
-        api_logger.error(f"ARDUINO ERROR | {str(error)}")
+        """Registra error en lectura Arduino (con la traza si se llama dentro de un except)"""
+        arduino_logger.error("ARDUINO ERROR | %s", error, exc_info=sys.exc_info()[0] is not None)
     
     @staticmethod
     def log_arduino_validation_error(data, missing_fields):
         """Registra error de validación Arduino"""
-        api_logger.warning(
-            f"ARDUINO VALIDATION ERROR | Missing fields: {missing_fields} | Data: {data}"
+        arduino_logger.warning(
+            "ARDUINO VALIDATION ERROR | Missing fields: %s | Data: %s", missing_fields, data,
+            extra={'campos_faltantes': missing_fields},
         )
 
+    @staticmethod
+    def log_arduino_auth_error(motivo):
+        """Registra un intento de envío sin la API key correcta"""
+        arduino_logger.warning("ARDUINO AUTH ERROR | %s", motivo)
+
 
 class UserActivityLogger:
     """Clase para logging de actividad de usuarios"""
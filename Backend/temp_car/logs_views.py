@@ -1,33 +1,58 @@
 """
 Vistas para visualizar y gestionar logs
-Accesibles sin necesidad de login
+Accesibles sin necesidad de login, salvo la búsqueda y el seguimiento en
+vivo, que exponen el contenido de todos los logs y quedan para el staff
 """
 
 import os
 import logging
+from functools import wraps
+from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 from django.http import JsonResponse, FileResponse, HttpResponse
+from django.conf import settings
+from django.urls import reverse
 from django.views.decorators.http import require_http_methods
-from pathlib import Path
+
+from temp_car.utils.busquedaLogs import LIMITE_BYTES_BUSQUEDA, TAMANO_PAGINA as TAMANO_PAGINA_BUSQUEDA
+from temp_car.utils.busquedaLogs import actualizar_indice, buscar
+from temp_car.utils.lectorLogs import (
+    TAMANO_PAGINA,
+    contar_lineas,
+    leer_cola,
+    leer_pagina,
+    listar_logs,
+    offset_de_linea,
+)
+from temp_car.utils.seguimientoLogs import SeguidorLog
+from temp_car.utils.sse import es_asgi, respuesta_sse
 
 logger = logging.getLogger('temp_car')
 
+LINEAS_COLA = 100
 
-def get_log_files():
-    """Obtiene lista de archivos de log disponibles"""
-    logs_dir = Path('logs')
-    
-    if not logs_dir.exists():
-        return {}
-    
-    log_files = {}
-    for log_file in logs_dir.glob('*.log'):
-        log_files[log_file.name] = {
-            'path': str(log_file),
-            'size': log_file.stat().st_size,
-        }
-    
-    return log_files
+
+def solo_staff(vista):
+    """Exige sesión iniciada (redirige al login) y usuario staff (403 si no lo es)"""
+    @login_required
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if not request.user.is_staff:
+            return JsonResponse({
+                'error': 'No autorizado',
+                'detalle': 'Solo el personal administrador puede consultar los logs'
+            }, status=403)
+        return vista(request, *args, **kwargs)
+    return envoltura
+
+
+def get_log_files(incluir_rotados=False):
+    """
+    Obtiene lista de archivos de log disponibles en LOGS_DIR
+
+    Con incluir_rotados también devuelve los respaldos (django.log.1, ...)
+    """
+    return listar_logs(incluir_rotados)
 
 
 @require_http_methods(["GET"])
@@ -36,19 +61,17 @@ def view_logs_dashboard(request):
     
     try:
         log_files = get_log_files()
+        totales = contar_lineas([info['path'] for info in log_files.values()])
         
-        # Leer contenido de cada archivo de log
+        # Últimas líneas de cada archivo, leídas hacia atrás desde el final
         logs_content = {}
         for filename, info in log_files.items():
             try:
-                with open(info['path'], 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    # Mostrar las últimas 100 líneas
-                    logs_content[filename] = {
-                        'total_lines': len(lines),
-                        'last_100_lines': lines[-100:] if lines else [],
-                        'size': info['size'],
-                    }
+                logs_content[filename] = {
+                    'total_lines': totales.get(info['path'], 0),
+                    'last_100_lines': leer_cola(info['path'], LINEAS_COLA),
+                    'size': info['size'],
+                }
             except Exception as e:
                 logs_content[filename] = {
                     'error': f'Error al leer archivo: {str(e)}'
@@ -70,10 +93,19 @@ def view_logs_dashboard(request):
 
 @require_http_methods(["GET"])
 def get_log_content(request, filename):
-    """Obtiene contenido de un archivo de log específico"""
+    """
+    Obtiene una página del contenido de un archivo de log
+
+    Parámetros GET (offsets en bytes, las páginas se cortan en límites de línea):
+        desde:  offset de inicio; por defecto 0
+        hasta:  lee la página que termina en este offset (paginación hacia atrás)
+        linea:  empieza en este número de línea (1 = primera)
+        tamano: bytes por página (máximo 1 MB)
+    La respuesta incluye 'anterior' y 'siguiente' para pedir las páginas contiguas.
+    """
     
     try:
-        log_files = get_log_files()
+        log_files = get_log_files(incluir_rotados=True)
         
         if filename not in log_files:
             return JsonResponse({
@@ -89,13 +121,28 @@ def get_log_content(request, filename):
                 'path': file_path
             }, status=404)
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        try:
+            tamano = int(request.GET.get('tamano', TAMANO_PAGINA))
+            desde = int(request.GET['desde']) if request.GET.get('desde') else None
+            hasta = int(request.GET['hasta']) if request.GET.get('hasta') else None
+            linea = int(request.GET['linea']) if request.GET.get('linea') else None
+        except ValueError:
+            return JsonResponse({
+                'error': 'Parámetros inválidos',
+                'detalle': 'desde, hasta, linea y tamano deben ser números enteros'
+            }, status=400)
+        
+        if linea is not None:
+            desde = offset_de_linea(file_path, linea)
+        
+        pagina = leer_pagina(file_path, desde=desde, hasta=hasta, tamano=tamano)
+        content = pagina.pop('contenido')
         
         return JsonResponse({
             'filename': filename,
             'content': content,
-            'lines': len(content.split('\n')),
+            'lines': content.count('\n') + (1 if content and not content.endswith('\n') else 0),
+            **pagina,
         })
     
     except Exception as e:
@@ -111,7 +158,7 @@ def get_log_file(request, filename):
     """Descarga un archivo de log específico"""
     
     try:
-        log_files = get_log_files()
+        log_files = get_log_files(incluir_rotados=True)
         
         if filename not in log_files:
             return JsonResponse({
@@ -184,7 +231,9 @@ def logs_api_stats(request):
     """Obtiene estadísticas de los logs"""
     
     try:
-        log_files = get_log_files()
+        log_files = get_log_files(incluir_rotados=True)
+        # Conteo incremental: solo se leen los bytes agregados desde la última consulta
+        totales = contar_lineas([info['path'] for info in log_files.values()])
         
         stats = {
             'total_files': len(log_files),
@@ -194,19 +243,17 @@ def logs_api_stats(request):
         }
         
         for filename, info in log_files.items():
-            try:
-                with open(info['path'], 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    stats['files'][filename] = {
-                        'size': info['size'],
-                        'lines': len(lines),
-                        'size_mb': info['size'] / (1024 * 1024),
-                    }
-                    stats['total_size'] += info['size']
-            except Exception as e:
+            if info['path'] not in totales:
                 stats['files'][filename] = {
-                    'error': str(e)
+                    'error': 'No se pudo leer el archivo'
                 }
+                continue
+            stats['files'][filename] = {
+                'size': info['size'],
+                'lines': totales[info['path']],
+                'size_mb': info['size'] / (1024 * 1024),
+            }
+            stats['total_size'] += info['size']
         
         stats['total_size_mb'] = stats['total_size'] / (1024 * 1024)
         
@@ -218,3 +265,105 @@ def logs_api_stats(request):
             'error': 'Error al obtener estadísticas',
             'detalle': str(e)
         }, status=500)
+
+
+@solo_staff
+@require_http_methods(["GET"])
+def search_logs(request):
+    """
+    Busca en los logs actuales y rotados con el índice de texto completo
+
+    Parámetros GET:
+        q:          palabras a buscar (todas deben aparecer; 'pal*' por prefijo)
+        nivel:      nivel mínimo (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        logger:     logger y sus hijos (p. ej. temp_car.arduino)
+        desde, hasta: YYYY-MM-DD o YYYY-MM-DDTHH:MM:SS (hora local)
+        collar:     idCollar
+        request_id: id de la petición (cabecera X-Request-ID)
+        archivo:    archivo o familia (apis.log incluye apis.log.1 ...)
+        cursor:     valor 'siguiente' de la página anterior
+        tamano:     resultados por página (máximo 500)
+    Cada resultado trae archivo y offset; 'url' abre el contenido en esa posición.
+    """
+    
+    try:
+        # Pone al día el índice con lo escrito desde la última búsqueda
+        indice = actualizar_indice(limite_bytes=LIMITE_BYTES_BUSQUEDA)
+        
+        pagina = buscar(
+            consulta=request.GET.get('q'),
+            nivel=request.GET.get('nivel'),
+            logger=request.GET.get('logger'),
+            desde=request.GET.get('desde'),
+            hasta=request.GET.get('hasta'),
+            collar=request.GET.get('collar'),
+            request_id=request.GET.get('request_id'),
+            archivo=request.GET.get('archivo'),
+            cursor=request.GET.get('cursor'),
+            tamano=request.GET.get('tamano', TAMANO_PAGINA_BUSQUEDA),
+        )
+    except ValueError as e:
+        return JsonResponse({
+            'error': 'Parámetros inválidos',
+            'detalle': str(e)
+        }, status=400)
+    except Exception as e:
+        logger.error(f"Error al buscar en logs: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': 'Error al buscar en logs',
+            'detalle': str(e)
+        }, status=500)
+    
+    for resultado in pagina['resultados']:
+        resultado['url'] = (
+            reverse('get_log_content', args=[resultado['archivo']]) + f"?desde={resultado['offset']}"
+        )
+    
+    return JsonResponse({
+        'total_pagina': len(pagina['resultados']),
+        'resultados': pagina['resultados'],
+        'siguiente': pagina['siguiente'],
+        'indice_al_dia': indice['al_dia'],
+    })
+
+
+@solo_staff
+@require_http_methods(["GET"])
+def stream_log(request, filename):
+    """
+    Sigue un archivo de log en vivo con Server-Sent Events
+
+    GET /logs/stream/<archivo>/?nivel=WARNING&contiene=collar&lineas=50
+
+    Parámetros GET:
+        nivel:    nivel mínimo de las líneas enviadas
+        contiene: texto que deben contener las líneas (sin distinguir mayúsculas)
+        lineas:   líneas ya escritas a enviar al conectar (máximo 500)
+    Solo envía las líneas agregadas y sigue al archivo nuevo cuando rota.
+    """
+    
+    log_files = get_log_files()
+    
+    if filename not in log_files:
+        return JsonResponse({
+            'error': 'Archivo de log no encontrado',
+            'disponibles': list(log_files.keys())
+        }, status=404)
+    
+    try:
+        seguidor = SeguidorLog(
+            log_files[filename]['path'],
+            nivel=request.GET.get('nivel'),
+            contiene=request.GET.get('contiene'),
+            lineas=int(request.GET.get('lineas', 0)),
+            ultimo_evento=request.headers.get('Last-Event-ID'),
+        )
+    except ValueError as e:
+        return JsonResponse({
+            'error': 'Parámetros inválidos',
+            'detalle': str(e)
+        }, status=400)
+    
+    if es_asgi(request):
+        return respuesta_sse(seguidor.iterar_async(settings.MONITOR_SSE_DURACION_ASGI))
+    return respuesta_sse(seguidor.iterar(settings.MONITOR_SSE_DURACION_WSGI))
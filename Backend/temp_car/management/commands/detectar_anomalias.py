@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from temp_car.utils.deteccionAnomalias import analizar_hato
+
+
+class Command(BaseCommand):
+    help = 'Detecta episodios anómalos (z-score, EWMA, fiebre sostenida) en las lecturas recientes del hato (idempotente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas',
+            type=int,
+            help='Horas hacia atrás a analizar (default: ANOMALIAS_VENTANA_HORAS)',
+        )
+
+    def handle(self, *args, **options):
+        if options['horas'] is not None and options['horas'] < 1:
+            raise CommandError('--horas debe ser mayor que cero')
+
+        resumen = analizar_hato(horas=options['horas'])
+
+        self.stdout.write(f"📦 {resumen['lecturas']} lecturas de {resumen['bovinos']} bovinos analizadas")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resumen['episodios']} episodios: {resumen['creados']} nuevos, {resumen['actualizados']} extendidos"
+        ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from temp_car.utils.busquedaLogs import actualizar_indice
+
+
+class Command(BaseCommand):
+    help = 'Indexa de forma incremental los logs (actuales y rotados) para /logs/search/'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seguir',
+            action='store_true',
+            help='No termina: vuelve a indexar lo nuevo cada --intervalo segundos',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=30,
+            help='Segundos entre pasadas con --seguir (default: 30)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            resultado = actualizar_indice()
+            if resultado['bytes'] or not options['seguir']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ {resultado['bytes'] / (1024 * 1024):.1f} MB indexados de {resultado['archivos']} archivos"
+                ))
+            if not options['seguir']:
+                break
+            time.sleep(options['intervalo'])
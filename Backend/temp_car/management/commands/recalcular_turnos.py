@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from temp_car.models import ControlMonitoreo, TurnoCompletado
+from temp_car.utils.turnosCompletados import reconstruir_turnos
+
+
+def _fecha(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Fecha inválida: {valor} (use YYYY-MM-DD)')
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla de turnos completados desde los controles de monitoreo (idempotente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primer día a reconstruir, YYYY-MM-DD (default: el más antiguo)')
+        parser.add_argument('--hasta', help='Último día a reconstruir, YYYY-MM-DD (default: el más reciente)')
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Tamaño de lote para bulk_create (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        desde = _fecha(options['desde']) if options['desde'] else None
+        hasta = _fecha(options['hasta']) if options['hasta'] else None
+        if desde and hasta and desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta')
+
+        def progreso(fecha, turnos):
+            self.stdout.write(f'📦 {fecha} - {turnos} turnos completados')
+
+        total = reconstruir_turnos(
+            ControlMonitoreo,
+            TurnoCompletado,
+            desde=desde,
+            hasta=hasta,
+            tamano_lote=options['lote'],
+            progreso=progreso,
+        )
+
+        if total:
+            self.stdout.write(self.style.SUCCESS(f'✅ Turnos reconstruidos para {total} días'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ No hay controles en el rango indicado'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from temp_car.models import Lectura, Pulsaciones, Temperatura
+from temp_car.utils.rellenoLecturas import rellenar_lecturas
+
+
+class Command(BaseCommand):
+    help = 'Copia temperatura y pulsaciones de las tablas legacy a la fila de Lectura (reanudable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tramo',
+            type=int,
+            default=5000,
+            help='Cantidad de id_Lectura por tramo confirmado (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        def progreso(ultimo_id, id_maximo, actualizadas):
+            self.stdout.write(f'📦 Hasta id {ultimo_id}/{id_maximo} - {actualizadas} lecturas actualizadas')
+
+        total = rellenar_lecturas(
+            Lectura, Temperatura, Pulsaciones,
+            tamano_tramo=options['tramo'],
+            progreso=progreso,
+        )
+
+        if total:
+            self.stdout.write(self.style.SUCCESS(f'✅ Relleno completado: {total} lecturas actualizadas'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ No hay lecturas legacy pendientes de relleno'))
@@ -0,0 +1,70 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from temp_car.utils.metricas import VISTA_SIN_RUTA, registro_metricas
+
+logger = logging.getLogger('temp_car.lentas')
+
+
+class _ContadorConsultas:
+    """execute_wrapper que cuenta las consultas SQL y acumula su duración"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+class MetricasMiddleware:
+    """
+    Mide cada petición: tiempo total, cantidad de consultas SQL y tiempo en
+    base de datos, agrupados por el nombre de la URL resuelta. Las peticiones
+    que superan los umbrales se registran en el log de peticiones lentas.
+
+    En respuestas en streaming (SSE, exportaciones) se mide hasta que la vista
+    devuelve la respuesta, no la duración completa de la descarga.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICAS_ACTIVAS:
+            return self.get_response(request)
+
+        contador = _ContadorConsultas()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(contador):
+            response = self.get_response(request)
+        duracion = time.perf_counter() - inicio
+
+        coincidencia = getattr(request, 'resolver_match', None)
+        vista = (coincidencia.url_name or coincidencia.view_name) if coincidencia else VISTA_SIN_RUTA
+
+        lenta = self._es_lenta(vista, duracion, contador.consultas)
+        registro_metricas.registrar(vista, duracion, contador.consultas, contador.tiempo, response.status_code, lenta)
+
+        if lenta:
+            logger.warning(
+                f"PETICION LENTA | {request.method} {request.path} | vista={vista} | "
+                f"{duracion * 1000:.0f} ms | {contador.consultas} consultas | "
+                f"BD {contador.tiempo * 1000:.0f} ms | estado {response.status_code}"
+            )
+
+        response['Server-Timing'] = f'app;dur={duracion * 1000:.1f}, db;dur={contador.tiempo * 1000:.1f}'
+        return response
+
+    @staticmethod
+    def _es_lenta(vista, duracion, consultas):
+        umbral_ms = settings.METRICAS_UMBRALES_VISTA.get(vista, settings.METRICAS_UMBRAL_LENTA_MS)
+        return duracion * 1000 >= umbral_ms or consultas >= settings.METRICAS_UMBRAL_CONSULTAS
@@ -0,0 +1,37 @@
+import re
+import uuid
+
+from temp_car.logging_utils import asignar_request_id, liberar_request_id
+
+CABECERA = 'X-Request-ID'
+
+# Ids aceptados desde el proxy o el cliente; cualquier otro se reemplaza
+_ID_VALIDO = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestIdMiddleware:
+    """
+    Asigna un id a cada petición para correlacionar sus registros de log
+
+    Reutiliza el X-Request-ID que envíe el proxy (nginx) o el cliente si es
+    válido; si no, genera uno. El id queda en request.request_id, en todos los
+    registros emitidos durante la petición y en la cabecera de la respuesta.
+    Debe ir primero en MIDDLEWARE para cubrir a los demás middlewares.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recibido = request.META.get('HTTP_X_REQUEST_ID', '')
+        request_id = recibido if _ID_VALIDO.match(recibido) else uuid.uuid4().hex
+        request.request_id = request_id
+
+        token = asignar_request_id(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            liberar_request_id(token)
+
+        response[CABECERA] = request_id
+        return response
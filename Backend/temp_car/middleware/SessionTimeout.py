@@ -1,39 +1,74 @@
-from django.utils import timezone
+import time
+from datetime import datetime
+
 from django.conf import settings
 from django.contrib import auth
-from datetime import datetime
 from django.shortcuts import redirect
 
+
+def _marca_actividad(valor):
+    """Segundos epoch de 'last_activity'; acepta el formato ISO 8601 anterior"""
+    if valor is None:
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    try:
+        return datetime.fromisoformat(valor).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
 class SessionTimeoutMiddleware:
+    """
+    Cierra la sesión tras SESSION_COOKIE_AGE segundos sin actividad
+
+    La última actividad se guarda en la sesión con una granularidad de
+    SESSION_ACTIVIDAD_GRANULARIDAD segundos: solo se escribe cuando la marca
+    guardada es más vieja que esa ventana. Con SESSION_SAVE_EVERY_REQUEST
+    desactivado, los sondeos del dashboard (cada pocos segundos por collar)
+    no modifican la sesión y no generan escrituras en la base de datos (ni
+    Set-Cookie con el motor signed_cookies).
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        # Llama a la vista y obtén la respuesta
-        response = self.get_response(request)
-        
-        # Verifica si la sesión del usuario está activa
+        # Peticiones móviles autenticadas por token: no usan la sesión
+        if getattr(request, 'token_movil', None) is not None:
+            return self.get_response(request)
+
+        ahora = time.time()
+        ultima = None
+
+        # Verifica si la sesión del usuario está activa antes de atender la petición
         if request.user.is_authenticated:
-            last_activity = request.session.get('last_activity')
+            ultima = _marca_actividad(request.session.get('last_activity'))
+            if ultima is not None and ahora - ultima > settings.SESSION_COOKIE_AGE:
+                return self._cerrar_sesion(request)
 
-            # Convierte la hora actual a una cadena ISO 8601
-            now = timezone.now().isoformat()
+        # Llama a la vista y obtén la respuesta
+        response = self.get_response(request)
 
-            # Si la última actividad registrada es mayor al tiempo de expiración, cierra la sesión
-            if last_activity and (datetime.fromisoformat(now) - datetime.fromisoformat(last_activity)).seconds > settings.SESSION_COOKIE_AGE:
-                auth.logout(request)
-                response.delete_cookie(settings.SESSION_COOKIE_NAME, domain=settings.SESSION_COOKIE_DOMAIN)
-                request.session.flush()
+        # Actualiza la última actividad solo si la marca guardada ya es vieja
+        if request.user.is_authenticated and (
+            ultima is None or ahora - ultima >= settings.SESSION_ACTIVIDAD_GRANULARIDAD
+        ):
+            request.session['last_activity'] = int(ahora)
 
-                # Eliminar todas las cookies estableciendo su tiempo de expiración en el pasado
-                for cookie_name in request.COOKIES:
-                    response.delete_cookie(cookie_name)
+        return response
 
-                # Redirigir al usuario a la página de inicio de sesión
-                
-                return redirect('login')
+    @staticmethod
+    def _cerrar_sesion(request):
+        auth.logout(request)
+        request.session.flush()
 
-            # Actualiza la última actividad en cada solicitud
-            request.session['last_activity'] = now
+        # Redirigir al usuario a la página de inicio de sesión
+        response = redirect('login')
 
+        # Eliminar todas las cookies estableciendo su tiempo de expiración en el pasado
+        response.delete_cookie(settings.SESSION_COOKIE_NAME, domain=settings.SESSION_COOKIE_DOMAIN)
+        for cookie_name in request.COOKIES:
+            if cookie_name != settings.SESSION_COOKIE_NAME:
+                response.delete_cookie(cookie_name)
         return response
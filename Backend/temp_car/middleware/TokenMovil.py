@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import reverse
+
+from temp_car.utils.auth_utils import cache_tokens, token_de_request
+
+# Rutas de la app móvil autenticadas por token
+RUTAS_MOVIL = ('/api/movil/', '/api/controles-monitoreo/')
+
+
+class TokenMovilMiddleware:
+    """
+    Autenticación por token para las APIs de la app móvil
+
+    Con "Authorization: Token <clave>" (o Bearer) el usuario se resuelve
+    desde la caché de tokens y se asigna a request.user antes de que algo
+    lea la sesión: la petición no carga ni guarda la sesión de Django.
+    El login (/api/movil/login/) queda libre para obtener el token.
+
+    Sin token se responde 401, salvo que API_MOVIL_SESION permita seguir
+    usando la sesión de Django (versiones de la app anteriores al token).
+    Debe ir después de AuthenticationMiddleware y antes de SessionTimeoutMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._ruta_login = None
+
+    def _es_ruta_movil(self, request):
+        if self._ruta_login is None:
+            self._ruta_login = reverse('api-login')
+        ruta = request.path_info
+        return ruta.startswith(RUTAS_MOVIL) and ruta != self._ruta_login
+
+    def __call__(self, request):
+        if not self._es_ruta_movil(request):
+            return self.get_response(request)
+
+        clave = token_de_request(request)
+        if clave is not None:
+            usuario = cache_tokens.usuario(clave)
+            if usuario is None:
+                return JsonResponse({
+                    'error': 'No autorizado',
+                    'detalle': 'Token inválido o expirado'
+                }, status=401)
+            request.user = usuario
+            request.token_movil = clave
+            # El token no viaja en una cookie: no aplica la protección CSRF
+            request._dont_enforce_csrf_checks = True
+        elif not (settings.API_MOVIL_SESION and request.user.is_authenticated):
+            return JsonResponse({
+                'error': 'No autorizado',
+                'detalle': 'Se requiere header Authorization: Token <token>'
+            }, status=401)
+
+        return self.get_response(request)
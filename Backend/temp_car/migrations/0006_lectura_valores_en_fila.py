@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temp_car', '0005_alter_temperatura_valor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lectura',
+            name='pulsaciones',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Pulsaciones (BPM)'),
+        ),
+        migrations.AddField(
+            model_name='lectura',
+            name='temperatura',
+            field=models.FloatField(blank=True, null=True, verbose_name='Temperatura (°C)'),
+        ),
+        migrations.AlterField(
+            model_name='lectura',
+            name='id_Pulsaciones',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='temp_car.pulsaciones', verbose_name='Pulsaciones (legacy)'),
+        ),
+        migrations.AlterField(
+            model_name='lectura',
+            name='id_Temperatura',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='temp_car.temperatura', verbose_name='Temperatura (legacy)'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Relleno por tramos de temperatura/pulsaciones en Lectura desde las tablas legacy
+
+from django.db import migrations
+
+from temp_car.utils.rellenoLecturas import rellenar_lecturas
+
+
+def rellenar(apps, schema_editor):
+    rellenar_lecturas(
+        apps.get_model('temp_car', 'Lectura'),
+        apps.get_model('temp_car', 'Temperatura'),
+        apps.get_model('temp_car', 'Pulsaciones'),
+    )
+
+
+class Migration(migrations.Migration):
+    # Cada tramo se confirma por separado: si la migración se interrumpe,
+    # volver a ejecutar migrate continúa con las lecturas pendientes
+    atomic = False
+
+    dependencies = [
+        ('temp_car', '0006_lectura_valores_en_fila'),
+    ]
+
+    operations = [
+        migrations.RunPython(rellenar, migrations.RunPython.noop),
+    ]
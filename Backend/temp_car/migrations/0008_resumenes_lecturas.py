@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temp_car', '0007_rellenar_valores_lectura'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenLecturaHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(db_index=True, verbose_name='Fecha')),
+                ('cantidad', models.PositiveIntegerField(default=0, verbose_name='Lecturas')),
+                ('temperatura_min', models.FloatField(blank=True, null=True, verbose_name='Temperatura mínima (°C)')),
+                ('temperatura_max', models.FloatField(blank=True, null=True, verbose_name='Temperatura máxima (°C)')),
+                ('temperatura_suma', models.FloatField(default=0, verbose_name='Suma de temperaturas')),
+                ('temperatura_cantidad', models.PositiveIntegerField(default=0, verbose_name='Lecturas con temperatura')),
+                ('pulsaciones_min', models.IntegerField(blank=True, null=True, verbose_name='Pulsaciones mínimas (BPM)')),
+                ('pulsaciones_max', models.IntegerField(blank=True, null=True, verbose_name='Pulsaciones máximas (BPM)')),
+                ('pulsaciones_suma', models.BigIntegerField(default=0, verbose_name='Suma de pulsaciones')),
+                ('pulsaciones_cantidad', models.PositiveIntegerField(default=0, verbose_name='Lecturas con pulsaciones')),
+                ('ultima_temperatura', models.FloatField(blank=True, null=True, verbose_name='Última temperatura (°C)')),
+                ('ultimas_pulsaciones', models.IntegerField(blank=True, null=True, verbose_name='Últimas pulsaciones (BPM)')),
+                ('ultima_hora', models.TimeField(blank=True, null=True, verbose_name='Hora de la última lectura')),
+                ('ultima_lectura_id', models.IntegerField(blank=True, null=True, verbose_name='ID de la última lectura')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('hora', models.PositiveSmallIntegerField(verbose_name='Hora (0-23)')),
+                ('id_Bovino', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_hora', to='temp_car.bovinos', verbose_name='Bovino')),
+            ],
+            options={
+                'verbose_name': 'Resumen horario de lecturas',
+                'verbose_name_plural': 'Resúmenes horarios de lecturas',
+                'ordering': ['-fecha', '-hora'],
+                'unique_together': {('id_Bovino', 'fecha', 'hora')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenLecturaDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(db_index=True, verbose_name='Fecha')),
+                ('cantidad', models.PositiveIntegerField(default=0, verbose_name='Lecturas')),
+                ('temperatura_min', models.FloatField(blank=True, null=True, verbose_name='Temperatura mínima (°C)')),
+                ('temperatura_max', models.FloatField(blank=True, null=True, verbose_name='Temperatura máxima (°C)')),
+                ('temperatura_suma', models.FloatField(default=0, verbose_name='Suma de temperaturas')),
+                ('temperatura_cantidad', models.PositiveIntegerField(default=0, verbose_name='Lecturas con temperatura')),
+                ('pulsaciones_min', models.IntegerField(blank=True, null=True, verbose_name='Pulsaciones mínimas (BPM)')),
+                ('pulsaciones_max', models.IntegerField(blank=True, null=True, verbose_name='Pulsaciones máximas (BPM)')),
+                ('pulsaciones_suma', models.BigIntegerField(default=0, verbose_name='Suma de pulsaciones')),
+                ('pulsaciones_cantidad', models.PositiveIntegerField(default=0, verbose_name='Lecturas con pulsaciones')),
+                ('ultima_temperatura', models.FloatField(blank=True, null=True, verbose_name='Última temperatura (°C)')),
+                ('ultimas_pulsaciones', models.IntegerField(blank=True, null=True, verbose_name='Últimas pulsaciones (BPM)')),
+                ('ultima_hora', models.TimeField(blank=True, null=True, verbose_name='Hora de la última lectura')),
+                ('ultima_lectura_id', models.IntegerField(blank=True, null=True, verbose_name='ID de la última lectura')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('id_Bovino', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_dia', to='temp_car.bovinos', verbose_name='Bovino')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de lecturas',
+                'verbose_name_plural': 'Resúmenes diarios de lecturas',
+                'ordering': ['-fecha'],
+                'unique_together': {('id_Bovino', 'fecha')},
+            },
+        ),
+    ]
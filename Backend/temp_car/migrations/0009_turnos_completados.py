@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temp_car', '0008_resumenes_lecturas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TurnoCompletado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('turno', models.CharField(choices=[('morning', 'Mañana (06:00 - 12:00)'), ('afternoon', 'Tarde (12:00 - 18:00)'), ('evening', 'Noche (18:00 - 23:59)'), ('night', 'Madrugada (00:00 - 06:00)')], max_length=10, verbose_name='Turno')),
+                ('controles', models.PositiveIntegerField(default=0, verbose_name='Controles en el turno')),
+                ('ultimo_control_id', models.IntegerField(blank=True, null=True, verbose_name='ID del último control')),
+                ('ultima_hora', models.TimeField(blank=True, null=True, verbose_name='Hora del último control')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('id_Bovino', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turnos_completados', to='temp_car.bovinos', verbose_name='Bovino')),
+            ],
+            options={
+                'verbose_name': 'Turno completado',
+                'verbose_name_plural': 'Turnos completados',
+                'ordering': ['-fecha', 'turno'],
+                'unique_together': {('fecha', 'turno', 'id_Bovino')},
+            },
+        ),
+    ]
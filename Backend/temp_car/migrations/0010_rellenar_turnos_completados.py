@@ -0,0 +1,25 @@
+# Carga inicial de TurnoCompletado desde los controles existentes
+
+from django.db import migrations
+
+from temp_car.utils.turnosCompletados import reconstruir_turnos
+
+
+def rellenar(apps, schema_editor):
+    reconstruir_turnos(
+        apps.get_model('temp_car', 'ControlMonitoreo'),
+        apps.get_model('temp_car', 'TurnoCompletado'),
+    )
+
+
+class Migration(migrations.Migration):
+    # Cada día se confirma por separado; reconstruir_turnos es idempotente
+    atomic = False
+
+    dependencies = [
+        ('temp_car', '0009_turnos_completados'),
+    ]
+
+    operations = [
+        migrations.RunPython(rellenar, migrations.RunPython.noop),
+    ]
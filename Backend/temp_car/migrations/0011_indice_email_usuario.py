@@ -0,0 +1,19 @@
+# Índice sobre LOWER(email) de auth_user para identificar al usuario de la app
+# móvil sin recorrer la tabla (ver ResolutorUsuarios en utils/auth_utils.py)
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('temp_car', '0010_rellenar_turnos_completados'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX temp_car_auth_user_email_lower ON auth_user (LOWER(email));',
+            'DROP INDEX temp_car_auth_user_email_lower;',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temp_car', '0011_indice_email_usuario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='controlmonitoreo',
+            name='uuid_cliente',
+            field=models.UUIDField(blank=True, editable=False, help_text='Id generado por la app al registrar sin conexión; hace idempotente la sincronización', null=True, unique=True, verbose_name='UUID del cliente'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temp_car', '0012_control_uuid_cliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioRegistro',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('lectura', 'Lectura'), ('control', 'Control de monitoreo'), ('bovino', 'Bovino')], max_length=10, verbose_name='Tipo')),
+                ('objeto_id', models.IntegerField(verbose_name='ID del registro')),
+                ('accion', models.CharField(choices=[('guardado', 'Creado o actualizado'), ('eliminado', 'Eliminado')], max_length=10, verbose_name='Acción')),
+                ('collar_id', models.IntegerField(blank=True, null=True, verbose_name='ID del Collar')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha del cambio')),
+            ],
+            options={
+                'verbose_name': 'Cambio registrado',
+                'verbose_name_plural': 'Cambios registrados',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['collar_id', 'id'], name='temp_car_ca_collar__476597_idx')],
+            },
+        ),
+    ]
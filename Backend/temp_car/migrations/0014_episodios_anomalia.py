@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temp_car', '0013_registro_cambios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EpisodioAnomalia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('fiebre_sostenida', 'Fiebre sostenida'), ('desviacion_temperatura', 'Desviación de temperatura'), ('desviacion_pulsaciones', 'Desviación de pulsaciones'), ('tendencia_temperatura', 'Tendencia de temperatura (EWMA)')], max_length=25, verbose_name='Tipo')),
+                ('severidad', models.CharField(choices=[('Alerta', 'Alerta'), ('Crítico', 'Crítico')], max_length=10, verbose_name='Severidad')),
+                ('inicio', models.DateTimeField(verbose_name='Inicio')),
+                ('fin', models.DateTimeField(verbose_name='Fin')),
+                ('lecturas', models.PositiveIntegerField(verbose_name='Lecturas en el episodio')),
+                ('valor_extremo', models.FloatField(verbose_name='Valor extremo')),
+                ('linea_base', models.FloatField(blank=True, null=True, verbose_name='Línea base')),
+                ('puntaje', models.FloatField(blank=True, null=True, verbose_name='Puntaje máximo (z)')),
+                ('fecha_deteccion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de detección')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última actualización')),
+                ('id_Bovino', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='episodios_anomalia', to='temp_car.bovinos', verbose_name='Bovino')),
+            ],
+            options={
+                'verbose_name': 'Episodio de anomalía',
+                'verbose_name_plural': 'Episodios de anomalía',
+                'ordering': ['-inicio'],
+                'indexes': [models.Index(fields=['-fin'], name='temp_car_ep_fin_592a5e_idx'), models.Index(fields=['id_Bovino', '-inicio'], name='temp_car_ep_id_Bovi_ded3a7_idx')],
+            },
+        ),
+    ]
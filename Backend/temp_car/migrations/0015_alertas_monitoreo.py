@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temp_car', '0014_episodios_anomalia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertaMonitoreo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('collar_id', models.IntegerField(verbose_name='ID del Collar')),
+                ('nombre', models.CharField(blank=True, max_length=100, null=True, verbose_name='Nombre del bovino')),
+                ('regla', models.CharField(choices=[('temperatura_extrema', 'Temperatura extrema'), ('fiebre_sostenida', 'Fiebre sostenida'), ('subida_temperatura', 'Subida de temperatura'), ('pulsaciones_anormales', 'Pulsaciones anormales')], max_length=25, verbose_name='Regla')),
+                ('severidad', models.CharField(choices=[('Alerta', 'Alerta'), ('Crítico', 'Crítico')], max_length=10, verbose_name='Severidad')),
+                ('valor', models.FloatField(verbose_name='Valor')),
+                ('mensaje', models.CharField(max_length=255, verbose_name='Mensaje')),
+                ('inicio', models.DateTimeField(verbose_name='Inicio')),
+                ('fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('repeticiones', models.PositiveIntegerField(default=1, verbose_name='Repeticiones')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última actualización')),
+            ],
+            options={
+                'verbose_name': 'Alerta de monitoreo',
+                'verbose_name_plural': 'Alertas de monitoreo',
+                'ordering': ['-inicio'],
+                'indexes': [models.Index(fields=['collar_id', 'regla', '-inicio'], name='temp_car_al_collar__452a46_idx'), models.Index(fields=['-inicio'], name='temp_car_al_inicio_e80bfa_idx')],
+            },
+        ),
+    ]
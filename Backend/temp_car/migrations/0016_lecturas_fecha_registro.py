@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temp_car', '0015_alertas_monitoreo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lectura',
+            name='fecha_registro',
+            field=models.DateTimeField(auto_now_add=True, help_text='Momento de la inserción; el cursor de /api/movil/cambios/ solo avanza sobre filas asentadas', null=True, verbose_name='Registrada en la base'),
+        ),
+    ]
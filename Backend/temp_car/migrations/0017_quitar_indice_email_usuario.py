@@ -0,0 +1,18 @@
+# Quita el índice sobre LOWER(email) de auth_user (migración 0011): la app
+# móvil ya no identifica al usuario por email, lo resuelve el token
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temp_car', '0016_lecturas_fecha_registro'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'DROP INDEX IF EXISTS temp_car_auth_user_email_lower;',
+            'CREATE INDEX temp_car_auth_user_email_lower ON auth_user (LOWER(email));',
+        ),
+    ]
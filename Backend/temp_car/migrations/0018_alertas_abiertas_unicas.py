@@ -0,0 +1,34 @@
+# Una sola alerta abierta por collar y regla (restricción única parcial).
+# Antes de crearla se cierran las abiertas repetidas que hayan dejado dos
+# workers abriendo la misma alerta a la vez: queda abierta la más reciente.
+
+from django.db import migrations, models
+
+
+def cerrar_repetidas(apps, schema_editor):
+    AlertaMonitoreo = apps.get_model('temp_car', 'AlertaMonitoreo')
+    vistas = set()
+    for alerta in AlertaMonitoreo.objects.filter(fin__isnull=True).order_by('-inicio', '-pk').iterator():
+        clave = (alerta.collar_id, alerta.regla)
+        if clave in vistas:
+            AlertaMonitoreo.objects.filter(pk=alerta.pk).update(fin=alerta.inicio)
+        vistas.add(clave)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temp_car', '0017_quitar_indice_email_usuario'),
+    ]
+
+    operations = [
+        migrations.RunPython(cerrar_repetidas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='alertamonitoreo',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('fin__isnull', True)),
+                fields=('collar_id', 'regla'),
+                name='alerta_abierta_por_collar_y_regla',
+            ),
+        ),
+    ]
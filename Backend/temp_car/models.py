@@ -134,17 +134,35 @@ class Pulsaciones(models.Model):
 
 
 class Lectura(models.Model):
-    """Lectura de sensores de bovino"""
+    """
+    Lectura de sensores de bovino
+    Temperatura y pulsaciones se guardan en la misma fila; id_Temperatura e
+    id_Pulsaciones solo existen en lecturas legacy anteriores a la desnormalización
+    """
     id_Lectura = models.AutoField(primary_key=True)
     id_Temperatura = models.ForeignKey(
         Temperatura,
         on_delete=models.CASCADE,
-        verbose_name='Temperatura'
+        verbose_name='Temperatura (legacy)',
+        null=True,
+        blank=True
     )
     id_Pulsaciones = models.ForeignKey(
         Pulsaciones,
         on_delete=models.CASCADE,
-        verbose_name='Pulsaciones'
+        verbose_name='Pulsaciones (legacy)',
+        null=True,
+        blank=True
+    )
+    temperatura = models.FloatField(
+        'Temperatura (°C)',
+        null=True,
+        blank=True
+    )
+    pulsaciones = models.IntegerField(
+        'Pulsaciones (BPM)',
+        null=True,
+        blank=True
     )
     fecha_lectura = models.DateField(
         'Fecha de Lectura',
@@ -176,6 +194,12 @@ class Lectura(models.Model):
         db_index=True,
         help_text='Origen de la lectura: Arduino (collar), App Móvil o Manual'
     )
+    fecha_registro = models.DateTimeField(
+        'Registrada en la base',
+        auto_now_add=True,
+        null=True,
+        help_text='Momento de la inserción; el cursor de /api/movil/cambios/ solo avanza sobre filas asentadas'
+    )
 
     class Meta:
         verbose_name = 'Lectura'
@@ -198,26 +222,32 @@ class Lectura(models.Model):
     
     @property
     def temperatura_valor(self):
-        """Retorna el valor de temperatura"""
-        return self.id_Temperatura.valor if self.id_Temperatura else None
+        """Retorna el valor de temperatura (columna propia o registro legacy)"""
+        if self.temperatura is not None:
+            return self.temperatura
+        return self.id_Temperatura.valor if self.id_Temperatura_id else None
 
     @property
     def pulsaciones_valor(self):
-        """Retorna el valor de pulsaciones"""
-        return self.id_Pulsaciones.valor if self.id_Pulsaciones else None
+        """Retorna el valor de pulsaciones (columna propia o registro legacy)"""
+        if self.pulsaciones is not None:
+            return self.pulsaciones
+        return self.id_Pulsaciones.valor if self.id_Pulsaciones_id else None
 
     @property
     def temperatura_normal(self):
         """Verifica si la temperatura está en rango normal (38-39°C)"""
-        if self.id_Temperatura:
-            return 38 <= self.id_Temperatura.valor <= 39
+        valor = self.temperatura_valor
+        if valor is not None:
+            return 38 <= valor <= 39
         return None
 
     @property
     def pulsaciones_normales(self):
         """Verifica si las pulsaciones están en rango normal (60-80 BPM)"""
-        if self.id_Pulsaciones:
-            return 60 <= self.id_Pulsaciones.valor <= 80
+        valor = self.pulsaciones_valor
+        if valor is not None:
+            return 60 <= valor <= 80
         return None
 
     @property
@@ -344,6 +374,14 @@ class ControlMonitoreo(models.Model):
         null=True,
         blank=True
     )
+    uuid_cliente = models.UUIDField(
+        'UUID del cliente',
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='Id generado por la app al registrar sin conexión; hace idempotente la sincronización'
+    )
 
     class Meta:
         verbose_name = 'Control de Monitoreo'
@@ -390,4 +428,239 @@ class ControlMonitoreo(models.Model):
             else:  # temperatura > 40
                 self.estado_salud = 'Crítico'  # Fiebre alta
         
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class ResumenLecturaBase(models.Model):
+    """
+    Agregados de las lecturas de un bovino en un intervalo (rollup)
+    Se mantienen incrementalmente desde la ingesta (utils/resumenLecturas.py)
+    y se reconstruyen con el comando resumir_lecturas
+    """
+    fecha = models.DateField('Fecha', db_index=True)
+    cantidad = models.PositiveIntegerField('Lecturas', default=0)
+    temperatura_min = models.FloatField('Temperatura mínima (°C)', null=True, blank=True)
+    temperatura_max = models.FloatField('Temperatura máxima (°C)', null=True, blank=True)
+    temperatura_suma = models.FloatField('Suma de temperaturas', default=0)
+    temperatura_cantidad = models.PositiveIntegerField('Lecturas con temperatura', default=0)
+    pulsaciones_min = models.IntegerField('Pulsaciones mínimas (BPM)', null=True, blank=True)
+    pulsaciones_max = models.IntegerField('Pulsaciones máximas (BPM)', null=True, blank=True)
+    pulsaciones_suma = models.BigIntegerField('Suma de pulsaciones', default=0)
+    pulsaciones_cantidad = models.PositiveIntegerField('Lecturas con pulsaciones', default=0)
+    ultima_temperatura = models.FloatField('Última temperatura (°C)', null=True, blank=True)
+    ultimas_pulsaciones = models.IntegerField('Últimas pulsaciones (BPM)', null=True, blank=True)
+    ultima_hora = models.TimeField('Hora de la última lectura', null=True, blank=True)
+    ultima_lectura_id = models.IntegerField('ID de la última lectura', null=True, blank=True)
+    fecha_actualizacion = models.DateTimeField('Fecha de Actualización', auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def temperatura_promedio(self):
+        if not self.temperatura_cantidad:
+            return None
+        return round(self.temperatura_suma / self.temperatura_cantidad, 2)
+
+    @property
+    def pulsaciones_promedio(self):
+        if not self.pulsaciones_cantidad:
+            return None
+        return round(self.pulsaciones_suma / self.pulsaciones_cantidad, 1)
+
+
+class ResumenLecturaHora(ResumenLecturaBase):
+    """Agregados de lecturas por bovino y hora del día"""
+    id_Bovino = models.ForeignKey(
+        Bovinos,
+        on_delete=models.CASCADE,
+        related_name='resumenes_hora',
+        verbose_name='Bovino'
+    )
+    hora = models.PositiveSmallIntegerField('Hora (0-23)')
+
+    class Meta:
+        verbose_name = 'Resumen horario de lecturas'
+        verbose_name_plural = 'Resúmenes horarios de lecturas'
+        ordering = ['-fecha', '-hora']
+        unique_together = [['id_Bovino', 'fecha', 'hora']]
+
+    def __str__(self):
+        return f"{self.id_Bovino.nombre} - {self.fecha} {self.hora:02d}:00"
+
+
+class ResumenLecturaDia(ResumenLecturaBase):
+    """Agregados de lecturas por bovino y día"""
+    id_Bovino = models.ForeignKey(
+        Bovinos,
+        on_delete=models.CASCADE,
+        related_name='resumenes_dia',
+        verbose_name='Bovino'
+    )
+
+    class Meta:
+        verbose_name = 'Resumen diario de lecturas'
+        verbose_name_plural = 'Resúmenes diarios de lecturas'
+        ordering = ['-fecha']
+        unique_together = [['id_Bovino', 'fecha']]
+
+    def __str__(self):
+        return f"{self.id_Bovino.nombre} - {self.fecha}"
+
+
+class TurnoCompletado(models.Model):
+    """
+    Turno con al menos un control registrado, por bovino y fecha
+    Se mantiene desde las señales de ControlMonitoreo (utils/turnosCompletados.py)
+    y se reconstruye con el comando recalcular_turnos
+    """
+    id_Bovino = models.ForeignKey(
+        Bovinos,
+        on_delete=models.CASCADE,
+        related_name='turnos_completados',
+        verbose_name='Bovino'
+    )
+    fecha = models.DateField('Fecha')
+    turno = models.CharField('Turno', max_length=10, choices=ControlMonitoreo.TURNO_CHOICES)
+    controles = models.PositiveIntegerField('Controles en el turno', default=0)
+    ultimo_control_id = models.IntegerField('ID del último control', null=True, blank=True)
+    ultima_hora = models.TimeField('Hora del último control', null=True, blank=True)
+    fecha_actualizacion = models.DateTimeField('Fecha de Actualización', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Turno completado'
+        verbose_name_plural = 'Turnos completados'
+        ordering = ['-fecha', 'turno']
+        # (fecha, turno) primero: la lista de pendientes del hato se lee por ese prefijo
+        unique_together = [['fecha', 'turno', 'id_Bovino']]
+
+    def __str__(self):
+        return f"{self.id_Bovino.nombre} - {self.fecha} {self.turno}"
+
+
+class CambioRegistro(models.Model):
+    """
+    Diario de cambios para los clientes que consultan /api/movil/cambios/
+    Registra ediciones y borrados de lecturas, controles y bovinos (lápidas);
+    las lecturas nuevas no se registran, se leen por id_Lectura
+    """
+    TIPO_CHOICES = [
+        ('lectura', 'Lectura'),
+        ('control', 'Control de monitoreo'),
+        ('bovino', 'Bovino'),
+    ]
+    ACCION_CHOICES = [
+        ('guardado', 'Creado o actualizado'),
+        ('eliminado', 'Eliminado'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    tipo = models.CharField('Tipo', max_length=10, choices=TIPO_CHOICES)
+    objeto_id = models.IntegerField('ID del registro')
+    accion = models.CharField('Acción', max_length=10, choices=ACCION_CHOICES)
+    collar_id = models.IntegerField('ID del Collar', null=True, blank=True)
+    fecha = models.DateTimeField('Fecha del cambio', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Cambio registrado'
+        verbose_name_plural = 'Cambios registrados'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['collar_id', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.id} - {self.tipo} {self.objeto_id} {self.accion}"
+
+
+class EpisodioAnomalia(models.Model):
+    """
+    Episodio anómalo detectado sobre el historial de lecturas de un bovino
+    Lo escribe el comando detectar_anomalias (utils/deteccionAnomalias.py); un
+    episodio que sigue activo en la siguiente ejecución se extiende, no se duplica
+    """
+    TIPO_CHOICES = [
+        ('fiebre_sostenida', 'Fiebre sostenida'),
+        ('desviacion_temperatura', 'Desviación de temperatura'),
+        ('desviacion_pulsaciones', 'Desviación de pulsaciones'),
+        ('tendencia_temperatura', 'Tendencia de temperatura (EWMA)'),
+    ]
+    SEVERIDAD_CHOICES = [
+        ('Alerta', 'Alerta'),
+        ('Crítico', 'Crítico'),
+    ]
+
+    id_Bovino = models.ForeignKey(
+        Bovinos,
+        on_delete=models.CASCADE,
+        related_name='episodios_anomalia',
+        verbose_name='Bovino'
+    )
+    tipo = models.CharField('Tipo', max_length=25, choices=TIPO_CHOICES)
+    severidad = models.CharField('Severidad', max_length=10, choices=SEVERIDAD_CHOICES)
+    inicio = models.DateTimeField('Inicio')
+    fin = models.DateTimeField('Fin')
+    lecturas = models.PositiveIntegerField('Lecturas en el episodio')
+    valor_extremo = models.FloatField('Valor extremo')
+    linea_base = models.FloatField('Línea base', null=True, blank=True)
+    puntaje = models.FloatField('Puntaje máximo (z)', null=True, blank=True)
+    fecha_deteccion = models.DateTimeField('Fecha de detección', auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField('Última actualización', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Episodio de anomalía'
+        verbose_name_plural = 'Episodios de anomalía'
+        ordering = ['-inicio']
+        indexes = [
+            models.Index(fields=['-fin']),
+            models.Index(fields=['id_Bovino', '-inicio']),
+        ]
+
+    def __str__(self):
+        return f"{self.id_Bovino.nombre} - {self.get_tipo_display()} {self.inicio:%Y-%m-%d %H:%M}"
+
+
+class AlertaMonitoreo(models.Model):
+    """
+    Alerta emitida por el motor de reglas al recibir lecturas (utils/reglasAlertas.py)
+    Una alerta queda abierta (fin nulo) mientras la regla se sigue cumpliendo; las
+    repeticiones se acumulan en la misma fila en lugar de crear alertas nuevas
+    """
+    REGLA_CHOICES = [
+        ('temperatura_extrema', 'Temperatura extrema'),
+        ('fiebre_sostenida', 'Fiebre sostenida'),
+        ('subida_temperatura', 'Subida de temperatura'),
+        ('pulsaciones_anormales', 'Pulsaciones anormales'),
+    ]
+    SEVERIDAD_CHOICES = EpisodioAnomalia.SEVERIDAD_CHOICES
+
+    collar_id = models.IntegerField('ID del Collar')
+    nombre = models.CharField('Nombre del bovino', max_length=100, null=True, blank=True)
+    regla = models.CharField('Regla', max_length=25, choices=REGLA_CHOICES)
+    severidad = models.CharField('Severidad', max_length=10, choices=SEVERIDAD_CHOICES)
+    valor = models.FloatField('Valor')
+    mensaje = models.CharField('Mensaje', max_length=255)
+    inicio = models.DateTimeField('Inicio')
+    fin = models.DateTimeField('Fin', null=True, blank=True)
+    repeticiones = models.PositiveIntegerField('Repeticiones', default=1)
+    fecha_creacion = models.DateTimeField('Fecha de creación', auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField('Última actualización', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Alerta de monitoreo'
+        verbose_name_plural = 'Alertas de monitoreo'
+        ordering = ['-inicio']
+        indexes = [
+            models.Index(fields=['collar_id', 'regla', '-inicio']),
+            models.Index(fields=['-inicio']),
+        ]
+        constraints = [
+            # Una sola alerta abierta por collar y regla, aunque la abran dos workers a la vez
+            models.UniqueConstraint(
+                fields=['collar_id', 'regla'],
+                condition=models.Q(fin__isnull=True),
+                name='alerta_abierta_por_collar_y_regla',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Collar {self.collar_id} - {self.get_regla_display()} {self.inicio:%Y-%m-%d %H:%M}"
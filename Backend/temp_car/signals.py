@@ -0,0 +1,147 @@
+"""
+Señales de la app temp_car
+Propagan los cambios de ControlMonitoreo a la caché del hato, a la tabla
+de turnos completados, al diario de cambios y a las versiones por collar
+(junto con los de Lectura y Bovinos) y al canal de monitoreo en vivo, y
+mantienen al día la caché de tokens de la app móvil
+"""
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .models import Bovinos, ControlMonitoreo, Lectura
+from .utils.auth_utils import cache_tokens
+from .utils.cacheHato import cache_hato
+from .utils.calendarioTurnos import turno_de_hora
+from .utils.cambiosMovil import collar_de_lectura, registrar_cambio
+from .utils.eventosMonitoreo import publicar_control
+from .utils.resumenLecturas import programar_reconstruccion
+from .utils.turnosCompletados import clave_control, recalcular_turno
+from .utils.versionesCollar import versiones_collar
+
+
+def _registrar(tipo, objeto_id, accion, collar_id):
+    """Diario de cambios y, al confirmar, nueva versión del collar (ETag)"""
+    registrar_cambio(tipo, objeto_id, accion, collar_id)
+    if collar_id is not None:
+        transaction.on_commit(lambda: versiones_collar.incrementar(collar_id))
+
+
+@receiver(pre_save, sender=ControlMonitoreo)
+def control_por_guardar(sender, instance, raw=False, **kwargs):
+    # Al editar, el turno anterior puede quedar sin controles
+    instance._clave_turno_anterior = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    anterior = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list('id_Lectura__id_Bovino_id', 'fecha_lectura', 'hora_lectura')
+        .first()
+    )
+    if anterior is not None and anterior[0] is not None:
+        bovino_id, fecha, hora = anterior
+        instance._clave_turno_anterior = (bovino_id, fecha, turno_de_hora(hora))
+
+
+@receiver(post_save, sender=ControlMonitoreo)
+def control_guardado(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return  # loaddata
+    clave = clave_control(instance)
+    anterior = getattr(instance, '_clave_turno_anterior', None)
+    if clave is not None:
+        recalcular_turno(*clave)
+    if anterior is not None and anterior != clave:
+        recalcular_turno(*anterior)
+    _registrar(
+        'control', instance.pk, 'guardado',
+        collar_de_lectura(instance.id_Lectura_id, ControlMonitoreo.id_Lectura.field.get_cached_value(instance, None)),
+    )
+    if instance.id_Lectura_id is not None:
+        transaction.on_commit(lambda: cache_hato.actualizar_control(instance))
+    publicar_control(instance, 'creado' if created else 'actualizado')
+
+
+@receiver(post_delete, sender=ControlMonitoreo)
+def control_eliminado(sender, instance, origin=None, **kwargs):
+    clave = clave_control(instance)
+    if clave is not None:
+        recalcular_turno(*clave)
+    if not isinstance(origin, Bovinos):
+        # Al borrar el bovino basta su lápida en el diario
+        _registrar('control', instance.pk, 'eliminado', collar_de_lectura(instance.id_Lectura_id))
+    try:
+        if instance.id_Lectura_id is not None:
+            collar_id = instance.id_Lectura.id_Bovino.idCollar
+            transaction.on_commit(lambda: cache_hato.invalidar_collar(collar_id))
+        publicar_control(instance, 'eliminado')
+    except ObjectDoesNotExist:
+        pass  # Borrado en cascada junto con su lectura
+
+
+@receiver(pre_save, sender=Lectura)
+def lectura_por_guardar(sender, instance, raw=False, **kwargs):
+    # Al editar, el día anterior (si cambió de bovino o de fecha) también pierde la lectura
+    instance._dia_anterior = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._dia_anterior = (
+        sender.objects.filter(pk=instance.pk).values_list('id_Bovino_id', 'fecha_lectura').first()
+    )
+
+
+@receiver(post_save, sender=Lectura)
+def lectura_guardada(sender, instance, created, raw=False, **kwargs):
+    # Las lecturas nuevas se leen por id_Lectura y ya se sumaron a los
+    # resúmenes al ingresar; el diario y la reconstrucción solo cubren ediciones
+    if raw or created:
+        return
+    _registrar('lectura', instance.pk, 'guardado', collar_de_lectura(instance.pk))
+    anterior = getattr(instance, '_dia_anterior', None)
+    if anterior is not None:
+        programar_reconstruccion(*anterior, instance)
+    programar_reconstruccion(instance.id_Bovino_id, instance.fecha_lectura, instance)
+
+
+@receiver(post_delete, sender=Lectura)
+def lectura_eliminada(sender, instance, origin=None, **kwargs):
+    # Al borrar el bovino sus resúmenes se borran en cascada junto con las lecturas
+    if not isinstance(origin, Bovinos):
+        _registrar('lectura', instance.pk, 'eliminado', collar_de_lectura(instance.pk))
+        programar_reconstruccion(instance.id_Bovino_id, instance.fecha_lectura, origin)
+
+
+@receiver(post_save, sender=Bovinos)
+def bovino_guardado(sender, instance, created, raw=False, **kwargs):
+    # Nombre o estado activo: el feed de cambios lo ignora, pero invalida los ETag del collar
+    if raw or created:
+        return
+    _registrar('bovino', instance.pk, 'guardado', instance.idCollar)
+
+
+@receiver(post_delete, sender=Bovinos)
+def bovino_eliminado(sender, instance, **kwargs):
+    _registrar('bovino', instance.pk, 'eliminado', instance.idCollar)
+
+
+@receiver(post_delete, sender=Token)
+def token_eliminado(sender, instance, **kwargs):
+    cache_tokens.invalidar(clave=instance.key)
+
+
+@receiver(post_save, sender=Token)
+def token_guardado(sender, instance, **kwargs):
+    # Token regenerado: el anterior deja de resolver
+    cache_tokens.invalidar(usuario_id=instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def usuario_modificado(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return  # Solo el login: no cambia la identidad ni el estado
+    cache_tokens.invalidar(usuario_id=instance.pk)
@@ -28,9 +28,19 @@ urlpatterns = [
     path('reportes/', reportes, name='reportes'), 
     path('temperatura/', temperatura, name='temperatura'), 
     path('frecuencia/', frecuencia, name='frecuencia'),
-    path('generar_pdf/', reporte_pdf, name='generar_pdf'),
+    path('generar_pdf/', reporte_pdf, name='generar_pdf'),  # Sirve el PDF en caché o encola su generación
+    path('generar_pdf/estado/<str:trabajo_id>/', views.estado_reporte_pdf, name='estado_pdf'),
+    path('generar_pdf/descargar/<str:trabajo_id>/', views.descargar_reporte_pdf, name='descargar_pdf'),
+    path('reportes/export.csv', views.exportar_reportes_csv, name='exportar_reportes_csv'),  # CSV en streaming con filtros
+    path('reportes/export.xlsx', views.exportar_reportes_xlsx, name='exportar_reportes_xlsx'),  # Excel write-only con filtros
     path('monitor/datos/<int:id_collar>/', views.dashBoardData, name='datos'),
-    path('ultimo/registro/<int:collar_id>', views.ultimoRegistro, name='ultimo_registro'),    
+    path('monitor/serie/<int:id_collar>/', views.monitorSerie, name='monitor_serie'),  # Series del rango reducidas con LTTB
+    path('monitor/anomalias/', views.monitorAnomalias, name='monitor_anomalias'),  # Episodios anómalos detectados sobre el historial
+    path('ultimo/registro/<int:collar_id>', views.ultimoRegistro, name='ultimo_registro'),
+    path('monitor/stream/', views.monitorStream, name='monitor_stream'),  # SSE con lecturas y controles en vivo
+    path('monitor/herd/', views.monitorHato, name='monitor_hato'),  # Último estado de todo el hato desde caché    
+    path('monitor/cambios/', views.monitorCambios, name='monitor_cambios'),  # Lecturas, controles y borrados desde un cursor
+    path('metrics', views.metricasPrometheus, name='metricas'),  # Métricas de rendimiento por vista (Prometheus)
     
 
     
@@ -39,9 +49,13 @@ urlpatterns = [
     #Rutas de Plataforma Movil  
     ######################################
     path('api/movil/login/', LoginView1.as_view(), name='api-login'),                     # Api para el login
+    path('api/movil/logout/', views.logout_movil, name='api-logout'),                     # Api para revocar el token
     path('api/movil/datos/', views.registrar_datos_sensores, name='registrar_sensores'),  # Api POST para registrar datos de sensores
     path('api/movil/datos/<int:collar_id>/', views.obtener_datos_collar, name='datos_collar_get'),  # Api GET para obtener datos por collar ID
     path('api/movil/verificar-lectura/<int:collar_id>/', views.verificar_lectura_turno, name='verificar_lectura'),  # Api GET para verificar lectura del turno
+    path('api/movil/turno/pendientes/', views.pendientes_turno_hato, name='turno_pendientes'),  # Api GET con los bovinos sin control en el turno
+    path('api/movil/sync/', views.sincronizar_movil, name='sync_movil'),  # Api POST con los controles registrados sin conexión
+    path('api/movil/cambios/', views.cambios_movil, name='cambios_movil'),  # Api GET con los cambios desde un cursor
     path('api/editar/<int:user_id>/', views.apiEdit, name='editar'),  # Api para editar usuario
     #############################################################
     
@@ -51,6 +65,7 @@ urlpatterns = [
     ######################################
     path('api/arduino/monitoreo/', views.lecturaDatosArduino, name='recibir_datos2'),
     path('api/arduino/monitoreo', views.lecturaDatosArduino, name='recibir_datos'),  # Sin slash final para POST sin redirección
+    path('api/arduino/monitoreo/batch', views.lecturaDatosArduinoLote, name='recibir_datos_lote'),  # Lote de lecturas de varios collares
     
     ######################################
     # CONTROLES DE MONITOREO
@@ -67,6 +82,8 @@ urlpatterns = [
     path('logs/download/<str:filename>/', get_log_file, name='download_log'),
     path('logs/clear/<str:filename>/', clear_log_file, name='clear_log'),
     path('logs/stats/', logs_api_stats, name='logs_stats'),
+    path('logs/search/', search_logs, name='search_logs'),
+    path('logs/stream/<str:filename>/', stream_log, name='stream_log'),
     ######################################
 
 ]
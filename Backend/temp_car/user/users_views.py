@@ -20,6 +20,7 @@ from django.views import View
 from django.views.decorators.csrf import ensure_csrf_cookie
 
 # Local imports
+from temp_car.logging_utils import api_logger
 from temp_car.forms import PersonalInfoForm, EditPersonalInfoForm, EditUserForm
 from temp_car.models import PersonalInfo
 
@@ -247,7 +248,7 @@ def desactivar_usuario(request, usuario_id):
         usuario.save()
         
     except Exception as e:
-        print(f'Error al cambiar estado del usuario: {str(e)}')
+        api_logger.exception('USUARIOS | Error al cambiar estado del usuario: %s', e)
     
     return redirect('gestion')
 
@@ -385,7 +386,7 @@ class CustomPasswordResetView(View):
                     return redirect('passwordResetDone')
                     
                 except Exception as e:
-                    print(f'Error al enviar el correo: {str(e)}')
+                    api_logger.exception('USUARIOS | Error al enviar el correo: %s', e)
             else:
                 # Por seguridad, no revelamos si el email existe o no
                 messages.info(request, 'Si el correo existe en nuestro sistema, recibirá instrucciones para restablecer su contraseña.')
@@ -463,7 +464,7 @@ class CustomPasswordResetConfirmView(View):
                 # Mostrar errores de validación
                 for field, errors in form.errors.items():
                     for error in errors:
-                        print(f'Error en {field}: {error}')
+                        api_logger.warning('USUARIOS | Error en %s: %s', field, error)
             
             return render(request, self.template_name, {
                 'form': form,
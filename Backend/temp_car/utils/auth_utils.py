@@ -1,11 +1,18 @@
 """
 Utilidades de autenticación para APIs
-Soporta autenticación por API Key para dispositivos Arduino
+Soporta autenticación por API Key para dispositivos Arduino y por token
+(rest_framework.authtoken) para la app móvil
 """
 
+import threading
+import time as pytime
 from functools import wraps
 from django.http import JsonResponse
 from django.conf import settings
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.authtoken.models import Token
+
+from temp_car.logging_utils import ArduinoLogger
 
 # Clave API configurada en settings o variable de entorno
 ARDUINO_API_KEY = getattr(settings, 'ARDUINO_API_KEY', 'sk_test_controlbovino_2024')
@@ -21,6 +28,7 @@ def require_api_key(view_func):
         auth_header = request.headers.get('Authorization', '')
         
         if not auth_header:
+            ArduinoLogger.log_arduino_auth_error("Authorization header faltante")
             return JsonResponse({
                 'error': 'No autorizado',
                 'detalle': 'Se requiere header Authorization'
@@ -29,6 +37,7 @@ def require_api_key(view_func):
         # Validar formato "Bearer TOKEN"
         parts = auth_header.split()
         if len(parts) != 2 or parts[0] != 'Bearer':
+            ArduinoLogger.log_arduino_auth_error("Formato Authorization inválido")
             return JsonResponse({
                 'error': 'No autorizado',
                 'detalle': 'Formato inválido: Bearer TOKEN'
@@ -38,13 +47,12 @@ def require_api_key(view_func):
         
         # Validar clave
         if api_key != ARDUINO_API_KEY:
-            print(f"[AUTH] ❌ API Key inválida: {api_key[:10]}...")
+            ArduinoLogger.log_arduino_auth_error("API Key inválida")
             return JsonResponse({
                 'error': 'No autorizado',
                 'detalle': 'API Key inválida'
             }, status=401)
         
-        print(f"[AUTH] ✅ API Key válida")
         return view_func(request, *args, **kwargs)
     
     return wrapper
@@ -65,3 +73,104 @@ def get_api_key_from_request(request):
         return parts[1]
     
     return None
+
+
+# ============================================================================
+# Token de la app móvil (rest_framework.authtoken) con caché en memoria
+# ============================================================================
+
+# Prefijos aceptados en Authorization: "Token <clave>" (DRF) o "Bearer <clave>"
+PREFIJOS_TOKEN = ('Token', 'Bearer')
+
+# Entradas máximas en la caché por proceso
+TOKENS_EN_CACHE_MAXIMO = 10000
+
+
+class CacheTokens:
+    """
+    Resolución token -> usuario en memoria del proceso, con TTL
+
+    Evita cargar authtoken_token y auth_user en cada petición móvil: el
+    usuario se conserva API_MOVIL_TOKEN_TTL segundos. Las señales invalidan
+    la entrada de este proceso al borrar o regenerar el token y al guardar
+    el usuario (p. ej. al desactivarlo); para los cambios hechos en otros
+    workers, cada API_MOVIL_TOKEN_REVALIDACION segundos se comprueba en la
+    base que el token siga existiendo y su usuario activo (una consulta por
+    la clave primaria), de modo que un logout se nota en todos los workers
+    a lo sumo tras ese intervalo.
+    """
+
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def usuario(self, clave):
+        """Usuario activo del token, o None si no existe"""
+        ahora = pytime.monotonic()
+        entrada = self._tokens.get(clave)
+        if entrada is not None and entrada[1] > ahora:
+            if entrada[2] > ahora:
+                return entrada[0]
+            if Token.objects.filter(key=clave, user__is_active=True).exists():
+                with self._lock:
+                    if clave in self._tokens:
+                        self._tokens[clave] = (entrada[0], entrada[1], ahora + settings.API_MOVIL_TOKEN_REVALIDACION)
+                return entrada[0]
+            self.invalidar(clave)
+            return None
+
+        token = Token.objects.select_related('user').filter(key=clave).first()
+        if token is None or not token.user.is_active:
+            self.invalidar(clave)
+            return None
+
+        with self._lock:
+            if len(self._tokens) >= TOKENS_EN_CACHE_MAXIMO:
+                self._tokens = {k: e for k, e in self._tokens.items() if e[1] > ahora}
+                if len(self._tokens) >= TOKENS_EN_CACHE_MAXIMO:
+                    self._tokens.clear()
+            self._tokens[clave] = (
+                token.user,
+                ahora + settings.API_MOVIL_TOKEN_TTL,
+                ahora + settings.API_MOVIL_TOKEN_REVALIDACION,
+            )
+        return token.user
+
+    def invalidar(self, clave=None, usuario_id=None):
+        """Quita un token o todos los de un usuario"""
+        with self._lock:
+            if clave is not None:
+                self._tokens.pop(clave, None)
+            if usuario_id is not None:
+                for k in [k for k, e in self._tokens.items() if e[0].pk == usuario_id]:
+                    del self._tokens[k]
+
+
+cache_tokens = CacheTokens()
+
+
+def token_de_request(request):
+    """Clave del token en Authorization ("Token <clave>" o "Bearer <clave>"), o None"""
+    partes = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(partes) == 2 and partes[0] in PREFIJOS_TOKEN:
+        return partes[1]
+    return None
+
+
+class TokenMovilAuthentication(BaseAuthentication):
+    """
+    Autenticación DRF con el token que resolvió TokenMovilMiddleware
+
+    Solo aplica a las rutas móviles; en el resto (p. ej. las vistas del
+    Arduino, que usan Bearer con la API Key) no interviene.
+    """
+
+    def authenticate(self, request):
+        original = request._request
+        clave = getattr(original, 'token_movil', None)
+        if clave is None:
+            return None
+        return (original.user, clave)
+
+    def authenticate_header(self, request):
+        return 'Token'
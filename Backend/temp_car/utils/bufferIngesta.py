@@ -0,0 +1,352 @@
+"""
+Buffer de escritura diferida para la ingesta de lecturas del Arduino
+
+En modo 'diferido' la vista valida la lectura, la agrega a un spool en disco
+(archivo de solo-anexado) y a una cola acotada en memoria, y responde 202 de
+inmediato. Un hilo en segundo plano confirma las lecturas en la base de datos
+por lotes, cuando la cola alcanza el tamaño de lote o cuando vence el
+intervalo de vaciado.
+
+Cada proceso (worker de gunicorn) mantiene su propio spool bloqueado con
+flock. Al arrancar, el buffer reproduce los spools huérfanos de procesos que
+terminaron sin vaciar su cola, de modo que las lecturas sobreviven a reinicios.
+La entrega es "al menos una vez": si el proceso cae justo después de confirmar
+un lote y antes de registrar el offset, ese lote se vuelve a insertar.
+
+Si un lote falla se reintenta lectura por lectura. Las lecturas que vuelven a
+fallar con la base de datos disponible se apartan en ARCHIVO_RECHAZADAS (una
+línea JSON por lectura, con el error) y la cola avanza: una lectura inválida
+no bloquea el buffer ni se reproduce en cada arranque. Solo si la base de
+datos no responde las lecturas quedan en la cola para el próximo vaciado.
+"""
+
+import atexit
+import glob
+import json
+import logging
+import math
+import os
+import threading
+import time as pytime
+from collections import deque
+from datetime import date, time
+
+try:
+    import fcntl
+except ImportError:  # Windows (desarrollo)
+    fcntl = None
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .ingestaArduino import guardar_lecturas_lote
+
+logger = logging.getLogger('temp_car')
+
+PREFIJO_SPOOL = 'ingesta_'
+# Lecturas que la base de datos rechaza (fuera del patrón de los spools)
+ARCHIVO_RECHAZADAS = 'rechazadas.jsonl'
+
+
+class BufferLleno(Exception):
+    """El buffer alcanzó su capacidad máxima"""
+
+    def __init__(self, reintentar_en):
+        super().__init__('Buffer de ingesta lleno')
+        self.reintentar_en = reintentar_en
+
+
+def _a_json(lectura):
+    """Serializa una lectura normalizada a una línea del spool"""
+    datos = dict(lectura)
+    datos['fecha_lectura'] = lectura['fecha_lectura'].isoformat()
+    datos['hora_lectura'] = lectura['hora_lectura'].isoformat()
+    return (json.dumps(datos, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def _desde_json(linea):
+    """Reconstruye una lectura normalizada desde una línea del spool"""
+    datos = json.loads(linea)
+    datos['fecha_lectura'] = date.fromisoformat(datos['fecha_lectura'])
+    datos['hora_lectura'] = time.fromisoformat(datos['hora_lectura'])
+    return datos
+
+
+def _bloquear(archivo):
+    """Intenta tomar un bloqueo exclusivo no bloqueante sobre el archivo"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _leer_offset(ruta_offset):
+    try:
+        with open(ruta_offset, 'r') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _base_disponible():
+    """Indica si la base de datos responde (tras un error se abre una conexión nueva)"""
+    try:
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True
+    except Exception:
+        return False
+
+
+def _escribir_offset(ruta_offset, offset):
+    temporal = f'{ruta_offset}.tmp'
+    with open(temporal, 'w') as f:
+        f.write(str(offset))
+    os.replace(temporal, ruta_offset)
+
+
+class BufferIngesta:
+    """Cola acotada con spool en disco y vaciado por lotes en segundo plano"""
+
+    def __init__(self, directorio, capacidad, lote, intervalo, fsync=False):
+        self.directorio = directorio
+        self.capacidad = capacidad
+        self.lote = lote
+        self.intervalo = intervalo
+        self.fsync = fsync
+
+        os.makedirs(directorio, exist_ok=True)
+        self.ruta_spool = os.path.join(directorio, f'{PREFIJO_SPOOL}{os.getpid()}.jsonl')
+        self.ruta_offset = f'{self.ruta_spool}.offset'
+        self.ruta_rechazadas = os.path.join(directorio, ARCHIVO_RECHAZADAS)
+        self._apartar_spool_previo()
+
+        self._cola = deque()
+        self._condicion = threading.Condition()
+        self._vaciando = threading.Lock()
+        self._detenido = False
+
+        self._spool = open(self.ruta_spool, 'ab')
+        _bloquear(self._spool)
+        self._escrito = self._spool.tell()
+
+        self._hilo = threading.Thread(target=self._bucle, name='buffer-ingesta', daemon=True)
+
+    def _apartar_spool_previo(self):
+        """Renombra un spool previo con el mismo PID (PID reutilizado) para reproducirlo"""
+        if os.path.exists(self.ruta_spool) and os.path.getsize(self.ruta_spool) > 0:
+            destino = os.path.join(
+                self.directorio,
+                f'{PREFIJO_SPOOL}{os.getpid()}-{int(pytime.time())}.jsonl'
+            )
+            os.replace(self.ruta_spool, destino)
+            if os.path.exists(self.ruta_offset):
+                os.replace(self.ruta_offset, f'{destino}.offset')
+
+    def iniciar(self):
+        self._hilo.start()
+        atexit.register(self.detener)
+
+    @property
+    def reintentar_en(self):
+        """Segundos sugeridos para el header Retry-After"""
+        return max(1, math.ceil(self.intervalo))
+
+    def pendientes(self):
+        return len(self._cola)
+
+    def agregar(self, lecturas):
+        """
+        Agrega lecturas normalizadas al spool y a la cola
+
+        El lote se acepta completo o se rechaza completo con BufferLleno
+        """
+        lineas = [_a_json(lectura) for lectura in lecturas]
+
+        with self._condicion:
+            if len(self._cola) + len(lecturas) > self.capacidad:
+                raise BufferLleno(self.reintentar_en)
+
+            self._spool.write(b''.join(lineas))
+            self._spool.flush()
+            if self.fsync:
+                os.fsync(self._spool.fileno())
+
+            for lectura, linea in zip(lecturas, lineas):
+                self._escrito += len(linea)
+                self._cola.append((lectura, self._escrito))
+
+            if len(self._cola) >= self.lote:
+                self._condicion.notify()
+
+    def vaciar(self):
+        """Confirma en la base de datos todas las lecturas pendientes"""
+        with self._vaciando:
+            while True:
+                with self._condicion:
+                    tomadas = [self._cola[i] for i in range(min(self.lote, len(self._cola)))]
+                if not tomadas:
+                    return
+
+                resueltas = self._guardar(tomadas)
+                if resueltas:
+                    with self._condicion:
+                        for _ in range(resueltas):
+                            self._cola.popleft()
+                        self._registrar_confirmado(tomadas[resueltas - 1][1])
+                if resueltas < len(tomadas):
+                    return  # Base de datos no disponible: se reintenta en el próximo vaciado
+
+    def _guardar(self, tomadas):
+        """
+        Guarda un tramo de [(lectura, offset)] en la base de datos
+
+        Si el lote falla se reintenta lectura por lectura y las que vuelven a
+        fallar se apartan con _rechazar.
+
+        Returns:
+            cantidad de lecturas del inicio del tramo ya resueltas (guardadas
+            o rechazadas); es menor que len(tomadas) solo si la base de datos
+            no está disponible
+        """
+        close_old_connections()
+        try:
+            try:
+                guardar_lecturas_lote([lectura for lectura, _ in tomadas])
+                return len(tomadas)
+            except Exception as e:
+                logger.warning(
+                    f"BUFFER INGESTA | Error guardando lote de {len(tomadas)} lecturas, "
+                    f"se reintenta una por una: {type(e).__name__}: {str(e)}"
+                )
+
+            for resueltas, (lectura, _) in enumerate(tomadas):
+                try:
+                    guardar_lecturas_lote([lectura])
+                except Exception as e:
+                    if not _base_disponible():
+                        logger.error(
+                            f"BUFFER INGESTA | Base de datos no disponible, "
+                            f"{len(tomadas) - resueltas} lecturas siguen pendientes: {str(e)}"
+                        )
+                        return resueltas
+                    self._rechazar(lectura, e)
+            return len(tomadas)
+        finally:
+            connection.close()
+
+    def _rechazar(self, lectura, error):
+        """Aparta una lectura que la base de datos rechaza en el archivo de rechazadas"""
+        detalle = f'{type(error).__name__}: {error}'
+        with open(self.ruta_rechazadas, 'ab') as archivo:
+            archivo.write(_a_json(dict(lectura, error=detalle)))
+        logger.error(
+            f"BUFFER INGESTA | Lectura del collar {lectura.get('collar_id')} rechazada "
+            f"y apartada en {ARCHIVO_RECHAZADAS}: {detalle}"
+        )
+
+    def _registrar_confirmado(self, offset):
+        """Persiste el offset confirmado; con la cola vacía trunca el spool"""
+        if not self._cola:
+            self._spool.truncate(0)
+            self._spool.seek(0)
+            self._escrito = 0
+            if os.path.exists(self.ruta_offset):
+                os.remove(self.ruta_offset)
+        else:
+            _escribir_offset(self.ruta_offset, offset)
+
+    def _bucle(self):
+        self.reproducir_huerfanos()
+        while not self._detenido:
+            with self._condicion:
+                if len(self._cola) < self.lote:
+                    self._condicion.wait(timeout=self.intervalo)
+            self.vaciar()
+
+    def detener(self):
+        self._detenido = True
+        with self._condicion:
+            self._condicion.notify()
+        self.vaciar()
+
+    def reproducir_huerfanos(self):
+        """Reproduce los spools de procesos que terminaron con lecturas pendientes"""
+        patron = os.path.join(self.directorio, f'{PREFIJO_SPOOL}*.jsonl')
+        for ruta in glob.glob(patron):
+            if ruta == self.ruta_spool:
+                continue
+            try:
+                self._reproducir_spool(ruta)
+            except Exception as e:
+                logger.error(f"BUFFER INGESTA | Error reproduciendo spool {ruta}: {str(e)}")
+
+    def _reproducir_spool(self, ruta):
+        ruta_offset = f'{ruta}.offset'
+        total = 0
+        with open(ruta, 'rb') as archivo:
+            if not _bloquear(archivo):
+                return  # El spool pertenece a un proceso vivo
+
+            offset = _leer_offset(ruta_offset)
+            archivo.seek(offset)
+            pendientes = []
+            for linea in archivo:
+                if not linea.endswith(b'\n'):
+                    break  # Escritura interrumpida por la caída del proceso
+                offset += len(linea)
+                pendientes.append((_desde_json(linea), offset))
+
+            for inicio in range(0, len(pendientes), self.lote):
+                tramo = pendientes[inicio:inicio + self.lote]
+                resueltas = self._guardar(tramo)
+                if resueltas:
+                    _escribir_offset(ruta_offset, tramo[resueltas - 1][1])
+                    total += resueltas
+                if resueltas < len(tramo):
+                    logger.error(
+                        f"BUFFER INGESTA | Spool {os.path.basename(ruta)} conservado para el próximo "
+                        f"arranque: {len(pendientes) - inicio - resueltas} lecturas pendientes"
+                    )
+                    return
+
+        os.remove(ruta)
+        if os.path.exists(ruta_offset):
+            os.remove(ruta_offset)
+        logger.info(f"BUFFER INGESTA | Spool {os.path.basename(ruta)} reproducido: {total} lecturas")
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def ingesta_diferida_activa():
+    return settings.ARDUINO_INGESTA_MODO == 'diferido'
+
+
+def obtener_buffer_ingesta():
+    """Retorna el buffer del proceso actual, creándolo e iniciándolo si no existe"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                buffer = BufferIngesta(
+                    directorio=settings.ARDUINO_BUFFER_DIRECTORIO,
+                    capacidad=settings.ARDUINO_BUFFER_CAPACIDAD,
+                    lote=settings.ARDUINO_BUFFER_LOTE,
+                    intervalo=settings.ARDUINO_BUFFER_INTERVALO,
+                    fsync=settings.ARDUINO_BUFFER_FSYNC,
+                )
+                buffer.iniciar()
+                _buffer = buffer
+    return _buffer
+
+
+def iniciar_buffer_ingesta():
+    """Inicia el buffer al arrancar el servidor si el modo diferido está activo"""
+    if ingesta_diferida_activa():
+        obtener_buffer_ingesta()
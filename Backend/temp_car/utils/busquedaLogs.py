@@ -0,0 +1,479 @@
+"""
+Búsqueda de texto completo en los logs (actuales y rotados) con SQLite FTS5
+
+Cada línea de los archivos de LOGS_DIR (django.log, django.log.1 ... .5,
+apis.log*, errors.log*, estructurado.log* ...) se guarda en una base SQLite
+aparte (LOGS_BUSQUEDA_DB) con su archivo, offset en bytes, fecha, nivel,
+logger, collar e id de petición, y el texto en una tabla FTS5. Las líneas de
+continuación (trazas de excepciones) heredan los datos de la última línea con
+encabezado.
+
+El índice es incremental: por cada archivo se recuerda hasta qué offset se
+indexó y solo se leen los bytes agregados. Los archivos se identifican por
+(dispositivo, inodo) igual que en lectorLogs, así que al rotar no se vuelve
+a indexar nada; cuando un respaldo viejo desaparece se borran sus líneas.
+La búsqueda pone al día el índice con un límite de bytes por petición y el
+comando `indexar_logs` lo mantiene al día de forma programada.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time as pytime
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+from .lectorLogs import listar_logs
+
+# Bytes de log nuevos que indexa como máximo una búsqueda antes de responder
+LIMITE_BYTES_BUSQUEDA = 2 * 1024 * 1024
+LINEAS_POR_TRANSACCION = 5000
+LARGO_MAXIMO_TEXTO = 2000
+TAMANO_PAGINA = 50
+TAMANO_PAGINA_MAXIMO = 500
+
+_BYTES_HUELLA = 64
+
+NIVELES = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR,
+    'CRITICAL': logging.CRITICAL,
+}
+
+# Formatos de settings.LOGGING: 'verbose' y 'api_format'
+_VERBOSE = re.compile(
+    r'^\[(?P<nivel>[A-Z]+)\] (?P<fecha>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) \| (?P<logger>[\w.]+) \| '
+)
+_API = re.compile(
+    r'^\[API\] (?P<fecha>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) \| (?P<logger>[\w.]+) \| (?P<nivel>[A-Z]+) \| '
+)
+_COLLAR = re.compile(r'collar(?:_id)?["\']?\s*[:=]?\s*(\d+)', re.IGNORECASE)
+_REQUEST_ID = re.compile(r'request_id["\']?\s*[:=]\s*["\']?([A-Za-z0-9._-]{1,64})')
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS archivos (
+    clave TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    huella TEXT NOT NULL,
+    contexto TEXT
+);
+CREATE TABLE IF NOT EXISTS lineas (
+    id INTEGER PRIMARY KEY,
+    archivo TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    nivel INTEGER,
+    logger TEXT,
+    collar INTEGER,
+    request_id TEXT,
+    texto TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lineas_archivo ON lineas (archivo);
+CREATE INDEX IF NOT EXISTS lineas_ts ON lineas (ts, id);
+CREATE INDEX IF NOT EXISTS lineas_collar_ts ON lineas (collar, ts, id);
+CREATE INDEX IF NOT EXISTS lineas_request ON lineas (request_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS lineas_fts USING fts5 (
+    texto, content='lineas', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+_lock = threading.Lock()
+_esquema_creado = set()
+
+
+# ----------------------------------------------------------------------
+# Conexión
+# ----------------------------------------------------------------------
+
+def _conectar():
+    ruta = Path(settings.LOGS_BUSQUEDA_DB)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    conexion = sqlite3.connect(str(ruta), timeout=10, isolation_level=None)
+    conexion.execute('PRAGMA journal_mode=WAL')
+    conexion.execute('PRAGMA synchronous=NORMAL')
+    if str(ruta) not in _esquema_creado:
+        conexion.executescript(_ESQUEMA)
+        _esquema_creado.add(str(ruta))
+    return conexion
+
+
+# ----------------------------------------------------------------------
+# Interpretación de líneas
+# ----------------------------------------------------------------------
+
+def _marca_tiempo(texto):
+    """'YYYY-MM-DD HH:MM:SS' en hora local (la de asctime) a segundos epoch"""
+    return pytime.mktime(datetime.strptime(texto, '%Y-%m-%d %H:%M:%S').timetuple())
+
+
+def interpretar_linea(texto, contexto):
+    """
+    Datos de búsqueda de una línea de log
+
+    Args:
+        texto: línea decodificada, sin el salto final
+        contexto: datos de la última línea con encabezado del mismo archivo
+            (ts, nivel, logger, collar, request_id); las líneas de
+            continuación los heredan
+
+    Returns:
+        (datos, nuevo_contexto)
+    """
+    datos = None
+    if texto.startswith('{'):
+        try:
+            registro = json.loads(texto)
+        except ValueError:
+            registro = None
+        if isinstance(registro, dict) and 'nivel' in registro:
+            extra = registro.get('datos') or {}
+            try:
+                ts = datetime.fromisoformat(registro['ts']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                ts = contexto.get('ts')
+            datos = {
+                'ts': ts,
+                'nivel': NIVELES.get(registro.get('nivel')),
+                'logger': registro.get('logger'),
+                'collar': extra.get('collar_id'),
+                'request_id': registro.get('request_id') if registro.get('request_id') != '-' else None,
+            }
+            if datos['collar'] is None:
+                coincidencia = _COLLAR.search(registro.get('mensaje', ''))
+                datos['collar'] = coincidencia.group(1) if coincidencia else None
+
+    if datos is None:
+        encabezado = _VERBOSE.match(texto) or _API.match(texto)
+        if encabezado:
+            try:
+                ts = _marca_tiempo(encabezado.group('fecha'))
+            except ValueError:
+                ts = contexto.get('ts')
+            coincidencia = _COLLAR.search(texto, encabezado.end())
+            request_id = _REQUEST_ID.search(texto, encabezado.end())
+            datos = {
+                'ts': ts,
+                'nivel': NIVELES.get(encabezado.group('nivel')),
+                'logger': encabezado.group('logger'),
+                'collar': coincidencia.group(1) if coincidencia else None,
+                'request_id': request_id.group(1) if request_id else None,
+            }
+
+    if datos is None:
+        # Continuación (traza, cuerpo multilínea): hereda el encabezado anterior
+        datos = dict(contexto)
+        coincidencia = _COLLAR.search(texto)
+        if coincidencia:
+            datos['collar'] = _collar(coincidencia.group(1))
+        return datos, contexto
+
+    datos['collar'] = _collar(datos['collar'])
+    return datos, datos
+
+
+def _collar(valor):
+    """idCollar como entero, o None si no es número o no cabe en INTEGER de SQLite"""
+    try:
+        collar = int(valor)
+    except (TypeError, ValueError):
+        return None
+    return collar if -2 ** 63 <= collar < 2 ** 63 else None
+
+
+# ----------------------------------------------------------------------
+# Indexación
+# ----------------------------------------------------------------------
+
+def _clave_archivo(estado):
+    return f'{estado.st_dev}:{estado.st_ino}'
+
+
+def _borrar_archivo(conexion, clave):
+    conexion.execute(
+        "INSERT INTO lineas_fts (lineas_fts, rowid, texto) SELECT 'delete', id, texto FROM lineas WHERE archivo = ?",
+        (clave,),
+    )
+    conexion.execute('DELETE FROM lineas WHERE archivo = ?', (clave,))
+    conexion.execute('DELETE FROM archivos WHERE clave = ?', (clave,))
+
+
+def _indexar_archivo(conexion, nombre, ruta, limite_bytes):
+    """
+    Indexa las líneas completas agregadas al archivo desde la última vez
+
+    Returns:
+        (bytes leídos, True si el archivo quedó al día)
+    """
+    try:
+        f = open(ruta, 'rb')
+    except OSError:
+        return 0, True
+
+    with f:
+        estado = os.fstat(f.fileno())
+        clave = _clave_archivo(estado)
+        huella = f.read(_BYTES_HUELLA).hex()
+
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            fila = conexion.execute(
+                'SELECT offset, huella, contexto FROM archivos WHERE clave = ?', (clave,)
+            ).fetchone()
+            if fila is not None:
+                offset, huella_guardada, contexto = fila
+                comun = min(len(huella), len(huella_guardada))
+                if estado.st_size < offset or huella[:comun] != huella_guardada[:comun]:
+                    # Archivo vaciado o inodo reutilizado: se indexa de nuevo
+                    _borrar_archivo(conexion, clave)
+                    fila = None
+            if fila is None:
+                offset, contexto = 0, None
+                conexion.execute(
+                    'INSERT INTO archivos (clave, nombre, offset, huella, contexto) VALUES (?, ?, 0, ?, NULL)',
+                    (clave, nombre, huella),
+                )
+            contexto = json.loads(contexto) if contexto else {}
+
+            f.seek(offset)
+            leidos = 0
+            filas = []
+            # Los respaldos rotados ya no crecen: su última línea puede no tener salto
+            rotado = not nombre.endswith('.log')
+            while leidos < limite_bytes:
+                linea = f.readline()
+                if not linea or (not linea.endswith(b'\n') and not rotado):
+                    # La última línea aún se está escribiendo
+                    break
+                texto = linea.rstrip(b'\r\n').decode('utf-8', errors='replace')
+                if texto.strip():
+                    datos, contexto = interpretar_linea(texto, contexto)
+                    filas.append((
+                        clave, offset + leidos, datos.get('ts') or 0, datos.get('nivel'), datos.get('logger'),
+                        datos.get('collar'), datos.get('request_id'), texto[:LARGO_MAXIMO_TEXTO],
+                    ))
+                leidos += len(linea)
+                if len(filas) >= LINEAS_POR_TRANSACCION:
+                    _insertar(conexion, filas)
+                    filas = []
+            _insertar(conexion, filas)
+
+            conexion.execute(
+                'UPDATE archivos SET nombre = ?, offset = ?, huella = ?, contexto = ? WHERE clave = ?',
+                (nombre, offset + leidos, huella, json.dumps(contexto), clave),
+            )
+            conexion.execute('COMMIT')
+        except BaseException:
+            conexion.execute('ROLLBACK')
+            raise
+
+    return leidos, offset + leidos >= estado.st_size or leidos < limite_bytes
+
+
+def _insertar(conexion, filas):
+    if not filas:
+        return
+    ultimo = conexion.execute('SELECT COALESCE(MAX(id), 0) FROM lineas').fetchone()[0]
+    conexion.executemany(
+        'INSERT INTO lineas (archivo, offset, ts, nivel, logger, collar, request_id, texto) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        filas,
+    )
+    conexion.execute('INSERT INTO lineas_fts (rowid, texto) SELECT id, texto FROM lineas WHERE id > ?', (ultimo,))
+
+
+def actualizar_indice(limite_bytes=None):
+    """
+    Pone al día el índice con los archivos de LOGS_DIR
+
+    Args:
+        limite_bytes: máximo de bytes nuevos a leer en total (None = sin límite)
+
+    Returns:
+        dict con 'bytes', 'archivos' y 'al_dia' (False si quedó trabajo pendiente)
+    """
+    archivos = listar_logs(incluir_rotados=True)
+    restante = limite_bytes if limite_bytes is not None else float('inf')
+    total = 0
+    al_dia = True
+
+    with _lock:
+        conexion = _conectar()
+        try:
+            presentes = {}
+            for nombre, info in archivos.items():
+                try:
+                    presentes[_clave_archivo(os.stat(info['path']))] = nombre
+                except OSError:
+                    continue
+
+            # Respaldos que RotatingFileHandler ya eliminó
+            for (clave,) in conexion.execute('SELECT clave FROM archivos').fetchall():
+                if clave not in presentes:
+                    conexion.execute('BEGIN IMMEDIATE')
+                    _borrar_archivo(conexion, clave)
+                    conexion.execute('COMMIT')
+
+            # Primero los archivos actuales (donde están las líneas nuevas)
+            for nombre in sorted(presentes.values(), key=lambda n: (not n.endswith('.log'), n)):
+                if restante <= 0:
+                    al_dia = False
+                    break
+                leidos, completo = _indexar_archivo(conexion, nombre, archivos[nombre]['path'], restante)
+                total += leidos
+                restante -= leidos
+                al_dia = al_dia and completo
+        finally:
+            conexion.close()
+
+    return {'bytes': total, 'archivos': len(archivos), 'al_dia': al_dia}
+
+
+# ----------------------------------------------------------------------
+# Búsqueda
+# ----------------------------------------------------------------------
+
+def _consulta_fts(texto):
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura
+
+    Cada palabra se busca literal (entre comillas) y todas deben aparecer;
+    'palabra*' busca por prefijo.
+    """
+    terminos = []
+    for palabra in texto.split():
+        prefijo = palabra.endswith('*')
+        palabra = palabra.rstrip('*').replace('"', '""')
+        if palabra:
+            terminos.append(f'"{palabra}"' + ('*' if prefijo else ''))
+    return ' '.join(terminos)
+
+
+def _fecha_filtro(valor, nombre, fin_del_dia=False):
+    """YYYY-MM-DD o YYYY-MM-DDTHH:MM[:SS] en hora local a segundos epoch"""
+    try:
+        fecha = datetime.fromisoformat(valor)
+    except ValueError:
+        raise ValueError(f'{nombre} debe tener el formato YYYY-MM-DD o YYYY-MM-DDTHH:MM:SS')
+    if fin_del_dia and len(valor) == 10:
+        fecha = fecha.replace(hour=23, minute=59, second=59)
+    if fecha.tzinfo is not None:
+        return fecha.timestamp()
+    return pytime.mktime(fecha.timetuple())
+
+
+def _cursor(ts, id_linea):
+    return f'{ts!r}:{id_linea}'
+
+
+def _leer_cursor(cursor):
+    try:
+        ts, id_linea = cursor.split(':')
+        return float(ts), int(id_linea)
+    except ValueError:
+        raise ValueError('cursor inválido')
+
+
+def buscar(consulta=None, nivel=None, logger=None, desde=None, hasta=None, collar=None,
+           request_id=None, archivo=None, cursor=None, tamano=TAMANO_PAGINA):
+    """
+    Líneas de log que cumplen los filtros, de la más reciente a la más antigua
+
+    Args:
+        consulta: palabras a buscar (todas deben aparecer)
+        nivel: nivel mínimo (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        logger: nombre del logger; incluye a sus hijos (temp_car -> temp_car.views)
+        desde, hasta: rango de fechas en hora local
+        collar: idCollar
+        request_id: id de la petición (X-Request-ID)
+        archivo: nombre del archivo o de su familia ('apis.log' incluye apis.log.1 ...)
+        cursor: valor 'siguiente' de la página anterior
+
+    Returns:
+        dict con 'resultados' (archivo, offset, ts, nivel, logger, collar,
+        request_id, texto) y 'siguiente'
+
+    Raises:
+        ValueError: si algún filtro no es válido
+    """
+    tamano = max(1, min(int(tamano), TAMANO_PAGINA_MAXIMO))
+    condiciones = []
+    parametros = []
+
+    if consulta:
+        fts = _consulta_fts(consulta)
+        if fts:
+            condiciones.append('l.id IN (SELECT rowid FROM lineas_fts WHERE lineas_fts MATCH ?)')
+            parametros.append(fts)
+    if nivel:
+        if nivel.upper() not in NIVELES:
+            raise ValueError(f'nivel debe ser uno de: {", ".join(NIVELES)}')
+        condiciones.append('l.nivel >= ?')
+        parametros.append(NIVELES[nivel.upper()])
+    if logger:
+        condiciones.append("(l.logger = ? OR l.logger LIKE ? ESCAPE '\\')")
+        parametros.extend([logger, logger.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '.%'])
+    if desde:
+        condiciones.append('l.ts >= ?')
+        parametros.append(_fecha_filtro(desde, 'desde'))
+    if hasta:
+        condiciones.append('l.ts <= ?')
+        parametros.append(_fecha_filtro(hasta, 'hasta', fin_del_dia=True))
+    if collar not in (None, ''):
+        try:
+            collar = int(collar)
+        except (TypeError, ValueError):
+            raise ValueError('collar debe ser un número entero')
+        condiciones.append('l.collar = ?')
+        parametros.append(collar)
+    if request_id:
+        condiciones.append('l.request_id = ?')
+        parametros.append(request_id)
+    if archivo:
+        condiciones.append('(a.nombre = ? OR a.nombre GLOB ?)')
+        parametros.extend([archivo, f'{archivo}.[0-9]*'])
+    if cursor:
+        ts, id_linea = _leer_cursor(cursor)
+        condiciones.append('(l.ts < ? OR (l.ts = ? AND l.id < ?))')
+        parametros.extend([ts, ts, id_linea])
+
+    sql = (
+        'SELECT l.id, a.nombre, l.offset, l.ts, l.nivel, l.logger, l.collar, l.request_id, l.texto '
+        'FROM lineas l JOIN archivos a ON a.clave = l.archivo'
+        + (' WHERE ' + ' AND '.join(condiciones) if condiciones else '')
+        + ' ORDER BY l.ts DESC, l.id DESC LIMIT ?'
+    )
+    parametros.append(tamano + 1)
+
+    nombres_nivel = {valor: nombre for nombre, valor in NIVELES.items()}
+    conexion = _conectar()
+    try:
+        filas = conexion.execute(sql, parametros).fetchall()
+    finally:
+        conexion.close()
+
+    resultados = [
+        {
+            'archivo': nombre,
+            'offset': offset,
+            'ts': datetime.fromtimestamp(ts).isoformat(timespec='seconds') if ts else None,
+            'nivel': nombres_nivel.get(nivel_linea),
+            'logger': logger_linea,
+            'collar': collar_linea,
+            'request_id': request_linea,
+            'texto': texto,
+        }
+        for _id, nombre, offset, ts, nivel_linea, logger_linea, collar_linea, request_linea, texto in filas[:tamano]
+    ]
+    siguiente = None
+    if len(filas) > tamano:
+        ultimo = filas[tamano - 1]
+        siguiente = _cursor(ultimo[3], ultimo[0])
+    return {'resultados': resultados, 'siguiente': siguiente}
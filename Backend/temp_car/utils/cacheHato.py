@@ -0,0 +1,270 @@
+"""
+Caché en memoria del último estado de cada bovino, indexada por idCollar
+
+Sirve la vista /monitor/herd/ sin consultar la base de datos por bovino:
+- se calienta desde la base de datos al arrancar el proceso (wsgi/asgi)
+- la ingesta y las señales de ControlMonitoreo la actualizan al confirmar
+- como cada worker tiene su propia copia, al leerla se comparan los PK
+  máximos de Lectura y ControlMonitoreo (a lo sumo cada
+  HATO_CACHE_SINCRONIZACION segundos) y se aplican solo las filas nuevas
+- cada HATO_CACHE_REFRESCO segundos se recarga completa, lo que cubre
+  borrados y cambios de bovinos hechos en otros workers o en el admin
+"""
+
+import logging
+import threading
+import time as pytime
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max, OuterRef, Subquery
+
+from temp_car.models import Bovinos, ControlMonitoreo, Lectura
+
+from .calendarioTurnos import hoy as _hoy
+
+logger = logging.getLogger('temp_car')
+
+# Con más filas nuevas que esto es más barato recargar todo el hato
+DELTA_MAXIMO = 5000
+
+
+def _entrada_lectura(lectura):
+    return {
+        'lectura_id': lectura.id_Lectura,
+        'temperatura': lectura.temperatura_valor,
+        'pulsaciones': lectura.pulsaciones_valor,
+        'estado_salud': lectura.estado_salud,
+        'temperatura_normal': lectura.temperatura_normal,
+        'pulsaciones_normales': lectura.pulsaciones_normales,
+        'fecha_lectura': lectura.fecha_lectura,
+        'hora_lectura': lectura.hora_lectura,
+        'fuente': lectura.fuente or 'arduino',
+    }
+
+
+def _entrada_control(control_id, fecha, hora):
+    return {'control_id': control_id, 'fecha_lectura': fecha, 'hora_lectura': hora}
+
+
+def _orden(entrada, clave):
+    return (entrada['fecha_lectura'], entrada['hora_lectura'], entrada[clave])
+
+
+class CacheHato:
+    """Último estado por collar: datos del bovino, última lectura y último control"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._bovinos = {}
+        self._marca_lectura = 0
+        self._marca_control = 0
+        self._cargada_en = None
+        self._sincronizada_en = 0.0
+        self._pendientes = set()
+
+    # ------------------------------------------------------------------
+    # Carga desde la base de datos
+    # ------------------------------------------------------------------
+
+    def calentar(self):
+        """Carga el hato completo: 3 consultas sin importar el número de bovinos"""
+        hoy = _hoy()
+        marca_lectura = Lectura.objects.aggregate(ultimo=Max('id_Lectura'))['ultimo'] or 0
+        marca_control = ControlMonitoreo.objects.aggregate(ultimo=Max('id_Control'))['ultimo'] or 0
+
+        ultima_lectura = Subquery(
+            Lectura.objects
+            .filter(id_Bovino=OuterRef('pk'))
+            .order_by('-fecha_lectura', '-hora_lectura', '-id_Lectura')
+            .values('id_Lectura')[:1]
+        )
+        filas = list(
+            Bovinos.objects
+            .annotate(ultima_lectura=ultima_lectura)
+            .values('idCollar', 'nombre', 'activo', 'ultima_lectura')
+        )
+        lecturas = {
+            lectura.id_Lectura: lectura
+            for lectura in Lectura.objects.filter(
+                id_Lectura__in=[fila['ultima_lectura'] for fila in filas if fila['ultima_lectura']]
+            )
+        }
+
+        bovinos = {}
+        for fila in filas:
+            lectura = lecturas.get(fila['ultima_lectura'])
+            bovinos[fila['idCollar']] = {
+                'collar_id': fila['idCollar'],
+                'nombre': fila['nombre'],
+                'activo': fila['activo'],
+                'lectura': _entrada_lectura(lectura) if lectura else None,
+                'control': None,
+            }
+
+        # Solo los controles de hoy definen el estado del turno
+        for control in self._controles(fecha_lectura=hoy):
+            self._aplicar_control(bovinos, *control)
+
+        with self._lock:
+            self._bovinos = bovinos
+            self._marca_lectura = marca_lectura
+            self._marca_control = marca_control
+            self._cargada_en = pytime.monotonic()
+            self._sincronizada_en = self._cargada_en
+            self._pendientes.clear()
+
+        logger.info(f"CACHE HATO | Cargados {len(bovinos)} bovinos")
+
+    @staticmethod
+    def _controles(**filtros):
+        return (
+            ControlMonitoreo.objects
+            .filter(id_Lectura__isnull=False, **filtros)
+            .values_list('id_Lectura__id_Bovino__idCollar', 'id_Control', 'fecha_lectura', 'hora_lectura')
+        )
+
+    @staticmethod
+    def _aplicar_control(bovinos, collar_id, control_id, fecha, hora):
+        bovino = bovinos.get(collar_id)
+        if bovino is None:
+            return
+        nuevo = _entrada_control(control_id, fecha, hora)
+        actual = bovino['control']
+        if actual is None or _orden(nuevo, 'control_id') >= _orden(actual, 'control_id'):
+            bovino['control'] = nuevo
+
+    def _aplicar_lectura(self, lectura):
+        bovino = lectura.id_Bovino
+        entrada = self._bovinos.get(bovino.idCollar)
+        if entrada is None:
+            entrada = self._bovinos[bovino.idCollar] = {
+                'collar_id': bovino.idCollar,
+                'nombre': bovino.nombre,
+                'activo': bovino.activo,
+                'lectura': None,
+                'control': None,
+            }
+        else:
+            entrada['nombre'] = bovino.nombre
+            entrada['activo'] = bovino.activo
+
+        nueva = _entrada_lectura(lectura)
+        if entrada['lectura'] is None or _orden(nueva, 'lectura_id') >= _orden(entrada['lectura'], 'lectura_id'):
+            entrada['lectura'] = nueva
+
+    def _recargar_collares(self, collares):
+        """Recarga desde la base de datos la última lectura y control de algunos collares"""
+        hoy = _hoy()
+        for collar_id in collares:
+            controles = list(self._controles(fecha_lectura=hoy, id_Lectura__id_Bovino__idCollar=collar_id))
+            lectura = (
+                Lectura.objects
+                .filter(id_Bovino__idCollar=collar_id)
+                .select_related('id_Bovino')
+                .order_by('-fecha_lectura', '-hora_lectura', '-id_Lectura')
+                .first()
+            )
+            with self._lock:
+                entrada = self._bovinos.get(collar_id)
+                if entrada is None:
+                    continue
+                entrada['lectura'] = _entrada_lectura(lectura) if lectura else None
+                entrada['control'] = None
+                for control in controles:
+                    self._aplicar_control(self._bovinos, *control)
+
+    def sincronizar(self, forzar=False):
+        """Aplica las filas escritas por otros procesos desde la última sincronización"""
+        ahora = pytime.monotonic()
+        if self._cargada_en is None or ahora - self._cargada_en >= settings.HATO_CACHE_REFRESCO:
+            self.calentar()
+            return
+        if not forzar and ahora - self._sincronizada_en < settings.HATO_CACHE_SINCRONIZACION:
+            return
+
+        with self._lock:
+            self._sincronizada_en = ahora
+            pendientes, self._pendientes = self._pendientes, set()
+        if pendientes:
+            self._recargar_collares(pendientes)
+
+        marca_lectura = Lectura.objects.aggregate(ultimo=Max('id_Lectura'))['ultimo'] or 0
+        marca_control = ControlMonitoreo.objects.aggregate(ultimo=Max('id_Control'))['ultimo'] or 0
+        if marca_lectura - self._marca_lectura > DELTA_MAXIMO:
+            self.calentar()
+            return
+
+        if marca_lectura > self._marca_lectura:
+            nuevas = list(
+                Lectura.objects
+                .filter(id_Lectura__gt=self._marca_lectura, id_Lectura__lte=marca_lectura)
+                .select_related('id_Bovino')
+            )
+            with self._lock:
+                for lectura in nuevas:
+                    self._aplicar_lectura(lectura)
+                self._marca_lectura = marca_lectura
+
+        if marca_control > self._marca_control:
+            nuevos = list(self._controles(id_Control__gt=self._marca_control, id_Control__lte=marca_control))
+            with self._lock:
+                for control in nuevos:
+                    self._aplicar_control(self._bovinos, *control)
+                self._marca_control = marca_control
+
+    # ------------------------------------------------------------------
+    # Actualización en escritura (mismo proceso)
+    # ------------------------------------------------------------------
+
+    def actualizar_lecturas(self, lecturas):
+        """Llamado al confirmar la ingesta; las lecturas traen su id_Bovino cargado"""
+        with self._lock:
+            for lectura in lecturas:
+                self._aplicar_lectura(lectura)
+
+    def actualizar_control(self, control):
+        lectura = control.id_Lectura
+        with self._lock:
+            self._aplicar_control(
+                self._bovinos, lectura.id_Bovino.idCollar,
+                control.id_Control, control.fecha_lectura, control.hora_lectura,
+            )
+
+    def invalidar_collar(self, collar_id):
+        """Marca un collar para recargarlo en la próxima lectura de la caché (p. ej. tras un borrado)"""
+        with self._lock:
+            self._pendientes.add(collar_id)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def hato(self):
+        """Copia del estado de los bovinos activos ordenada por nombre"""
+        self.sincronizar()
+        with self._lock:
+            # Las entradas de lectura/control se reemplazan, nunca se mutan: basta una copia superficial
+            activos = [dict(entrada) for entrada in self._bovinos.values() if entrada['activo']]
+        return sorted(activos, key=lambda entrada: entrada['nombre'] or '')
+
+
+cache_hato = CacheHato()
+
+
+def _calentar_al_arrancar():
+    try:
+        cache_hato.calentar()
+    except Exception as e:
+        logger.warning(f"CACHE HATO | No se pudo calentar al arrancar: {str(e)}")
+    finally:
+        connection.close()
+
+
+def iniciar_cache_hato():
+    """
+    Calienta la caché al arrancar el servidor en un hilo aparte: no retrasa el
+    arranque y bajo ASGI evita consultar la base desde el event loop.
+    Si la carga falla, se reintenta en la primera petición.
+    """
+    threading.Thread(target=_calentar_al_arrancar, name='cache-hato', daemon=True).start()
@@ -0,0 +1,140 @@
+"""
+Calendario de turnos de monitoreo (hora de America/Guayaquil)
+
+Cada día se divide en cuatro turnos con rangos semiabiertos [inicio, fin)
+sobre hora_lectura:
+
+    night      Madrugada  00:00 - 07:00
+    morning    Mañana     07:00 - 12:00
+    afternoon  Tarde      12:00 - 18:00
+    evening    Noche      18:00 - fin del día (fin = None)
+
+Los límites de cada fecha se calculan una sola vez y quedan en caché
+(turnos_del_dia). Las consultas filtran con filtro_turno(), que genera
+hora_lectura >= inicio AND hora_lectura < fin: una comparación directa
+sobre la columna, que puede usar los índices (fecha_lectura, hora_lectura)
+en lugar de hora_lectura__hour, que envuelve la columna en una función.
+"""
+
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import time
+from functools import lru_cache
+
+import pytz
+from django.db.models import Q
+from django.utils import timezone
+
+ZONA_HORARIA = pytz.timezone('America/Guayaquil')
+
+# (clave, nombre, hora de inicio); cada turno termina donde empieza el siguiente
+DEFINICION_TURNOS = (
+    ('night', 'Madrugada', 0),
+    ('morning', 'Mañana', 7),
+    ('afternoon', 'Tarde', 12),
+    ('evening', 'Noche', 18),
+)
+
+NOMBRES_TURNO = {clave: nombre for clave, nombre, _ in DEFINICION_TURNOS}
+
+
+class Turno(namedtuple('Turno', 'clave nombre fecha inicio fin')):
+    """Turno de una fecha con su rango [inicio, fin) como datetime.time (fin None = fin del día)"""
+
+    __slots__ = ()
+
+    @property
+    def hora_inicio(self):
+        return self.inicio.hour
+
+    @property
+    def hora_fin(self):
+        return 24 if self.fin is None else self.fin.hour
+
+    def contiene(self, hora):
+        return self.inicio <= hora and (self.fin is None or hora < self.fin)
+
+    def filtro(self, campo='hora_lectura', campo_fecha='fecha_lectura'):
+        """Q con la fecha del turno y el rango de hora"""
+        return Q(**{campo_fecha: self.fecha}) & filtro_turno(self.clave, campo)
+
+
+def _rangos():
+    inicios = [time(hora) for _, _, hora in DEFINICION_TURNOS]
+    fines = inicios[1:] + [None]
+    return {
+        clave: (inicio, fin)
+        for (clave, _, _), inicio, fin in zip(DEFINICION_TURNOS, inicios, fines)
+    }
+
+
+# Rangos [inicio, fin) por turno, compartidos con la exportación de reportes
+RANGOS_TURNO = _rangos()
+_INICIOS = [inicio for inicio, _ in RANGOS_TURNO.values()]
+
+
+@lru_cache(maxsize=64)
+def turnos_del_dia(fecha):
+    """Tupla con los turnos de `fecha`, en orden"""
+    return tuple(
+        Turno(clave, NOMBRES_TURNO[clave], fecha, inicio, fin)
+        for clave, (inicio, fin) in RANGOS_TURNO.items()
+    )
+
+
+def turno_de(fecha, hora):
+    """Turno de `fecha` al que pertenece `hora`"""
+    return turnos_del_dia(fecha)[bisect_right(_INICIOS, hora) - 1]
+
+
+def turno_de_hora(hora):
+    """Clave del turno al que pertenece `hora`"""
+    return DEFINICION_TURNOS[bisect_right(_INICIOS, hora) - 1][0]
+
+
+def filtro_turno(clave, campo='hora_lectura'):
+    """
+    Q con el rango de hora del turno, sin fecha
+
+    Raises:
+        ValueError: si el turno no existe
+    """
+    if clave not in RANGOS_TURNO:
+        raise ValueError(f'turno debe ser uno de: {", ".join(RANGOS_TURNO)}')
+    inicio, fin = RANGOS_TURNO[clave]
+    filtro = Q(**{f'{campo}__gte': inicio})
+    if fin is not None:
+        filtro &= Q(**{f'{campo}__lt': fin})
+    return filtro
+
+
+def ahora_local():
+    """datetime actual en America/Guayaquil"""
+    return timezone.now().astimezone(ZONA_HORARIA)
+
+
+def hoy():
+    """Fecha actual en America/Guayaquil"""
+    return ahora_local().date()
+
+
+def turno_actual(request=None):
+    """
+    Turno vigente y el instante con que se resolvió
+
+    Con `request` se resuelve una sola vez por petición: las llamadas
+    siguientes durante la misma petición devuelven el mismo turno aunque
+    entretanto se haya cruzado un límite.
+
+    Returns:
+        (Turno, datetime local)
+    """
+    if request is not None:
+        resuelto = getattr(request, '_turno_actual', None)
+        if resuelto is not None:
+            return resuelto
+    ahora = ahora_local()
+    resuelto = (turno_de(ahora.date(), ahora.time()), ahora)
+    if request is not None:
+        request._turno_actual = resuelto
+    return resuelto
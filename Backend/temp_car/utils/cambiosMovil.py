@@ -0,0 +1,224 @@
+"""
+Cambios incrementales desde un cursor (/api/movil/cambios/ y /monitor/cambios/)
+
+El cursor "<id_lectura>:<id_cambio>" combina dos secuencias monótonas:
+- lecturas nuevas: id_Lectura > cursor (la ingesta solo agrega filas, sin
+  escribir nada extra por lectura)
+- diario CambioRegistro: id > cursor, con los controles creados o editados
+  y las ediciones y borrados de lecturas, controles y bovinos (las
+  ediciones de bovinos solo sirven a los ETag; aquí se omiten)
+
+Las señales escriben el diario en la misma transacción que el cambio. Cada
+respuesta trae a lo sumo `limite` filas de cada secuencia y el cursor hasta
+donde llegó; con hay_mas=True el cliente vuelve a pedir enseguida.
+
+Los ids se asignan al insertar pero las transacciones confirman en otro
+orden (en PostgreSQL un id menor puede hacerse visible después de uno
+mayor). Por eso el cursor solo avanza hasta las filas insertadas hace más
+de API_MOVIL_CAMBIOS_MARGEN segundos: una lectura o un cambio llega con ese
+retraso, pero no se salta aunque su transacción confirme tarde (siempre que
+no tarde más que el margen).
+
+Un borrado llega como lápida en "eliminados" (ids de lecturas, controles o
+collares). Al borrar un bovino solo se registra su lápida: el cliente
+descarta todas las lecturas y controles de ese collar.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.db.models.functions import Coalesce
+
+from temp_car.models import CambioRegistro, ControlMonitoreo, Lectura
+
+# Lápidas del diario por tipo -> clave en la respuesta
+TIPOS_ELIMINADOS = {'lectura': 'lecturas', 'control': 'controles', 'bovino': 'collares'}
+
+
+def collar_de_lectura(lectura_id, lectura=None):
+    """idCollar del bovino de la lectura; usa la lectura ya cargada si la hay"""
+    if lectura_id is None:
+        return None
+    if lectura is not None and lectura.pk == lectura_id and Lectura.id_Bovino.is_cached(lectura):
+        return lectura.id_Bovino.idCollar
+    return (
+        Lectura.objects.filter(pk=lectura_id)
+        .values_list('id_Bovino__idCollar', flat=True)
+        .first()
+    )
+
+
+def registrar_cambio(tipo, objeto_id, accion, collar_id=None):
+    """Agrega una fila al diario (dentro de la transacción del cambio)"""
+    CambioRegistro.objects.create(tipo=tipo, objeto_id=objeto_id, accion=accion, collar_id=collar_id)
+
+
+def topes_asentados():
+    """
+    Últimos ids asentados de cada secuencia
+
+    Las lecturas anteriores a la columna fecha_registro (NULL) cuentan como
+    asentadas. Ambas consultas recorren la clave primaria de mayor a menor y
+    solo descartan las filas del margen.
+    """
+    limite = timezone.now() - timedelta(seconds=settings.API_MOVIL_CAMBIOS_MARGEN)
+    return (
+        Lectura.objects.filter(Q(fecha_registro__lte=limite) | Q(fecha_registro__isnull=True))
+        .aggregate(ultimo=Max('id_Lectura'))['ultimo'] or 0,
+        CambioRegistro.objects.filter(fecha__lte=limite).aggregate(ultimo=Max('id'))['ultimo'] or 0,
+    )
+
+
+def cursor_actual():
+    """Cursor con la última lectura y el último cambio asentados"""
+    return '{}:{}'.format(*topes_asentados())
+
+
+def leer_cursor(texto):
+    """
+    (id_lectura, id_cambio) del cursor
+
+    Raises:
+        ValueError: si el cursor no tiene el formato "<entero>:<entero>"
+    """
+    try:
+        lectura_id, cambio_id = texto.split(':')
+        cursor = int(lectura_id), int(cambio_id)
+    except (AttributeError, ValueError):
+        raise ValueError('desde debe ser un cursor "<id_lectura>:<id_cambio>"')
+    if cursor[0] < 0 or cursor[1] < 0:
+        raise ValueError('desde debe ser un cursor "<id_lectura>:<id_cambio>"')
+    return cursor
+
+
+def _lecturas(ids):
+    # Una sola instancia sin guardar para reutilizar la regla de Lectura.estado_salud
+    estado = Lectura()
+    filas = (
+        Lectura.objects.filter(id_Lectura__in=ids)
+        .order_by('id_Lectura')
+        .values_list(
+            'id_Lectura',
+            'id_Bovino__idCollar',
+            Coalesce('temperatura', 'id_Temperatura__valor'),
+            Coalesce('pulsaciones', 'id_Pulsaciones__valor'),
+            'fecha_lectura',
+            'hora_lectura',
+            'fuente',
+        )
+    )
+    lecturas = []
+    for lectura_id, collar_id, temperatura, pulsaciones, fecha, hora, fuente in filas:
+        estado.temperatura = temperatura
+        lecturas.append({
+            'id': lectura_id,
+            'collar_id': collar_id,
+            'temperatura': temperatura,
+            'pulsaciones': pulsaciones,
+            'estado_salud': estado.estado_salud,
+            'fecha': fecha.strftime('%Y-%m-%d'),
+            'hora': hora.strftime('%H:%M:%S'),
+            'fuente': fuente or 'arduino',
+        })
+    return lecturas
+
+
+def _controles(ids):
+    filas = (
+        ControlMonitoreo.objects.filter(id_Control__in=ids)
+        .order_by('id_Control')
+        .values_list(
+            'id_Control',
+            'id_Lectura_id',
+            'id_Lectura__id_Bovino__idCollar',
+            'id_User__username',
+            'fecha_lectura',
+            'hora_lectura',
+            'turno',
+            'estado_salud',
+            'observaciones',
+            'accion_tomada',
+            'uuid_cliente',
+        )
+    )
+    return [
+        {
+            'id': control_id,
+            'lectura_id': lectura_id,
+            'collar_id': collar_id,
+            'usuario': usuario,
+            'fecha': fecha.strftime('%Y-%m-%d'),
+            'hora': hora.strftime('%H:%M:%S'),
+            'turno': turno,
+            'estado_salud': estado_salud,
+            'observaciones': observaciones or '',
+            'accion_tomada': accion_tomada or '',
+            'uuid': str(uuid_cliente) if uuid_cliente else None,
+        }
+        for (control_id, lectura_id, collar_id, usuario, fecha, hora, turno, estado_salud,
+             observaciones, accion_tomada, uuid_cliente) in filas
+    ]
+
+
+def cambios_desde(cursor, collares=None, limite=None):
+    """
+    Lecturas, controles y lápidas posteriores al cursor
+
+    Args:
+        cursor: (id_lectura, id_cambio) de leer_cursor()
+        collares: idCollar a incluir, None para todo el hato
+        limite: filas máximas de cada secuencia (default API_MOVIL_CAMBIOS_LIMITE)
+
+    Returns:
+        dict con lecturas, controles, eliminados, cursor y hay_mas
+    """
+    limite = limite or settings.API_MOVIL_CAMBIOS_LIMITE
+    ultima_lectura, ultimo_cambio = cursor
+    # Topes asentados tomados antes de leer: con filtro de collares el cursor
+    # avanza hasta ellos aunque no haya filas del collar
+    tope_lectura, tope_cambio = topes_asentados()
+
+    nuevas = Lectura.objects.filter(id_Lectura__gt=ultima_lectura, id_Lectura__lte=tope_lectura)
+    cambios = CambioRegistro.objects.filter(id__gt=ultimo_cambio, id__lte=tope_cambio)
+    if collares:
+        nuevas = nuevas.filter(id_Bovino__idCollar__in=collares)
+        cambios = cambios.filter(collar_id__in=collares)
+    ids_nuevas = list(nuevas.order_by('id_Lectura').values_list('id_Lectura', flat=True)[:limite])
+    filas_cambios = list(cambios.order_by('id').values_list('id', 'tipo', 'objeto_id', 'accion')[:limite])
+
+    # Estado final de cada registro dentro de la página del diario
+    ultimo_estado = {}
+    for _, tipo, objeto_id, accion in filas_cambios:
+        ultimo_estado[(tipo, objeto_id)] = accion
+
+    eliminados = {clave: [] for clave in TIPOS_ELIMINADOS.values()}
+    lecturas_editadas = set()
+    controles_guardados = []
+    for (tipo, objeto_id), accion in ultimo_estado.items():
+        if accion == 'eliminado':
+            eliminados[TIPOS_ELIMINADOS[tipo]].append(objeto_id)
+        elif tipo == 'lectura':
+            lecturas_editadas.add(objeto_id)
+        elif tipo == 'control':
+            controles_guardados.append(objeto_id)
+
+    ids_lecturas = set(ids_nuevas) | lecturas_editadas
+    lecturas = _lecturas(ids_lecturas) if ids_lecturas else []
+    # Un control editado y luego borrado fuera de esta página llega en la siguiente como lápida
+    controles = _controles(controles_guardados) if controles_guardados else []
+
+    hay_mas_lecturas = len(ids_nuevas) == limite
+    hay_mas_cambios = len(filas_cambios) == limite
+    nuevo_cursor = (
+        ids_nuevas[-1] if hay_mas_lecturas else max(tope_lectura, ultima_lectura),
+        filas_cambios[-1][0] if hay_mas_cambios else max(tope_cambio, ultimo_cambio),
+    )
+    return {
+        'lecturas': lecturas,
+        'controles': controles,
+        'eliminados': {clave: sorted(ids) for clave, ids in eliminados.items()},
+        'cursor': f'{nuevo_cursor[0]}:{nuevo_cursor[1]}',
+        'hay_mas': hay_mas_lecturas or hay_mas_cambios,
+    }
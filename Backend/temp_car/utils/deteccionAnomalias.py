@@ -0,0 +1,396 @@
+"""
+Detección de anomalías sobre el historial de lecturas de todo el hato
+
+Lectura.estado_salud clasifica cada lectura con umbrales fijos; aquí se mira
+la historia de cada bovino. Las lecturas recientes del hato se cargan en una
+sola consulta y quedan en arreglos planos de NumPy ordenados por (bovino,
+hora), y cada cálculo se hace de una vez para todos los bovinos:
+
+- línea base móvil: media y desviación de las lecturas del mismo bovino en
+  [t - ANOMALIAS_LINEA_BASE_HORAS, t), con sumas acumuladas y searchsorted
+  sobre una clave (bovino, segundos), sin bucles por bovino
+- z-score de temperatura y pulsaciones frente a esa línea base
+- EWMA de la temperatura (por lectura, reiniciada en cada bovino) contra la
+  línea base, como carta de control: detecta subidas lentas que no llegan a
+  un z alto en ninguna lectura suelta
+- fiebre sostenida: tramos con temperatura >= ANOMALIAS_FIEBRE_UMBRAL que
+  duran al menos ANOMALIAS_FIEBRE_MINUTOS
+
+Las lecturas marcadas se agrupan en tramos (mismo bovino, sin huecos de más
+de HUECO_MAXIMO) y los tramos que tocan la ventana analizada se guardan en
+EpisodioAnomalia. Un episodio que se solapa con uno ya guardado del mismo
+bovino y tipo lo extiende, así el comando se puede ejecutar cada pocos
+minutos sin duplicar episodios.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from temp_car.models import EpisodioAnomalia, Lectura
+
+from .calendarioTurnos import ZONA_HORARIA, ahora_local
+
+# Lecturas mínimas en la línea base para calcular un z-score
+MINIMO_LINEA_BASE = 30
+# Piso de la desviación: evita z enormes en bovinos con lecturas casi constantes
+DESVIACION_MINIMA = {'temperatura': 0.15, 'pulsaciones': 3.0}
+# Lecturas marcadas mínimas para que un tramo de z o EWMA sea episodio
+MINIMO_LECTURAS_EPISODIO = 2
+# Lecturas marcadas separadas por más que esto son episodios distintos
+HUECO_MAXIMO = timedelta(minutes=10)
+# Temperatura de fiebre alta (mismo límite que Lectura.estado_salud)
+TEMPERATURA_CRITICA = 40.0
+# Límite de la carta EWMA, en desviaciones de la EWMA
+LIMITE_EWMA = 3.0
+# Largo de bloque del EWMA: acota (1 - alfa) ** -n dentro de cada bloque
+BLOQUE_EWMA = 256
+
+_EPOCA = datetime(1970, 1, 1)
+_EPOCA_ORDINAL = _EPOCA.toordinal()
+# Separa los bovinos en la clave (bovino, segundos) de las ventanas móviles
+_ESCALA_GRUPO = 10 ** 11
+
+
+class Historial:
+    """Lecturas del hato en arreglos planos ordenados por (bovino, fecha, hora)"""
+
+    def __init__(self, bovinos, segundos, temperaturas, pulsaciones):
+        self.bovinos = bovinos
+        self.segundos = segundos
+        self.temperaturas = temperaturas
+        self.pulsaciones = pulsaciones
+        # Índice denso de grupo por fila (0..G-1), para la clave de las ventanas
+        cambios = np.flatnonzero(bovinos[1:] != bovinos[:-1]) + 1
+        self.grupos = np.zeros(len(bovinos), dtype=np.int64)
+        self.grupos[cambios] = 1
+        np.cumsum(self.grupos, out=self.grupos)
+
+    def __len__(self):
+        return len(self.bovinos)
+
+
+def cargar_historial(desde):
+    """
+    Historial del hato (bovinos activos) desde el datetime local `desde`, en una consulta
+
+    Los segundos son hora local de America/Guayaquil contada desde 1970.
+    """
+    filas = (
+        Lectura.objects
+        .filter(id_Bovino__activo=True, fecha_lectura__gte=desde.date())
+        .order_by('id_Bovino', 'fecha_lectura', 'hora_lectura')
+        .values_list(
+            'id_Bovino_id',
+            'fecha_lectura',
+            'hora_lectura',
+            Coalesce('temperatura', 'id_Temperatura__valor'),
+            Coalesce('pulsaciones', 'id_Pulsaciones__valor'),
+        )
+    )
+    columnas = list(zip(*filas.iterator(chunk_size=5000)))
+    if not columnas:
+        vacio = np.empty(0)
+        return Historial(np.empty(0, dtype=np.int64), vacio, vacio, vacio)
+
+    bovinos, fechas, horas, temperaturas, pulsaciones = columnas
+    total = len(bovinos)
+    segundos = (
+        (np.fromiter((fecha.toordinal() for fecha in fechas), dtype=np.int64, count=total) - _EPOCA_ORDINAL) * 86400
+        + np.fromiter((hora.hour * 3600 + hora.minute * 60 + hora.second for hora in horas), dtype=np.int64, count=total)
+    )
+    # El primer día se cargó completo: se recorta a la hora de inicio
+    desde_segundos = int((desde.replace(tzinfo=None) - _EPOCA).total_seconds())
+    dentro = segundos >= desde_segundos
+    return Historial(
+        np.fromiter(bovinos, dtype=np.int64, count=total)[dentro],
+        segundos[dentro],
+        np.array(temperaturas, dtype=np.float64)[dentro],
+        np.array(pulsaciones, dtype=np.float64)[dentro],
+    )
+
+
+def linea_base(grupos, segundos, valores, ventana):
+    """
+    Media, desviación y cantidad de las lecturas del mismo grupo en [t - ventana, t)
+
+    Una suma acumulada del hato completo y dos searchsorted: O(n log n) sin
+    bucles por bovino. Los NaN no cuentan.
+    """
+    clave = grupos * _ESCALA_GRUPO + segundos
+    inicios = np.searchsorted(clave, clave - ventana, side='left')
+    fines = np.searchsorted(clave, clave, side='left')  # Excluye la lectura actual
+
+    validos = ~np.isnan(valores)
+    # Centrar antes de sumar cuadrados reduce la cancelación en la varianza
+    centro = np.nanmean(valores) if validos.any() else 0.0
+    centrados = np.where(validos, valores - centro, 0.0)
+    suma = np.concatenate(([0.0], np.cumsum(centrados)))
+    suma_cuadrados = np.concatenate(([0.0], np.cumsum(centrados * centrados)))
+    conteo = np.concatenate(([0], np.cumsum(validos)))
+
+    cantidad = conteo[fines] - conteo[inicios]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = (suma[fines] - suma[inicios]) / cantidad
+        varianza = (suma_cuadrados[fines] - suma_cuadrados[inicios]) / cantidad - media * media
+    return media + centro, np.sqrt(np.maximum(varianza, 0.0)), cantidad
+
+
+def ewma(grupos, valores, alfa):
+    """
+    Media móvil exponencial por lectura, reiniciada al empezar cada grupo (y_0 = x_0)
+
+    Dentro de un bloque y_i = (1-a)^(i-s+1)·y_{s-1} + a·sum_{s<=j<=i} (1-a)^(i-j)·x_j,
+    con las sumas ponderadas como sumas acumuladas de x_j·(1-a)^-j; solo se
+    recorren los bloques (n / BLOQUE_EWMA pasos), no las lecturas.
+    `valores` no debe tener NaN.
+    """
+    total = len(valores)
+    resultado = np.empty(total)
+    if not total:
+        return resultado
+    factor = 1.0 - alfa
+    inicio_grupo = np.flatnonzero(np.r_[True, grupos[1:] != grupos[:-1]])
+    # Para cada fila, índice de la primera lectura de su grupo
+    primera = inicio_grupo[np.searchsorted(inicio_grupo, np.arange(total), side='right') - 1]
+
+    anterior = None
+    for bloque in range(0, total, BLOQUE_EWMA):
+        fin = min(bloque + BLOQUE_EWMA, total)
+        x = valores[bloque:fin]
+        posiciones = np.arange(fin - bloque)
+        pesos = factor ** -posiciones
+        acumulada = np.concatenate(([0.0], np.cumsum(x * pesos)))
+        # Desde dónde suma cada fila: inicio del bloque o inicio de su grupo
+        desde = np.maximum(primera[bloque:fin] - bloque, 0)
+        reinicia = primera[bloque:fin] >= bloque
+        semilla = np.where(reinicia, valores[np.maximum(primera[bloque:fin], 0)], anterior if anterior is not None else 0.0)
+        suma = (acumulada[posiciones + 1] - acumulada[desde]) * factor ** posiciones
+        resultado[bloque:fin] = factor ** (posiciones - desde + 1) * semilla + alfa * suma
+        anterior = resultado[fin - 1]
+    return resultado
+
+
+def tramos(marcadas, grupos, segundos, hueco):
+    """
+    Tramos de lecturas marcadas: mismo grupo y sin huecos mayores a `hueco` segundos
+
+    Returns:
+        (indices, etiquetas, primeras): índices de las filas marcadas, tramo de
+        cada una y posición en `indices` donde empieza cada tramo
+    """
+    indices = np.flatnonzero(marcadas)
+    if not len(indices):
+        vacio = np.empty(0, dtype=np.int64)
+        return vacio, vacio, vacio
+    nuevo = np.ones(len(indices), dtype=bool)
+    nuevo[1:] = (
+        (grupos[indices[1:]] != grupos[indices[:-1]])
+        | (segundos[indices[1:]] - segundos[indices[:-1]] > hueco)
+    )
+    return indices, np.cumsum(nuevo) - 1, np.flatnonzero(nuevo)
+
+
+def _mayor_por_tramo(etiquetas, puntajes):
+    """Posición (en el arreglo de marcadas) del mayor puntaje de cada tramo"""
+    orden = np.lexsort((-puntajes, etiquetas))
+    return orden[np.flatnonzero(np.r_[True, etiquetas[orden][1:] != etiquetas[orden][:-1]])]
+
+
+def _episodios(historial, filas, marcadas, puntajes, tipo, severidad, desde, minimo_lecturas=1, minimo_segundos=0, media=None):
+    """Episodios (dicts) de los tramos marcados que terminan en la ventana analizada"""
+    indices, etiquetas, primeras = tramos(
+        marcadas, historial.grupos[filas], historial.segundos[filas], HUECO_MAXIMO.total_seconds()
+    )
+    if not len(indices):
+        return []
+    ultimas = np.r_[primeras[1:], len(indices)] - 1
+    mayores = _mayor_por_tramo(etiquetas, puntajes[indices])
+    cantidad = ultimas - primeras + 1
+    inicio = historial.segundos[filas][indices[primeras]]
+    fin = historial.segundos[filas][indices[ultimas]]
+    validos = (cantidad >= minimo_lecturas) & (fin - inicio >= minimo_segundos) & (fin >= desde)
+
+    episodios = []
+    for tramo in np.flatnonzero(validos):
+        fila = filas[indices[mayores[tramo]]]
+        episodios.append({
+            'bovino_id': int(historial.bovinos[fila]),
+            'tipo': tipo,
+            'severidad': severidad(puntajes[indices[mayores[tramo]]], fila),
+            'inicio': _fecha_local(inicio[tramo]),
+            'fin': _fecha_local(fin[tramo]),
+            'lecturas': int(cantidad[tramo]),
+            'fila': int(fila),
+            'puntaje': float(puntajes[indices[mayores[tramo]]]),
+            'linea_base': None if media is None else float(media[indices[primeras[tramo]]]),
+        })
+    return episodios
+
+
+def _fecha_local(segundos):
+    return ZONA_HORARIA.localize(_EPOCA + timedelta(seconds=int(segundos)))
+
+
+def detectar(historial, desde):
+    """
+    Episodios del historial que terminan en o después de `desde` (segundos locales)
+
+    Returns:
+        list de dicts con bovino_id, tipo, severidad, inicio, fin, lecturas,
+        valor_extremo, linea_base y puntaje
+    """
+    if not len(historial):
+        return []
+    ventana = settings.ANOMALIAS_LINEA_BASE_HORAS * 3600
+    umbral = settings.ANOMALIAS_Z_UMBRAL
+    episodios = []
+
+    for serie in ('temperatura', 'pulsaciones'):
+        valores_completos = historial.temperaturas if serie == 'temperatura' else historial.pulsaciones
+        filas = np.flatnonzero(~np.isnan(valores_completos))
+        if not len(filas):
+            continue
+        grupos, segundos, valores = historial.grupos[filas], historial.segundos[filas], valores_completos[filas]
+        media, desviacion, cantidad = linea_base(grupos, segundos, valores, ventana)
+        desviacion = np.maximum(desviacion, DESVIACION_MINIMA[serie])
+        con_base = cantidad >= MINIMO_LINEA_BASE
+        z = np.where(con_base, (valores - media) / desviacion, 0.0)
+
+        encontrados = _episodios(
+            historial, filas, np.abs(z) >= umbral, np.abs(z), f'desviacion_{serie}',
+            lambda puntaje, fila: 'Crítico' if puntaje >= 2 * umbral else 'Alerta',
+            desde, minimo_lecturas=MINIMO_LECTURAS_EPISODIO, media=media,
+        )
+        for episodio in encontrados:
+            episodio['valor_extremo'] = float(valores_completos[episodio.pop('fila')])
+        episodios += encontrados
+
+        if serie != 'temperatura':
+            continue
+
+        # Carta EWMA: límite en desviaciones de la EWMA, sigma·sqrt(a / (2 - a))
+        alfa = settings.ANOMALIAS_EWMA_ALFA
+        suavizada = ewma(grupos, valores, alfa)
+        z_ewma = np.where(con_base, (suavizada - media) / (desviacion * np.sqrt(alfa / (2 - alfa))), 0.0)
+        encontrados = _episodios(
+            historial, filas, z_ewma >= LIMITE_EWMA, z_ewma, 'tendencia_temperatura',
+            lambda puntaje, fila: 'Alerta', desde, minimo_lecturas=MINIMO_LECTURAS_EPISODIO, media=media,
+        )
+        for episodio in encontrados:
+            episodio['valor_extremo'] = round(float(suavizada[np.searchsorted(filas, episodio.pop('fila'))]), 2)
+        episodios += encontrados
+
+        # Fiebre sostenida: umbral fijo y duración mínima, sin línea base
+        encontrados = _episodios(
+            historial, filas, valores >= settings.ANOMALIAS_FIEBRE_UMBRAL, valores, 'fiebre_sostenida',
+            lambda valor, fila: 'Crítico' if valor > TEMPERATURA_CRITICA else 'Alerta',
+            desde, minimo_segundos=settings.ANOMALIAS_FIEBRE_MINUTOS * 60,
+        )
+        for episodio in encontrados:
+            episodio['valor_extremo'] = float(valores_completos[episodio.pop('fila')])
+            episodio['puntaje'] = None
+        episodios += encontrados
+
+    return episodios
+
+
+def guardar_episodios(episodios):
+    """
+    Crea los episodios nuevos y extiende los que se solapan con uno guardado
+
+    Returns:
+        (creados, actualizados)
+    """
+    if not episodios:
+        return 0, 0
+    hueco = HUECO_MAXIMO
+    with transaction.atomic():
+        guardados = {}
+        for existente in EpisodioAnomalia.objects.filter(
+            id_Bovino_id__in={episodio['bovino_id'] for episodio in episodios},
+            fin__gte=min(episodio['inicio'] for episodio in episodios) - hueco,
+        ).select_for_update():
+            guardados.setdefault((existente.id_Bovino_id, existente.tipo), []).append(existente)
+
+        nuevos, modificados = [], {}
+        for episodio in episodios:
+            candidatos = guardados.get((episodio['bovino_id'], episodio['tipo']), [])
+            existente = next(
+                (
+                    candidato for candidato in candidatos
+                    if candidato.inicio <= episodio['fin'] + hueco and candidato.fin >= episodio['inicio'] - hueco
+                ),
+                None,
+            )
+            if existente is None:
+                nuevo = EpisodioAnomalia(
+                    id_Bovino_id=episodio['bovino_id'],
+                    tipo=episodio['tipo'],
+                    severidad=episodio['severidad'],
+                    inicio=episodio['inicio'],
+                    fin=episodio['fin'],
+                    lecturas=episodio['lecturas'],
+                    valor_extremo=episodio['valor_extremo'],
+                    linea_base=episodio['linea_base'],
+                    puntaje=episodio['puntaje'],
+                )
+                nuevos.append(nuevo)
+                guardados.setdefault((episodio['bovino_id'], episodio['tipo']), []).append(nuevo)
+                continue
+
+            # Cada ejecución vuelve a ver todo el tramo cargado: se toma el máximo, no la suma
+            existente.inicio = min(existente.inicio, episodio['inicio'])
+            existente.fin = max(existente.fin, episodio['fin'])
+            existente.lecturas = max(existente.lecturas, episodio['lecturas'])
+            if episodio['puntaje'] is not None and (existente.puntaje is None or episodio['puntaje'] > existente.puntaje):
+                existente.puntaje = episodio['puntaje']
+                existente.valor_extremo = episodio['valor_extremo']
+            elif episodio['puntaje'] is None:
+                existente.valor_extremo = max(existente.valor_extremo, episodio['valor_extremo'])
+            if episodio['severidad'] == 'Crítico':
+                existente.severidad = 'Crítico'
+            if existente.pk is not None:
+                existente.fecha_actualizacion = timezone.now()  # bulk_update no aplica auto_now
+                modificados[existente.pk] = existente
+
+        EpisodioAnomalia.objects.bulk_create(nuevos)
+        if modificados:
+            EpisodioAnomalia.objects.bulk_update(
+                modificados.values(),
+                ['inicio', 'fin', 'lecturas', 'puntaje', 'valor_extremo', 'severidad', 'fecha_actualizacion'],
+            )
+    return len(nuevos), len(modificados)
+
+
+def analizar_hato(horas=None, ahora=None):
+    """
+    Carga el historial, detecta y guarda los episodios de las últimas `horas`
+
+    Args:
+        horas: ventana a analizar (default ANOMALIAS_VENTANA_HORAS); antes se
+               carga además ANOMALIAS_LINEA_BASE_HORAS para la línea base
+        ahora: datetime local de referencia (default: ahora en Guayaquil)
+
+    Returns:
+        dict con lecturas, bovinos, episodios, creados y actualizados
+    """
+    horas = horas or settings.ANOMALIAS_VENTANA_HORAS
+    ahora = (ahora or ahora_local()).replace(microsecond=0)
+    inicio_ventana = ahora - timedelta(hours=horas)
+    historial = cargar_historial(inicio_ventana - timedelta(hours=settings.ANOMALIAS_LINEA_BASE_HORAS))
+
+    desde = int((inicio_ventana.replace(tzinfo=None) - _EPOCA).total_seconds())
+    episodios = detectar(historial, desde)
+    creados, actualizados = guardar_episodios(episodios)
+    return {
+        'lecturas': len(historial),
+        'bovinos': int(historial.grupos[-1]) + 1 if len(historial) else 0,
+        'episodios': len(episodios),
+        'creados': creados,
+        'actualizados': actualizados,
+    }
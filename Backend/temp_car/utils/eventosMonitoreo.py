@@ -0,0 +1,376 @@
+"""
+Eventos de monitoreo en vivo para el dashboard (Server-Sent Events)
+
+La ingesta publica cada lectura confirmada y cada control registrado en el
+canal 'monitoreo' del pub/sub en memoria. El stream /monitor/stream/ reenvía
+esos mensajes al navegador. El id de cada evento es el cursor
+"<id_lectura>:<id_control>" ya sincronizado con la base de datos, así el
+navegador retoma desde ahí (Last-Event-ID) al reconectar.
+
+El pub/sub solo alcanza al proceso que publica: con varios workers, lo que
+escribe otro worker llega con hasta MONITOR_SSE_SINCRONIZACION segundos de
+retraso. Un único hilo por proceso (SincronizadorMonitoreo) consulta por clave
+primaria las lecturas y controles nuevos y los publica en el mismo canal, así
+el costo es de dos consultas por intervalo y por worker sin importar cuántos
+dashboards estén abiertos. El hilo solo corre mientras hay suscriptores y usa
+su propia conexión: no ocupa el hilo de sync_to_async que atiende las vistas
+síncronas bajo ASGI. Cada cliente solo consulta la base de datos al conectarse,
+para ponerse al día desde su Last-Event-ID.
+
+Eventos enviados:
+    conectado: al abrir el stream, con los collares suscritos
+    lectura:   nueva lectura de un collar
+    control:   control de monitoreo creado, actualizado o eliminado
+    alerta:    alerta abierta por el motor de reglas de la ingesta
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time as pytime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Max
+
+from temp_car.models import ControlMonitoreo, Lectura
+
+from . import pubsub
+from .sse import comentario_sse, evento_sse
+
+logger = logging.getLogger('temp_car')
+
+CANAL_MONITOREO = 'monitoreo'
+
+REINTENTO_MS = 3000
+LIMITE_SINCRONIZACION = 200
+# Cabe una consulta completa de lecturas y controles sin descartar mensajes
+MAXIMO_COLA = 4 * LIMITE_SINCRONIZACION
+# Posición de cada tipo en el cursor (id_lectura, id_control)
+INDICE_CURSOR = {'lectura': 0, 'control': 1}
+
+
+def _mensaje(tipo, collar_id, id_registro, datos):
+    """Mensaje del pub/sub; los datos se serializan una sola vez para todos los suscriptores"""
+    return {
+        'tipo': tipo,
+        'collar_id': collar_id,
+        'id': id_registro,
+        'datos': json.dumps(datos, ensure_ascii=False),
+    }
+
+
+def mensaje_lectura(lectura):
+    bovino = lectura.id_Bovino
+    return _mensaje('lectura', bovino.idCollar, lectura.id_Lectura, {
+        'collar_id': bovino.idCollar,
+        'nombre': bovino.nombre,
+        'lectura_id': lectura.id_Lectura,
+        'temperatura': lectura.temperatura_valor,
+        'pulsaciones': lectura.pulsaciones_valor,
+        'estado_salud': lectura.estado_salud,
+        'fecha_registro': f"{lectura.fecha_lectura.strftime('%Y-%m-%d')} {lectura.hora_lectura.strftime('%H:%M:%S')}",
+        'fuente': lectura.fuente or 'arduino',
+    })
+
+
+def mensaje_control(control, accion):
+    lectura = control.id_Lectura
+    collar_id = lectura.id_Bovino.idCollar
+    # Solo las altas se deduplican contra la sincronización por PK
+    id_registro = control.id_Control if accion == 'creado' else None
+    return _mensaje('control', collar_id, id_registro, {
+        'accion': accion,
+        'collar_id': collar_id,
+        'control_id': control.id_Control,
+        'lectura_id': lectura.id_Lectura,
+        'temperatura': lectura.temperatura_valor,
+        'pulsaciones': lectura.pulsaciones_valor,
+        'estado_salud': lectura.estado_salud,
+        'fecha_control': f"{control.fecha_lectura.strftime('%d/%m')} {control.hora_lectura.strftime('%H:%M')}",
+    })
+
+
+def publicar_lecturas(lecturas):
+    """Publica las lecturas cuando la transacción en curso se confirma"""
+    if not lecturas:
+        return
+
+    def _publicar():
+        for lectura in lecturas:
+            pubsub.publicar(CANAL_MONITOREO, mensaje_lectura(lectura))
+
+    transaction.on_commit(_publicar)
+
+
+def publicar_control(control, accion):
+    """Publica un control con lectura asociada cuando la transacción se confirma"""
+    if control.id_Lectura_id is None:
+        return
+    mensaje = mensaje_control(control, accion)
+    transaction.on_commit(lambda: pubsub.publicar(CANAL_MONITOREO, mensaje))
+
+
+def publicar_alerta(alerta):
+    """Publica una alerta recién abierta (sin id: no se deduplica contra la sincronización por PK)"""
+    pubsub.publicar(CANAL_MONITOREO, _mensaje('alerta', alerta.collar_id, None, {
+        'alerta_id': alerta.id,
+        'collar_id': alerta.collar_id,
+        'nombre': alerta.nombre,
+        'regla': alerta.regla,
+        'regla_display': alerta.get_regla_display(),
+        'severidad': alerta.severidad,
+        'valor': alerta.valor,
+        'mensaje': alerta.mensaje,
+        'inicio': alerta.inicio.isoformat(),
+    }))
+
+
+def _leer_cursor(ultimo_evento):
+    """Interpreta el Last-Event-ID "<id_lectura>:<id_control>"; None si no es válido"""
+    try:
+        lectura_id, control_id = (ultimo_evento or '').split(':')
+        return int(lectura_id), int(control_id)
+    except ValueError:
+        return None
+
+
+def consultar_posteriores(cursor, collares=None):
+    """
+    Lecturas y controles posteriores al cursor, como mensajes del pub/sub
+
+    Returns:
+        (mensajes, cursor_nuevo, lleno); lleno indica que alguna consulta
+        alcanzó LIMITE_SINCRONIZACION y quedan registros por leer
+    """
+    lecturas = (
+        Lectura.objects
+        .filter(id_Lectura__gt=cursor[0])
+        .select_related('id_Bovino')
+        .order_by('id_Lectura')
+    )
+    controles = (
+        ControlMonitoreo.objects
+        .filter(id_Control__gt=cursor[1], id_Lectura__isnull=False)
+        .select_related('id_Lectura__id_Bovino')
+        .order_by('id_Control')
+    )
+    if collares:
+        lecturas = lecturas.filter(id_Bovino__idCollar__in=collares)
+        controles = controles.filter(id_Lectura__id_Bovino__idCollar__in=collares)
+
+    lecturas = list(lecturas[:LIMITE_SINCRONIZACION])
+    controles = list(controles[:LIMITE_SINCRONIZACION])
+
+    # Cada mensaje lleva el cursor hasta él mismo: los siguientes del tramo siguen siendo nuevos
+    mensajes = [
+        dict(mensaje_lectura(lectura), cursor=(lectura.id_Lectura, cursor[1]))
+        for lectura in lecturas
+    ]
+    ultima_lectura = lecturas[-1].id_Lectura if lecturas else cursor[0]
+    mensajes += [
+        dict(mensaje_control(control, 'creado'), cursor=(ultima_lectura, control.id_Control))
+        for control in controles
+    ]
+    cursor = (ultima_lectura, controles[-1].id_Control if controles else cursor[1])
+    lleno = LIMITE_SINCRONIZACION in (len(lecturas), len(controles))
+    return mensajes, cursor, lleno
+
+
+class SincronizadorMonitoreo:
+    """
+    Hilo por proceso que publica en el canal de monitoreo lo escrito por otros workers
+
+    Los mensajes llevan el cursor hasta el que se consultó; cada stream lo usa
+    para avanzar su Last-Event-ID y descarta lo que ya envió.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._cursor = None
+        self._pendiente = None
+
+    def iniciar(self, cursor):
+        """
+        Asegura que el hilo corra y que consulte desde `cursor` a más tardar
+
+        Un cliente que se pone al día hasta `cursor` no pierde lo escrito
+        entre su consulta y la siguiente del hilo.
+        """
+        if not settings.MONITOR_SSE_SINCRONIZACION:
+            return
+        with self._lock:
+            if self._pendiente is None:
+                self._pendiente = cursor
+            else:
+                self._pendiente = tuple(map(min, self._pendiente, cursor))
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name='sincronizador-monitoreo', daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        espera = settings.MONITOR_SSE_SINCRONIZACION
+        while True:
+            pytime.sleep(espera)
+            with self._lock:
+                if not pubsub.total_suscriptores(CANAL_MONITOREO):
+                    # Sin clientes el hilo termina; el próximo stream lo vuelve a iniciar
+                    self._hilo = None
+                    self._cursor = self._pendiente = None
+                    return
+                if self._pendiente is not None:
+                    self._cursor = (
+                        self._pendiente if self._cursor is None
+                        else tuple(map(min, self._cursor, self._pendiente))
+                    )
+                    self._pendiente = None
+                cursor = self._cursor
+
+            lleno = False
+            close_old_connections()
+            try:
+                mensajes, cursor, lleno = consultar_posteriores(cursor)
+                for mensaje in mensajes:
+                    pubsub.publicar(CANAL_MONITOREO, mensaje)
+                with self._lock:
+                    self._cursor = cursor
+            except Exception as e:
+                logger.warning(f"MONITOREO SSE | Error sincronizando con la base de datos: {str(e)}")
+            finally:
+                connection.close()
+            # Con registros pendientes se vuelve a consultar enseguida
+            espera = 0.1 if lleno else settings.MONITOR_SSE_SINCRONIZACION
+
+
+sincronizador_monitoreo = SincronizadorMonitoreo()
+
+
+class FlujoMonitoreo:
+    """Estado de un stream SSE de monitoreo para un cliente"""
+
+    def __init__(self, collares=None, ultimo_evento=None):
+        self.collares = set(collares) if collares else None
+        self.cursor = _leer_cursor(ultimo_evento)
+        self.enviados = {'lectura': set(), 'control': set()}
+        self.latido = settings.MONITOR_SSE_LATIDO
+
+    def _filtro(self, mensaje):
+        return mensaje['collar_id'] in self.collares
+
+    def suscribir(self, loop=None):
+        return pubsub.suscribir(
+            CANAL_MONITOREO,
+            filtro=self._filtro if self.collares else None,
+            maximo=MAXIMO_COLA,
+            loop=loop,
+        )
+
+    @property
+    def id_evento(self):
+        return f'{self.cursor[0]}:{self.cursor[1]}'
+
+    def preparar(self):
+        """Sin Last-Event-ID válido el stream arranca desde los registros actuales"""
+        if self.cursor is None:
+            self.cursor = (
+                Lectura.objects.aggregate(ultimo=Max('id_Lectura'))['ultimo'] or 0,
+                ControlMonitoreo.objects.aggregate(ultimo=Max('id_Control'))['ultimo'] or 0,
+            )
+        return evento_sse(
+            {'collares': sorted(self.collares) if self.collares else None},
+            evento='conectado',
+            id_evento=self.id_evento,
+            reintento=REINTENTO_MS,
+        )
+
+    def _es_nuevo(self, mensaje):
+        if mensaje['id'] is None:
+            return True
+        tipo = mensaje['tipo']
+        if mensaje['id'] <= self.cursor[INDICE_CURSOR[tipo]] or mensaje['id'] in self.enviados[tipo]:
+            return False
+        self.enviados[tipo].add(mensaje['id'])
+        return True
+
+    def _avanzar(self, cursor):
+        self.cursor = tuple(map(max, self.cursor, cursor))
+        # Lo que quedó detrás del cursor se descarta por id, ya no hace falta recordarlo
+        for tipo, indice in INDICE_CURSOR.items():
+            self.enviados[tipo] = {i for i in self.enviados[tipo] if i > self.cursor[indice]}
+
+    def formatear(self, mensaje):
+        """Evento SSE de un mensaje del pub/sub; None si ya se envió"""
+        nuevo = self._es_nuevo(mensaje)
+        # El cursor avanza aunque el mensaje ya se haya enviado por el pub/sub local
+        if mensaje.get('cursor') is not None:
+            self._avanzar(mensaje['cursor'])
+        if not nuevo:
+            return None
+        return evento_sse(mensaje['datos'], evento=mensaje['tipo'], id_evento=self.id_evento)
+
+    def ponerse_al_dia(self):
+        """
+        Al conectarse: registros posteriores al Last-Event-ID que no llegarán por el pub/sub
+
+        El resto (si la consulta se llenó, y lo que escriban otros workers) lo
+        publica el sincronizador del proceso, que se inicia desde este cursor.
+        """
+        mensajes, cursor, _lleno = consultar_posteriores(self.cursor, self.collares)
+        eventos = [evento for evento in map(self.formatear, mensajes) if evento]
+        self._avanzar(cursor)
+        sincronizador_monitoreo.iniciar(self.cursor)
+        return eventos
+
+    def iterar(self, duracion):
+        """Generador síncrono (WSGI); termina tras `duracion` segundos y el navegador reconecta"""
+        suscripcion = self.suscribir()
+        try:
+            yield self.preparar()
+            yield from self.ponerse_al_dia()
+
+            fin = pytime.monotonic() + duracion
+            proximo_latido = pytime.monotonic() + self.latido
+            while True:
+                ahora = pytime.monotonic()
+                if ahora >= fin:
+                    return
+                mensaje = suscripcion.obtener(timeout=max(min(fin, proximo_latido) - ahora, 0))
+                if mensaje is not None:
+                    evento = self.formatear(mensaje)
+                    if evento:
+                        yield evento
+                        proximo_latido = pytime.monotonic() + self.latido
+                elif pytime.monotonic() >= proximo_latido:
+                    yield comentario_sse()
+                    proximo_latido = pytime.monotonic() + self.latido
+        finally:
+            suscripcion.cerrar()
+
+    async def iterar_async(self, duracion):
+        """Generador asíncrono (ASGI); solo las consultas de la conexión corren en sync_to_async"""
+        suscripcion = self.suscribir(loop=asyncio.get_running_loop())
+        try:
+            yield await sync_to_async(self.preparar)()
+            for evento in await sync_to_async(self.ponerse_al_dia)():
+                yield evento
+
+            fin = pytime.monotonic() + duracion
+            proximo_latido = pytime.monotonic() + self.latido
+            while True:
+                ahora = pytime.monotonic()
+                if ahora >= fin:
+                    return
+                mensaje = await suscripcion.obtener_async(timeout=max(min(fin, proximo_latido) - ahora, 0))
+                if mensaje is not None:
+                    evento = self.formatear(mensaje)
+                    if evento:
+                        yield evento
+                        proximo_latido = pytime.monotonic() + self.latido
+                elif pytime.monotonic() >= proximo_latido:
+                    yield comentario_sse()
+                    proximo_latido = pytime.monotonic() + self.latido
+        finally:
+            suscripcion.cerrar()
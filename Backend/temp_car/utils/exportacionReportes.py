@@ -0,0 +1,191 @@
+"""
+Exportación de controles de monitoreo a CSV y XLSX en memoria constante
+
+Las filas se leen con values_list() y .iterator(chunk_size=...), sin
+instanciar modelos ni cargar el queryset completo:
+- CSV: se escribe y envía de a un bloque de filas
+- XLSX: openpyxl en modo write-only vuelca las filas a un archivo temporal
+  que luego se envía por bloques
+
+Filtros (parámetros GET):
+    desde, hasta:    rango de fechas YYYY-MM-DD (inclusive)
+    fecha_busqueda:  un solo día, el mismo filtro de la vista de reportes
+    collar:          idCollar, repetible (?collar=1&collar=2) o separado por comas
+    turno:           morning, afternoon, evening o night
+"""
+
+import csv
+import tempfile
+from datetime import datetime
+
+from django.db.models.functions import Coalesce
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from temp_car.models import ControlMonitoreo, Lectura
+
+from .calendarioTurnos import NOMBRES_TURNO, filtro_turno, turno_de_hora
+
+TAMANO_BLOQUE = 2000
+
+COLUMNAS = [
+    'Collar',
+    'Nombre',
+    'Fecha',
+    'Hora',
+    'Turno',
+    'Temperatura (°C)',
+    'Pulsaciones (BPM)',
+    'Estado de Salud',
+    'Registrado por',
+    'Observaciones',
+    'Acción Tomada',
+]
+
+
+def _fecha(valor, nombre):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'{nombre} debe tener el formato YYYY-MM-DD')
+
+
+def filtrar_controles(params):
+    """
+    Queryset de controles según los filtros GET, del más reciente al más antiguo
+
+    Raises:
+        ValueError: si algún filtro no es válido
+    """
+    controles = ControlMonitoreo.objects.order_by('-fecha_lectura', '-hora_lectura', '-id_Control')
+
+    fecha_busqueda = params.get('fecha_busqueda')
+    desde = params.get('desde')
+    hasta = params.get('hasta')
+    if fecha_busqueda:
+        desde = hasta = fecha_busqueda
+    desde = _fecha(desde, 'desde') if desde else None
+    hasta = _fecha(hasta, 'hasta') if hasta else None
+    if desde and hasta and desde > hasta:
+        raise ValueError('desde no puede ser posterior a hasta')
+    if desde:
+        controles = controles.filter(fecha_lectura__gte=desde)
+    if hasta:
+        controles = controles.filter(fecha_lectura__lte=hasta)
+
+    collares = [
+        valor.strip()
+        for parametro in params.getlist('collar')
+        for valor in parametro.split(',')
+        if valor.strip()
+    ]
+    if collares:
+        try:
+            collares = [int(collar) for collar in collares]
+        except ValueError:
+            raise ValueError('collar debe ser un número entero')
+        controles = controles.filter(id_Lectura__id_Bovino__idCollar__in=collares)
+
+    turno = params.get('turno')
+    if turno:
+        controles = controles.filter(filtro_turno(turno))
+
+    return controles
+
+
+def filas_exportacion(controles, tamano_bloque=TAMANO_BLOQUE):
+    """Genera una tupla por control con las columnas de COLUMNAS"""
+    filas = controles.values_list(
+        'id_Lectura__id_Bovino__idCollar',
+        'id_Lectura__id_Bovino__nombre',
+        'fecha_lectura',
+        'hora_lectura',
+        Coalesce('id_Lectura__temperatura', 'id_Lectura__id_Temperatura__valor', 'temperatura'),
+        Coalesce('id_Lectura__pulsaciones', 'id_Lectura__id_Pulsaciones__valor', 'pulsaciones'),
+        'id_User__username',
+        'observaciones',
+        'accion_tomada',
+    )
+    # Una sola instancia sin guardar para reutilizar la regla de Lectura.estado_salud
+    estado = Lectura()
+    for collar, nombre, fecha, hora, temperatura, pulsaciones, usuario, observaciones, accion in filas.iterator(
+        chunk_size=tamano_bloque
+    ):
+        estado.temperatura = temperatura
+        yield (
+            collar,
+            nombre,
+            fecha,
+            hora.replace(microsecond=0),
+            NOMBRES_TURNO.get(turno_de_hora(hora), ''),
+            temperatura,
+            pulsaciones,
+            estado.estado_salud,
+            usuario,
+            observaciones or '',
+            accion or '',
+        )
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve lo escrito en lugar de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(controles, tamano_bloque=TAMANO_BLOQUE):
+    """Generador de texto CSV (con BOM para que Excel detecte UTF-8), un bloque de filas por vez"""
+    escritor = csv.writer(_Eco())
+    yield '\ufeff' + escritor.writerow(COLUMNAS)
+
+    bloque = []
+    for fila in filas_exportacion(controles, tamano_bloque):
+        bloque.append(escritor.writerow(fila))
+        if len(bloque) >= tamano_bloque:
+            yield ''.join(bloque)
+            bloque = []
+    if bloque:
+        yield ''.join(bloque)
+
+
+def generar_xlsx(controles, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Escribe el libro en modo write-only en un archivo temporal
+
+    Returns:
+        archivo temporal abierto y posicionado al inicio (se borra al cerrarlo)
+    """
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('Controles')
+
+    negrita = Font(bold=True)
+    encabezado = []
+    for columna in COLUMNAS:
+        celda = WriteOnlyCell(hoja, value=columna)
+        celda.font = negrita
+        encabezado.append(celda)
+    hoja.append(encabezado)
+
+    for fila in filas_exportacion(controles, tamano_bloque):
+        hoja.append(fila)
+
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+def nombre_exportacion(params, extension):
+    """Nombre del archivo descargado según el rango pedido"""
+    desde = params.get('fecha_busqueda') or params.get('desde')
+    hasta = params.get('fecha_busqueda') or params.get('hasta')
+    partes = ['controles_monitoreo']
+    if desde or hasta:
+        partes.append(f"{desde or 'inicio'}_{hasta or 'hoy'}")
+    else:
+        partes.append(datetime.now().strftime('%Y-%m-%d'))
+    if params.get('turno'):
+        partes.append(params['turno'])
+    return f"{'_'.join(partes)}.{extension}"
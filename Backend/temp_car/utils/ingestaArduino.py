@@ -0,0 +1,222 @@
+"""
+Utilidades de ingesta de lecturas enviadas por los collares Arduino/ESP32
+Normaliza los payloads recibidos y guarda lotes de lecturas con bulk_create
+"""
+
+import math
+
+from django.db import transaction
+
+from temp_car.models import Bovinos, Lectura
+
+from .cacheHato import cache_hato
+from .calendarioTurnos import ahora_local
+from .eventosMonitoreo import publicar_lecturas
+from .resumenLecturas import acumular_lecturas, bloquear_bovinos
+from .versionesCollar import versiones_collar
+
+
+# Rango de models.IntegerField en todas las bases de datos soportadas
+ENTERO_MAXIMO = 2147483647
+# Valores fuera de estos rangos son errores del sensor, no lecturas
+TEMPERATURA_MINIMA = 0.0
+TEMPERATURA_MAXIMA = 60.0
+PULSACIONES_MAXIMAS = 400
+
+
+class LecturaInvalida(ValueError):
+    """Payload de lectura que no cumple los campos requeridos"""
+
+
+def hora_guayaquil():
+    """Retorna el datetime actual en zona horaria America/Guayaquil"""
+    return ahora_local()
+
+
+def calcular_pulsaciones(temperatura, pulsaciones=None):
+    """
+    Retorna las pulsaciones de la lectura como entero.
+    Si el collar no las envía, se estiman a partir de la temperatura
+    (rango fisiológico para bovinos lecheros adultos: 38-39°C, 50-65 BPM)
+    """
+    if pulsaciones is not None:
+        try:
+            return int(pulsaciones)
+        except (ValueError, TypeError, OverflowError):
+            return 60
+
+    if temperatura is None:
+        return 60
+
+    try:
+        temperatura_int = int(temperatura)
+    except (ValueError, TypeError):
+        return 60
+
+    if temperatura_int < 36:
+        return 35  # Hipotermia - bradicardia
+    elif 36 <= temperatura_int < 38:
+        return int(40 + (temperatura_int - 36) * 5)  # Temperatura baja: 40-50 BPM
+    elif 38 <= temperatura_int <= 39:
+        return int(50 + (temperatura_int - 38) * 10)  # Normal: 50-65 BPM
+    elif 39 < temperatura_int <= 40:
+        return int(65 + (temperatura_int - 39) * 20)  # Fiebre leve: 65-85 BPM
+    else:
+        return int(85 + (temperatura_int - 40) * 15)  # Fiebre alta: 85+ BPM
+
+
+def _texto_opcional(datos, campo, largo_maximo):
+    """Campo de texto opcional del payload, recortado y con largo máximo validado"""
+    valor = datos.get(campo)
+    if valor is None:
+        return None
+    if not isinstance(valor, str):
+        raise LecturaInvalida(f'{campo} debe ser texto')
+    valor = valor.strip()
+    if len(valor) > largo_maximo:
+        raise LecturaInvalida(f'{campo} admite máximo {largo_maximo} caracteres')
+    return valor or None
+
+
+def normalizar_lectura(datos, ahora=None):
+    """
+    Valida y normaliza el payload de una lectura del collar
+
+    Args:
+        datos: dict con collar_id, temperatura y opcionalmente
+               nombre_vaca, mac_collar y pulsaciones
+        ahora: datetime de recepción (America/Guayaquil), por defecto el actual
+
+    Returns:
+        dict listo para guardar_lecturas_lote
+
+    Raises:
+        LecturaInvalida: si faltan campos requeridos, no son numéricos o
+                         están fuera de rango, o si los textos exceden el
+                         largo de su columna. Así un ítem inválido no hace
+                         fallar la transacción de todo el lote.
+    """
+    if not isinstance(datos, dict):
+        raise LecturaInvalida('Cada lectura debe ser un objeto JSON')
+
+    if datos.get('collar_id') is None or datos.get('temperatura') is None:
+        raise LecturaInvalida('Se requieren collar_id y temperatura')
+
+    try:
+        collar_id = int(datos.get('collar_id'))
+        temperatura = float(datos.get('temperatura'))
+    except (ValueError, TypeError):
+        raise LecturaInvalida('collar_id y temperatura deben ser numéricos')
+
+    if not 0 <= collar_id <= ENTERO_MAXIMO:
+        raise LecturaInvalida(f'collar_id debe estar entre 0 y {ENTERO_MAXIMO}')
+    if not math.isfinite(temperatura) or not TEMPERATURA_MINIMA <= temperatura <= TEMPERATURA_MAXIMA:
+        raise LecturaInvalida(f'temperatura debe estar entre {TEMPERATURA_MINIMA} y {TEMPERATURA_MAXIMA}')
+
+    pulsaciones = calcular_pulsaciones(temperatura, datos.get('pulsaciones'))
+    if not 0 <= pulsaciones <= PULSACIONES_MAXIMAS:
+        raise LecturaInvalida(f'pulsaciones debe estar entre 0 y {PULSACIONES_MAXIMAS}')
+
+    nombre_vaca = _texto_opcional(datos, 'nombre_vaca', Bovinos._meta.get_field('nombre').max_length)
+    mac_collar = _texto_opcional(datos, 'mac_collar', Bovinos._meta.get_field('macCollar').max_length)
+
+    ahora = ahora or hora_guayaquil()
+
+    return {
+        'collar_id': collar_id,
+        'nombre_vaca': nombre_vaca,
+        'mac_collar': mac_collar,
+        'temperatura': temperatura,
+        'pulsaciones': pulsaciones,
+        'fecha_lectura': ahora.date(),
+        'hora_lectura': ahora.time(),
+    }
+
+
+def notificar_lecturas(lecturas):
+    """
+    Al confirmar la transacción actualiza la caché del hato y las versiones
+    de los collares (ETag) y publica las lecturas al monitoreo en vivo
+    """
+    transaction.on_commit(lambda: cache_hato.actualizar_lecturas(lecturas))
+    transaction.on_commit(
+        lambda: versiones_collar.incrementar(*{lectura.id_Bovino.idCollar for lectura in lecturas})
+    )
+    publicar_lecturas(lecturas)
+
+
+def guardar_lecturas_lote(lecturas, fuente='arduino'):
+    """
+    Guarda un lote de lecturas normalizadas en una única transacción
+
+    Resuelve todos los collares con una sola consulta, crea los bovinos
+    nuevos, escribe una fila de Lectura por lectura con bulk_create y suma
+    el lote a los resúmenes horario y diario.
+    Al confirmar la transacción las notifica a la caché del hato y al
+    monitoreo en vivo.
+
+    Args:
+        lecturas: lista de dicts retornados por normalizar_lectura
+        fuente: origen de las lecturas
+
+    Returns:
+        list[Lectura] en el mismo orden que las lecturas recibidas
+    """
+    if not lecturas:
+        return []
+
+    with transaction.atomic():
+        collar_ids = {lectura['collar_id'] for lectura in lecturas}
+        bovinos = {
+            bovino.idCollar: bovino
+            for bovino in Bovinos.objects.filter(idCollar__in=collar_ids)
+        }
+
+        nuevos = []
+        modificados = {}
+        for lectura in lecturas:
+            collar_id = lectura['collar_id']
+            bovino = bovinos.get(collar_id)
+            if bovino is None:
+                bovino = Bovinos(
+                    idCollar=collar_id,
+                    nombre=lectura['nombre_vaca'] or f'Collar {collar_id}',
+                    macCollar=lectura['mac_collar'],
+                    fecha_registro=lectura['fecha_lectura'],
+                    activo=True,
+                )
+                bovinos[collar_id] = bovino
+                nuevos.append(bovino)
+            elif lectura['mac_collar'] and bovino.macCollar != lectura['mac_collar']:
+                bovino.macCollar = lectura['mac_collar']
+                if bovino.pk:
+                    modificados[collar_id] = bovino
+
+        if nuevos:
+            # Otro lote puede crear el mismo collar a la vez: se ignora el
+            # conflicto y se leen las filas que quedaron (propias o ajenas)
+            Bovinos.objects.bulk_create(nuevos, ignore_conflicts=True)
+            bovinos.update(
+                (bovino.idCollar, bovino)
+                for bovino in Bovinos.objects.filter(idCollar__in=[nuevo.idCollar for nuevo in nuevos])
+            )
+        # Antes de insertar: una reconstrucción de resúmenes en curso no cuenta este lote dos veces
+        bloquear_bovinos([bovino.pk for bovino in bovinos.values() if bovino.pk])
+        if modificados:
+            Bovinos.objects.bulk_update(modificados.values(), ['macCollar'])
+
+        guardadas = Lectura.objects.bulk_create([
+            Lectura(
+                temperatura=lectura['temperatura'],
+                pulsaciones=lectura['pulsaciones'],
+                id_Bovino=bovinos[lectura['collar_id']],
+                fecha_lectura=lectura['fecha_lectura'],
+                hora_lectura=lectura['hora_lectura'],
+                fuente=fuente,
+            )
+            for lectura in lecturas
+        ])
+        acumular_lecturas(guardadas)
+        notificar_lecturas(guardadas)
+
+    return guardadas
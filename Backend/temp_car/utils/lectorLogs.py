@@ -0,0 +1,385 @@
+"""
+Lectura de archivos de log sin cargarlos completos en memoria
+
+- leer_cola: últimas N líneas leyendo bloques hacia atrás desde el final
+- leer_pagina: un rango de bytes alineado a líneas, para paginar el contenido
+- contar_lineas: total de líneas desde un índice persistente que solo
+  recorre los bytes agregados desde la última consulta
+
+El índice se guarda en LOGS_INDICE_ARCHIVO con una entrada por archivo,
+identificada por (dispositivo, inodo). Al rotar, RotatingFileHandler
+renombra django.log a django.log.1 sin cambiar el inodo, así que el conteo
+del archivo rotado se reutiliza y solo el nuevo django.log empieza de cero.
+Si el archivo se vació o su inicio cambió, se vuelve a contar.
+"""
+
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+TAMANO_BLOQUE = 64 * 1024
+TAMANO_BLOQUE_CONTEO = 1024 * 1024
+TAMANO_PAGINA = 256 * 1024
+TAMANO_PAGINA_MAXIMO = 1024 * 1024
+
+# Cada cuántas líneas se guarda el offset en el índice (para saltar a una línea)
+INTERVALO_MARCAS = 1000
+
+# Bytes iniciales que identifican el contenido del archivo (inodos reutilizados)
+_BYTES_HUELLA = 64
+
+# django.log, django.log.1 ... django.log.5
+_NOMBRE_LOG = re.compile(r'^[\w.-]+\.log(\.\d+)?$')
+
+_lock = threading.Lock()
+
+
+# ----------------------------------------------------------------------
+# Archivos
+# ----------------------------------------------------------------------
+
+def directorio_logs():
+    return Path(settings.LOGS_DIR)
+
+
+def _orden_log(ruta):
+    """django.log, django.log.1, django.log.2 ... (del más nuevo al más viejo)"""
+    base, _, sufijo = ruta.name.partition('.log')
+    return base, int(sufijo[1:]) if sufijo else 0
+
+
+def listar_logs(incluir_rotados=False):
+    """Archivos de log disponibles: nombre -> {'path', 'size'}"""
+    directorio = directorio_logs()
+    if not directorio.exists():
+        return {}
+
+    archivos = {}
+    for ruta in sorted(directorio.iterdir(), key=_orden_log):
+        if not _NOMBRE_LOG.match(ruta.name):
+            continue
+        if not incluir_rotados and not ruta.name.endswith('.log'):
+            continue
+        try:
+            tamano = ruta.stat().st_size
+        except OSError:
+            continue
+        archivos[ruta.name] = {'path': str(ruta), 'size': tamano}
+    return archivos
+
+
+def _decodificar(datos):
+    return datos.decode('utf-8', errors='replace')
+
+
+# ----------------------------------------------------------------------
+# Cola del archivo
+# ----------------------------------------------------------------------
+
+def leer_cola(ruta, lineas=100, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Últimas `lineas` líneas del archivo
+
+    Lee bloques desde el final hacia el inicio hasta reunir suficientes
+    saltos de línea; el costo depende de las líneas pedidas, no del tamaño
+    del archivo.
+    """
+    if lineas <= 0:
+        return []
+
+    with open(ruta, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        posicion = f.tell()
+        bloques = []
+        saltos = 0
+        # Un salto final no separa una línea más
+        objetivo = lineas + 1
+        while posicion > 0 and saltos < objetivo:
+            leer = min(tamano_bloque, posicion)
+            posicion -= leer
+            f.seek(posicion)
+            bloque = f.read(leer)
+            bloques.append(bloque)
+            saltos += bloque.count(b'\n')
+
+    contenido = b''.join(reversed(bloques))
+    resultado = contenido.splitlines(keepends=True)
+    if posicion > 0 and len(resultado) > lineas:
+        # La primera línea puede estar cortada por el límite del bloque
+        resultado = resultado[1:]
+    return [_decodificar(linea) for linea in resultado[-lineas:]]
+
+
+def inicio_cola(ruta, lineas, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Offset donde empiezan las últimas `lineas` líneas completas del archivo
+
+    Una última línea sin salto (aún escribiéndose) queda incluida además de
+    esas; con lineas=0 se obtiene el inicio de esa línea incompleta.
+    """
+    with open(ruta, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        posicion = f.tell()
+        # El primer salto desde el final termina la última línea completa
+        encontrados = -1
+        while posicion > 0:
+            leer = min(tamano_bloque, posicion)
+            posicion -= leer
+            f.seek(posicion)
+            bloque = f.read(leer)
+            indice = len(bloque)
+            while True:
+                indice = bloque.rfind(b'\n', 0, indice)
+                if indice < 0:
+                    break
+                encontrados += 1
+                if encontrados == lineas:
+                    return posicion + indice + 1
+    return 0
+
+
+# ----------------------------------------------------------------------
+# Páginas por rango de bytes
+# ----------------------------------------------------------------------
+
+def _inicio_de_linea(f, offset):
+    """Primer offset >= offset que empieza una línea"""
+    if offset <= 0:
+        return 0
+    f.seek(offset - 1)
+    if f.read(1) == b'\n':
+        return offset
+    while True:
+        bloque = f.read(TAMANO_BLOQUE)
+        if not bloque:
+            return f.tell()
+        indice = bloque.find(b'\n')
+        if indice >= 0:
+            return f.tell() - len(bloque) + indice + 1
+
+
+def _inicio_de_linea_anterior(f, fin):
+    """Inicio de la línea que termina en `fin` (fin es inicio de línea o el final del archivo)"""
+    posicion = fin - 1
+    while posicion > 0:
+        leer = min(TAMANO_BLOQUE, posicion)
+        f.seek(posicion - leer)
+        indice = f.read(leer).rfind(b'\n')
+        if indice >= 0:
+            return posicion - leer + indice + 1
+        posicion -= leer
+    return 0
+
+
+def leer_pagina(ruta, desde=None, hasta=None, tamano=TAMANO_PAGINA):
+    """
+    Página de hasta `tamano` bytes del archivo, cortada en límites de línea
+
+    Con `desde` se avanza hacia el final; con `hasta` se lee la página que
+    termina en ese offset (hacia el inicio). Sin ninguno de los dos se
+    devuelve la primera página.
+
+    Returns:
+        dict con desde, hasta, tamano_archivo, contenido, anterior y
+        siguiente (offsets para pedir la página contigua, o None)
+    """
+    tamano = max(1, min(int(tamano), TAMANO_PAGINA_MAXIMO))
+
+    with open(ruta, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        tamano_archivo = f.tell()
+
+        if hasta is not None:
+            fin = _inicio_de_linea(f, min(max(int(hasta), 0), tamano_archivo))
+            inicio = _inicio_de_linea(f, max(fin - tamano, 0))
+            if inicio >= fin and fin > 0:
+                # Una sola línea más larga que la página: se entrega completa
+                inicio = _inicio_de_linea_anterior(f, fin)
+        else:
+            inicio = _inicio_de_linea(f, min(max(int(desde or 0), 0), tamano_archivo))
+            fin = min(inicio + tamano, tamano_archivo)
+            if fin < tamano_archivo:
+                f.seek(inicio)
+                corte = f.read(fin - inicio).rfind(b'\n')
+                # Sin salto en la página, la línea se entrega completa
+                fin = inicio + corte + 1 if corte >= 0 else _inicio_de_linea(f, fin)
+
+        f.seek(inicio)
+        datos = f.read(fin - inicio)
+
+    return {
+        'desde': inicio,
+        'hasta': fin,
+        'tamano_archivo': tamano_archivo,
+        'contenido': _decodificar(datos),
+        'anterior': inicio if inicio > 0 else None,
+        'siguiente': fin if fin < tamano_archivo else None,
+    }
+
+
+# ----------------------------------------------------------------------
+# Índice de líneas
+# ----------------------------------------------------------------------
+
+def _ruta_indice():
+    return Path(settings.LOGS_INDICE_ARCHIVO)
+
+
+def _cargar_indice():
+    try:
+        with open(_ruta_indice(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_indice(indice):
+    ruta = _ruta_indice()
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(f'{ruta.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(indice, f)
+    os.replace(temporal, ruta)
+
+
+def _huella(f):
+    f.seek(0)
+    return f.read(_BYTES_HUELLA).hex()
+
+
+def _misma_huella(actual, guardada):
+    """El archivo pudo crecer desde que se guardó la huella: se compara el prefijo común"""
+    comun = min(len(actual), len(guardada))
+    return actual[:comun] == guardada[:comun]
+
+
+def _actualizar_entrada(ruta, entrada):
+    """
+    Cuenta los saltos de línea desde entrada['offset'] hasta el final
+
+    Devuelve la entrada actualizada, o una nueva si el archivo ya no es el
+    que se indexó (vaciado o reemplazado).
+    """
+    with open(ruta, 'rb') as f:
+        tamano = os.fstat(f.fileno()).st_size
+        huella = _huella(f)
+        if entrada is None or tamano < entrada['offset'] or not _misma_huella(huella, entrada['huella']):
+            entrada = {'offset': 0, 'saltos': 0, 'marcas': [], 'termina_en_salto': True}
+
+        offset = entrada['offset']
+        saltos = entrada['saltos']
+        marcas = list(entrada['marcas'])
+        termina_en_salto = entrada['termina_en_salto']
+        f.seek(offset)
+        while offset < tamano:
+            bloque = f.read(min(TAMANO_BLOQUE_CONTEO, tamano - offset))
+            if not bloque:
+                break
+            cantidad = bloque.count(b'\n')
+            # Offset de inicio de cada INTERVALO_MARCAS-ésima línea que cae en este bloque
+            siguiente_marca = (len(marcas) + 1) * INTERVALO_MARCAS
+            numero = saltos
+            posicion = -1
+            while saltos + cantidad >= siguiente_marca:
+                while numero < siguiente_marca:
+                    posicion = bloque.index(b'\n', posicion + 1)
+                    numero += 1
+                marcas.append(offset + posicion + 1)
+                siguiente_marca += INTERVALO_MARCAS
+            saltos += cantidad
+            offset += len(bloque)
+            termina_en_salto = bloque.endswith(b'\n')
+
+    return {
+        'nombre': os.path.basename(ruta),
+        'offset': offset,
+        'saltos': saltos,
+        'marcas': marcas,
+        'huella': huella,
+        'termina_en_salto': termina_en_salto,
+    }
+
+
+def _lineas(entrada):
+    """Líneas del archivo: saltos más la última línea si no termina en salto"""
+    return entrada['saltos'] + (0 if entrada['termina_en_salto'] else 1)
+
+
+def contar_lineas(rutas):
+    """
+    Total de líneas de cada archivo, leyendo solo lo agregado desde la última vez
+
+    Args:
+        rutas: rutas de los archivos de log
+
+    Returns:
+        dict ruta -> cantidad de líneas
+    """
+    with _lock:
+        indice = _cargar_indice()
+        nuevo = {}
+        totales = {}
+        for ruta in rutas:
+            try:
+                estado = os.stat(ruta)
+            except OSError:
+                continue
+            clave = f'{estado.st_dev}:{estado.st_ino}'
+            entrada = _actualizar_entrada(ruta, indice.get(clave))
+            nuevo[clave] = entrada
+            totales[ruta] = _lineas(entrada)
+
+        # Se conservan las entradas de archivos que no se consultaron y siguen existiendo
+        for clave, entrada in indice.items():
+            if clave in nuevo:
+                continue
+            ruta = directorio_logs() / entrada.get('nombre', '')
+            try:
+                estado = os.stat(ruta)
+            except OSError:
+                continue
+            if f'{estado.st_dev}:{estado.st_ino}' == clave:
+                nuevo[clave] = entrada
+
+        if nuevo != indice:
+            _guardar_indice(nuevo)
+    return totales
+
+
+def offset_de_linea(ruta, linea):
+    """
+    Offset en bytes donde empieza la línea `linea` (1 = primera)
+
+    Usa la marca del índice más cercana y recorre solo desde ahí.
+    """
+    if linea <= 1:
+        return 0
+    contar_lineas([ruta])
+    estado = os.stat(ruta)
+    entrada = _cargar_indice().get(f'{estado.st_dev}:{estado.st_ino}')
+    marcas = entrada['marcas'] if entrada else []
+
+    indice_marca = min((linea - 1) // INTERVALO_MARCAS, len(marcas))
+    offset = marcas[indice_marca - 1] if indice_marca else 0
+    faltan = (linea - 1) - indice_marca * INTERVALO_MARCAS
+
+    with open(ruta, 'rb') as f:
+        f.seek(offset)
+        while faltan > 0:
+            bloque = f.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            posicion = -1
+            while faltan > 0:
+                posicion = bloque.find(b'\n', posicion + 1)
+                if posicion < 0:
+                    break
+                faltan -= 1
+            if faltan == 0:
+                return offset + posicion + 1
+            offset += len(bloque)
+    return offset
@@ -0,0 +1,152 @@
+"""
+Registro en memoria de métricas de rendimiento por vista
+
+Por cada nombre de URL resuelto ('recibir_datos', 'datos', 'reportes', ...)
+guarda una ventana circular con las últimas METRICAS_VENTANA peticiones
+(duración, consultas SQL y tiempo de base de datos) y contadores acumulados.
+Los percentiles se calculan al exportar, no en cada petición.
+
+Cada proceso (worker de gunicorn) lleva su propio registro; la etiqueta
+`pid` permite a Prometheus distinguir las series de cada worker.
+"""
+
+import math
+import os
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+CUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+# Peticiones sin URL resuelta (404, redirecciones de APPEND_SLASH, etc.)
+VISTA_SIN_RUTA = 'sin_ruta'
+
+
+def _percentil(ordenados, cuantil):
+    """Percentil por el método del rango más cercano sobre una lista ordenada"""
+    if not ordenados:
+        return 0.0
+    indice = min(len(ordenados) - 1, max(0, math.ceil(cuantil * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class _MetricasVista:
+    __slots__ = ('duraciones', 'consultas', 'tiempos_bd', 'total', 'suma_duracion',
+                 'suma_consultas', 'suma_bd', 'lentas', 'por_estado')
+
+    def __init__(self, ventana):
+        self.duraciones = deque(maxlen=ventana)
+        self.consultas = deque(maxlen=ventana)
+        self.tiempos_bd = deque(maxlen=ventana)
+        self.total = 0
+        self.suma_duracion = 0.0
+        self.suma_consultas = 0
+        self.suma_bd = 0.0
+        self.lentas = 0
+        self.por_estado = defaultdict(int)
+
+
+class RegistroMetricas:
+    """Métricas por vista de este proceso, seguras entre hilos"""
+
+    def __init__(self, ventana=None):
+        self._ventana = ventana
+        self._vistas = {}
+        self._lock = threading.Lock()
+
+    def _vista(self, nombre):
+        vista = self._vistas.get(nombre)
+        if vista is None:
+            vista = self._vistas[nombre] = _MetricasVista(self._ventana or settings.METRICAS_VENTANA)
+        return vista
+
+    def registrar(self, nombre, duracion, consultas, tiempo_bd, estado, lenta=False):
+        with self._lock:
+            vista = self._vista(nombre)
+            vista.duraciones.append(duracion)
+            vista.consultas.append(consultas)
+            vista.tiempos_bd.append(tiempo_bd)
+            vista.total += 1
+            vista.suma_duracion += duracion
+            vista.suma_consultas += consultas
+            vista.suma_bd += tiempo_bd
+            vista.por_estado[f'{estado // 100}xx'] += 1
+            if lenta:
+                vista.lentas += 1
+
+    def instantanea(self):
+        """Copia de las ventanas y contadores para exportar sin bloquear las peticiones"""
+        with self._lock:
+            return {
+                nombre: {
+                    'duraciones': sorted(vista.duraciones),
+                    'consultas': sorted(vista.consultas),
+                    'tiempos_bd': sorted(vista.tiempos_bd),
+                    'total': vista.total,
+                    'suma_duracion': vista.suma_duracion,
+                    'suma_consultas': vista.suma_consultas,
+                    'suma_bd': vista.suma_bd,
+                    'lentas': vista.lentas,
+                    'por_estado': dict(vista.por_estado),
+                }
+                for nombre, vista in self._vistas.items()
+            }
+
+    def limpiar(self):
+        with self._lock:
+            self._vistas.clear()
+
+
+registro_metricas = RegistroMetricas()
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(**valores):
+    return '{' + ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in valores.items()) + '}'
+
+
+def _resumen(lineas, nombre, ayuda, campo, campo_suma, datos, pid):
+    lineas.append(f'# HELP {nombre} {ayuda}')
+    lineas.append(f'# TYPE {nombre} summary')
+    for vista, metricas in datos.items():
+        for cuantil in CUANTILES:
+            valor = _percentil(metricas[campo], cuantil)
+            lineas.append(f'{nombre}{_etiquetas(vista=vista, pid=pid, quantile=cuantil)} {valor:.6g}')
+        lineas.append(f'{nombre}_sum{_etiquetas(vista=vista, pid=pid)} {metricas[campo_suma]:.6g}')
+        lineas.append(f'{nombre}_count{_etiquetas(vista=vista, pid=pid)} {metricas["total"]}')
+
+
+def exportar_prometheus(registro=None):
+    """
+    Métricas en formato de texto de Prometheus (versión 0.0.4)
+
+    Los cuantiles son de la ventana reciente; _sum y _count son acumulados
+    desde que arrancó el proceso.
+    """
+    datos = (registro or registro_metricas).instantanea()
+    pid = os.getpid()
+    lineas = []
+
+    _resumen(lineas, 'temp_car_peticion_segundos', 'Duración de las peticiones por vista',
+             'duraciones', 'suma_duracion', datos, pid)
+    _resumen(lineas, 'temp_car_peticion_consultas', 'Consultas SQL por petición',
+             'consultas', 'suma_consultas', datos, pid)
+    _resumen(lineas, 'temp_car_peticion_bd_segundos', 'Tiempo en base de datos por petición',
+             'tiempos_bd', 'suma_bd', datos, pid)
+
+    lineas.append('# HELP temp_car_peticiones_total Peticiones atendidas por vista y clase de estado HTTP')
+    lineas.append('# TYPE temp_car_peticiones_total counter')
+    for vista, metricas in datos.items():
+        for estado, total in sorted(metricas['por_estado'].items()):
+            lineas.append(f'temp_car_peticiones_total{_etiquetas(vista=vista, pid=pid, estado=estado)} {total}')
+
+    lineas.append('# HELP temp_car_peticiones_lentas_total Peticiones que superaron los umbrales configurados')
+    lineas.append('# TYPE temp_car_peticiones_lentas_total counter')
+    for vista, metricas in datos.items():
+        lineas.append(f'temp_car_peticiones_lentas_total{_etiquetas(vista=vista, pid=pid)} {metricas["lentas"]}')
+
+    return '\n'.join(lineas) + '\n'
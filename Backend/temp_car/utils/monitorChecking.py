@@ -1,62 +1,48 @@
-from datetime import datetime, date, time
-from temp_car.models import ControlMonitoreo
+from temp_car.models import TurnoCompletado
 
-fecha_actual = datetime.now().date()
-hora_actual = time(10, 0)
+from .calendarioTurnos import RANGOS_TURNO, hoy, turno_de_hora
 
-# Calcular los rangos de tiempo para mañana, tarde y noche
-startMorning = datetime.combine(fecha_actual, time(hour=7, minute=0))
-endMorning = datetime.combine(fecha_actual, time(hour=12, minute=0))
-startAfternoon = datetime.combine(fecha_actual, time(hour=12, minute=0))
-endAfternoon = datetime.combine(fecha_actual, time(hour=18, minute=0))
-startNight = datetime.combine(fecha_actual, time(hour=18, minute=0))
-endNight = datetime.combine(fecha_actual, time(hour=23, minute=59))
+# La fecha se calcula en cada llamada (antes quedaba fija al importar el módulo)
+
+def _sinControl(idBovino, turno):
+    """True si el bovino aún no tiene control hoy en el turno (tabla de turnos completados)"""
+    return not TurnoCompletado.objects.filter(
+        id_Bovino=idBovino,
+        fecha=hoy(),
+        turno=turno,
+    ).exists()
 
 def checkingMorning(idBovino):
-    controlesMorning = ControlMonitoreo.objects.filter(
-        fecha_lectura=fecha_actual,
-        id_Lectura__id_Bovino=idBovino,
-        hora_lectura__range=(startMorning.time(), endMorning.time())
-    ).count()
-    return controlesMorning == 0
+    return _sinControl(idBovino, 'morning')
 
 def checkingAfternoon(idBovino):
-    controlesAfternoon = ControlMonitoreo.objects.filter(
-        id_Lectura__id_Bovino=idBovino,
-        fecha_lectura=fecha_actual,
-        hora_lectura__range=(startAfternoon.time(), endAfternoon.time())
-    ).count()
-    return controlesAfternoon == 0
+    return _sinControl(idBovino, 'afternoon')
 
 def checkingNight(idBovino):
     """Verifica si ya hay registro de noche para hoy"""
-    controlesNight = ControlMonitoreo.objects.filter(
-        id_Lectura__id_Bovino=idBovino,
-        fecha_lectura=fecha_actual,
-        hora_lectura__range=(startNight.time(), endNight.time())
-    ).count()
-    return controlesNight == 0
+    return _sinControl(idBovino, 'evening')
+
+def _enTurno(timeNow, turno):
+    inicio, fin = RANGOS_TURNO[turno]
+    return inicio <= timeNow and (fin is None or timeNow < fin)
 
 def checkHoursMorning(timeNow):
-    return startMorning.time() <= timeNow <= endMorning.time()
+    return _enTurno(timeNow, 'morning')
 
 def checkHoursAfternoon(timeNow):
-    return startAfternoon.time() <= timeNow <= endAfternoon.time()
+    return _enTurno(timeNow, 'afternoon')
 
 def checkHoursNight(timeNow):
     """Verifica si la hora está en rango de noche"""
-    return startNight.time() <= timeNow <= endNight.time()
+    return _enTurno(timeNow, 'evening')
 
 def checkDate(dateNow):
-    return dateNow == fecha_actual
+    return dateNow == hoy()
 
 def getTurno(timeNow):
     """Retorna el nombre del turno basado en la hora"""
-    if startMorning.time() <= timeNow <= endMorning.time():
-        return "mañana"
-    elif startAfternoon.time() <= timeNow <= endAfternoon.time():
-        return "tarde"
-    elif startNight.time() <= timeNow <= endNight.time():
-        return "noche"
-    else:
-        return "fuera de horario"
+    return {
+        'morning': "mañana",
+        'afternoon': "tarde",
+        'evening': "noche",
+    }.get(turno_de_hora(timeNow), "fuera de horario")
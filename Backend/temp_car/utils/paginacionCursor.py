@@ -0,0 +1,160 @@
+"""
+Paginación por cursor (keyset) para los listados de controles de monitoreo
+y de resúmenes de lecturas
+
+En lugar de OFFSET + COUNT(*) cada página se pide con una condición sobre la
+clave de orden del último registro visto; la de los controles,
+(fecha_lectura, hora_lectura, id_Control), recorre el índice
+(-fecha_lectura, -hora_lectura). La página 1000 cuesta lo mismo que la primera.
+
+Los cursores son tokens firmados y opacos para el cliente; uno alterado o
+vencido simplemente vuelve a la primera página.
+"""
+
+import hashlib
+import json
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+
+CAMPOS_CURSOR = ('fecha_lectura', 'hora_lectura', 'id_Control')
+
+SAL_CURSOR = 'temp_car.paginacion'
+TOTAL_CACHE_SEGUNDOS = 60
+
+
+class PaginaCursor:
+    """Página de resultados con los tokens para avanzar y retroceder"""
+
+    def __init__(self, registros, cursor_siguiente=None, cursor_anterior=None, total_aproximado=None):
+        self.object_list = registros
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+        self.total_aproximado = total_aproximado
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+
+def _codificar(valores, direccion):
+    datos = {'v': [v.isoformat() if hasattr(v, 'isoformat') else v for v in valores], 'd': direccion}
+    return signing.dumps(datos, salt=SAL_CURSOR, compress=True)
+
+
+def _decodificar(token, modelo, campos):
+    """(valores, direccion) del token, o None si no es válido"""
+    try:
+        datos = signing.loads(token, salt=SAL_CURSOR)
+        valores = [modelo._meta.get_field(campo).to_python(valor) for campo, valor in zip(campos, datos['v'])]
+    except (signing.BadSignature, KeyError, TypeError, ValueError, ValidationError):
+        return None
+    if len(valores) != len(campos) or datos.get('d') not in ('siguiente', 'anterior'):
+        return None
+    return valores, datos['d']
+
+
+def _posteriores(campos, valores, operador):
+    """
+    Condición lexicográfica (campos) <operador> (valores), con 'lt' o 'gt'
+
+    Se antepone campos[0] <= / >= valor para que la base de datos use el
+    índice como rango en lugar de evaluar el OR sobre toda la tabla.
+    """
+    condicion = Q(**{f'{campos[-1]}__{operador}': valores[-1]})
+    for campo, valor in reversed(list(zip(campos[:-1], valores[:-1]))):
+        condicion = Q(**{f'{campo}__{operador}': valor}) | (Q(**{campo: valor}) & condicion)
+    return Q(**{f'{campos[0]}__{operador}e': valores[0]}) & condicion
+
+
+def _clave(registro, campos):
+    return [getattr(registro, campo) for campo in campos]
+
+
+def total_aproximado(queryset):
+    """
+    Total aproximado de filas del queryset
+
+    En PostgreSQL se usa la estimación del planificador (EXPLAIN, sin recorrer
+    la tabla); en otros motores un COUNT(*) guardado en caché unos segundos.
+    """
+    queryset = queryset.order_by()
+    conexion = connections[queryset.db]
+    if conexion.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with conexion.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    clave = 'paginacion_total_' + hashlib.md5(str(queryset.query).encode('utf-8')).hexdigest()
+    total = cache.get(clave)
+    if total is None:
+        total = queryset.count()
+        cache.set(clave, total, TOTAL_CACHE_SEGUNDOS)
+    return total
+
+
+def paginar_por_cursor(queryset, cursor=None, tamano=10, campos=CAMPOS_CURSOR, con_total=False):
+    """
+    Página del queryset ordenado de forma descendente por `campos`
+
+    Args:
+        queryset: QuerySet sin ordenar (el orden lo define esta función)
+        cursor: token recibido en la petición, None para la primera página
+        tamano: registros por página
+        campos: clave de orden única; el último campo debe ser la PK
+        con_total: calcula también total_aproximado
+
+    Returns:
+        PaginaCursor
+    """
+    descendente = [f'-{campo}' for campo in campos]
+    posicion = _decodificar(cursor, queryset.model, campos) if cursor else None
+
+    if posicion is None:
+        registros = list(queryset.order_by(*descendente)[:tamano + 1])
+        hay_mas = len(registros) > tamano
+        registros = registros[:tamano]
+        hay_antes = False
+    else:
+        valores, direccion = posicion
+        if direccion == 'siguiente':
+            registros = list(queryset.filter(_posteriores(campos, valores, 'lt')).order_by(*descendente)[:tamano + 1])
+            hay_mas = len(registros) > tamano
+            registros = registros[:tamano]
+            hay_antes = True
+        else:
+            registros = list(queryset.filter(_posteriores(campos, valores, 'gt')).order_by(*campos)[:tamano + 1])
+            hay_antes = len(registros) > tamano
+            registros = registros[:tamano][::-1]
+            hay_mas = True
+
+        if not registros:
+            # Los registros del cursor ya no existen: se vuelve a la primera página
+            return paginar_por_cursor(queryset, None, tamano, campos, con_total)
+
+    return PaginaCursor(
+        registros,
+        cursor_siguiente=_codificar(_clave(registros[-1], campos), 'siguiente') if registros and hay_mas else None,
+        cursor_anterior=_codificar(_clave(registros[0], campos), 'anterior') if registros and hay_antes else None,
+        total_aproximado=total_aproximado(queryset) if con_total else None,
+    )
@@ -0,0 +1,117 @@
+"""
+Canal de publicación/suscripción en memoria del proceso
+
+La ingesta publica aquí cada lectura confirmada y los streams SSE del
+dashboard se suscriben para reenviarlas al navegador. La publicación es
+segura entre hilos y no bloquea: cada suscriptor tiene una cola acotada y,
+si un cliente lento la llena, los mensajes nuevos se descartan para él.
+
+Los suscriptores pueden ser síncronos (generadores bajo WSGI, cola de
+threading) o asíncronos (generadores bajo ASGI, asyncio.Queue entregada con
+call_soon_threadsafe en su event loop).
+
+Solo alcanza a los suscriptores del mismo proceso; con varios workers el
+stream complementa estos mensajes con una consulta periódica a la base de
+datos (ver utils/eventosMonitoreo.py).
+"""
+
+import asyncio
+import queue
+import threading
+
+_suscriptores = {}
+_lock = threading.Lock()
+
+
+class Suscripcion:
+    """Suscripción a un canal con cola acotada propia"""
+
+    def __init__(self, canal, filtro=None, maximo=256, loop=None):
+        self.canal = canal
+        self.filtro = filtro
+        self.loop = loop
+        self.descartados = 0
+        if loop is not None:
+            self._cola = asyncio.Queue(maxsize=maximo)
+        else:
+            self._cola = queue.Queue(maxsize=maximo)
+
+    def _entregar(self, mensaje):
+        """Llamado por publicar() desde cualquier hilo"""
+        if self.filtro is not None and not self.filtro(mensaje):
+            return
+        if self.loop is None:
+            self._poner(mensaje)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._poner, mensaje)
+        except RuntimeError:
+            pass  # El event loop del suscriptor ya se cerró
+
+    def _poner(self, mensaje):
+        try:
+            self._cola.put_nowait(mensaje)
+        except (queue.Full, asyncio.QueueFull):
+            self.descartados += 1
+
+    def obtener(self, timeout=None):
+        """Espera el siguiente mensaje (suscriptor síncrono); None si vence el timeout"""
+        try:
+            return self._cola.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def obtener_async(self, timeout=None):
+        """Espera el siguiente mensaje (suscriptor asíncrono); None si vence el timeout"""
+        try:
+            return await asyncio.wait_for(self._cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def cerrar(self):
+        desuscribir(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+
+def suscribir(canal, filtro=None, maximo=256, loop=None):
+    """
+    Crea una suscripción al canal
+
+    Args:
+        canal: nombre del canal
+        filtro: callable(mensaje) -> bool para descartar mensajes no deseados
+        maximo: tamaño de la cola del suscriptor
+        loop: event loop del suscriptor asíncrono (None para síncrono)
+    """
+    suscripcion = Suscripcion(canal, filtro, maximo, loop)
+    with _lock:
+        _suscriptores.setdefault(canal, set()).add(suscripcion)
+    return suscripcion
+
+
+def desuscribir(suscripcion):
+    with _lock:
+        suscriptores = _suscriptores.get(suscripcion.canal)
+        if suscriptores is not None:
+            suscriptores.discard(suscripcion)
+            if not suscriptores:
+                del _suscriptores[suscripcion.canal]
+
+
+def publicar(canal, mensaje):
+    """Entrega el mensaje a todos los suscriptores del canal; retorna cuántos había"""
+    with _lock:
+        suscriptores = list(_suscriptores.get(canal, ()))
+    for suscripcion in suscriptores:
+        suscripcion._entregar(mensaje)
+    return len(suscriptores)
+
+
+def total_suscriptores(canal):
+    with _lock:
+        return len(_suscriptores.get(canal, ()))
@@ -0,0 +1,308 @@
+"""
+Motor de reglas de alertas evaluado en la ingesta de lecturas del Arduino
+
+Cada lectura recibida actualiza el estado en memoria de su collar y evalúa
+las reglas activas (ALERTAS_REGLAS) sin consultar el historial. El estado
+por collar es de tamaño fijo:
+- las últimas ALERTAS_VENTANA temperaturas y pulsaciones, con sus sumas
+  corrientes (la media de la ventana se actualiza en O(1))
+- una media larga (EWMA lenta) de la temperatura como línea base
+- desde cuándo la temperatura sigue por encima de ALERTAS_FIEBRE_UMBRAL
+- las alertas abiertas por regla
+
+El costo por lectura es constante sin importar el tamaño del hato.
+
+Deduplicación: mientras una regla se siga cumpliendo su alerta queda abierta
+y solo suma repeticiones en memoria; al dejar de cumplirse se cierra (fin).
+Si vuelve a cumplirse antes de ALERTAS_SUPRESION_MINUTOS se reabre la misma
+alerta. La base de datos solo se toca al abrir o cerrar una alerta. Al abrir
+una alerta se busca también una abierta por otro worker para el mismo collar
+y regla: con varios workers cada uno ve solo las lecturas que recibe, pero no
+se duplican alertas. Si dos workers la abren a la vez, la restricción única
+de alertas abiertas rechaza la segunda y ese worker se suma a la primera.
+
+Cada alerta nueva se guarda en AlertaMonitoreo, se publica como evento
+'alerta' en el canal de monitoreo en vivo y se registra con
+MonitoringLogger.log_monitoring_alert.
+"""
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+from temp_car.logging_utils import MonitoringLogger
+from temp_car.models import AlertaMonitoreo
+
+from .calendarioTurnos import ZONA_HORARIA
+from .eventosMonitoreo import publicar_alerta
+
+logger = logging.getLogger('temp_car')
+
+# Mismos límites que Lectura.estado_salud para 'Crítico'
+TEMPERATURA_CRITICA_ALTA = 40.0
+TEMPERATURA_CRITICA_BAJA = 36.0
+# Peso de cada lectura en la media larga de temperatura
+ALFA_MEDIA_LARGA = 0.01
+
+
+class EstadoCollar:
+    """Estado O(1) de un collar: ventana con sumas corrientes, media larga y alertas abiertas"""
+
+    __slots__ = (
+        'nombre', 'temperaturas', 'pulsaciones', 'suma_temperatura', 'suma_pulsaciones',
+        'media_larga', 'lecturas', 'encima_desde', 'instante', 'abiertas',
+    )
+
+    def __init__(self, ventana):
+        self.nombre = None
+        self.temperaturas = deque(maxlen=ventana)
+        self.pulsaciones = deque(maxlen=ventana)
+        self.suma_temperatura = 0.0
+        self.suma_pulsaciones = 0.0
+        self.media_larga = None
+        self.lecturas = 0
+        self.encima_desde = None
+        self.instante = None
+        self.abiertas = {}  # regla -> [id de AlertaMonitoreo, repeticiones]
+
+    @staticmethod
+    def _agregar(valores, suma, valor):
+        if len(valores) == valores.maxlen:
+            suma -= valores[0]
+        valores.append(valor)
+        return suma + valor
+
+    def agregar(self, instante, temperatura, pulsaciones):
+        self.instante = instante
+        self.lecturas += 1
+        self.suma_temperatura = self._agregar(self.temperaturas, self.suma_temperatura, temperatura)
+        if pulsaciones is not None:
+            self.suma_pulsaciones = self._agregar(self.pulsaciones, self.suma_pulsaciones, pulsaciones)
+        if temperatura >= settings.ALERTAS_FIEBRE_UMBRAL:
+            if self.encima_desde is None:
+                self.encima_desde = instante
+        else:
+            self.encima_desde = None
+
+    def actualizar_media_larga(self, temperatura):
+        # Después de evaluar: la lectura actual no entra en su propia línea base
+        if self.media_larga is None:
+            self.media_larga = temperatura
+        else:
+            self.media_larga += ALFA_MEDIA_LARGA * (temperatura - self.media_larga)
+
+    @property
+    def ventana_llena(self):
+        return len(self.temperaturas) == self.temperaturas.maxlen
+
+    @property
+    def media_temperatura(self):
+        return self.suma_temperatura / len(self.temperaturas)
+
+    @property
+    def media_pulsaciones(self):
+        return self.suma_pulsaciones / len(self.pulsaciones) if self.pulsaciones else None
+
+
+# ----------------------------------------------------------------------
+# Reglas: evaluar() retorna (severidad, valor, mensaje) si se cumple, o None
+# ----------------------------------------------------------------------
+
+class Regla(ABC):
+    nombre = None
+
+    @abstractmethod
+    def evaluar(self, estado, temperatura):
+        """(severidad, valor, mensaje) si la regla se cumple con el estado actual, o None"""
+
+
+class TemperaturaExtrema(Regla):
+    """Una sola lectura fuera del rango crítico"""
+    nombre = 'temperatura_extrema'
+
+    def evaluar(self, estado, temperatura):
+        if temperatura > TEMPERATURA_CRITICA_ALTA:
+            return 'Crítico', temperatura, f'Temperatura de {temperatura:.1f}°C (fiebre alta)'
+        if temperatura < TEMPERATURA_CRITICA_BAJA:
+            return 'Crítico', temperatura, f'Temperatura de {temperatura:.1f}°C (hipotermia)'
+        return None
+
+
+class FiebreSostenida(Regla):
+    """Temperatura sobre el umbral de fiebre durante al menos ALERTAS_FIEBRE_MINUTOS"""
+    nombre = 'fiebre_sostenida'
+
+    def evaluar(self, estado, temperatura):
+        if estado.encima_desde is None:
+            return None
+        minutos = (estado.instante - estado.encima_desde).total_seconds() / 60
+        if minutos < settings.ALERTAS_FIEBRE_MINUTOS:
+            return None
+        return 'Crítico', round(minutos, 1), (
+            f'Temperatura sobre {settings.ALERTAS_FIEBRE_UMBRAL}°C durante {minutos:.0f} minutos'
+        )
+
+
+class SubidaTemperatura(Regla):
+    """Media de la ventana por encima de la media larga en ALERTAS_SUBIDA_GRADOS o más"""
+    nombre = 'subida_temperatura'
+
+    def evaluar(self, estado, temperatura):
+        if not estado.ventana_llena or estado.media_larga is None or estado.lecturas <= 2 * estado.temperaturas.maxlen:
+            return None  # Sin historia suficiente en este proceso
+        diferencia = estado.media_temperatura - estado.media_larga
+        if diferencia < settings.ALERTAS_SUBIDA_GRADOS:
+            return None
+        return 'Alerta', round(diferencia, 2), (
+            f'Temperatura media {estado.media_temperatura:.1f}°C, {diferencia:.1f}°C sobre su línea base'
+        )
+
+
+class PulsacionesAnormales(Regla):
+    """Media de pulsaciones de la ventana fuera de [ALERTAS_PULSACIONES_MINIMO, ALERTAS_PULSACIONES_MAXIMO]"""
+    nombre = 'pulsaciones_anormales'
+
+    def evaluar(self, estado, temperatura):
+        if len(estado.pulsaciones) < estado.pulsaciones.maxlen:
+            return None
+        media = estado.media_pulsaciones
+        if settings.ALERTAS_PULSACIONES_MINIMO <= media <= settings.ALERTAS_PULSACIONES_MAXIMO:
+            return None
+        return 'Alerta', round(media, 1), f'Pulsaciones medias de {media:.0f} BPM'
+
+
+REGLAS = {regla.nombre: regla for regla in (TemperaturaExtrema, FiebreSostenida, SubidaTemperatura, PulsacionesAnormales)}
+
+
+class MotorAlertas:
+    """Estado por collar y evaluación incremental de las reglas configuradas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._estados = {}
+        self._reglas = None
+
+    @property
+    def reglas(self):
+        if self._reglas is None:
+            nombres = [nombre.strip() for nombre in settings.ALERTAS_REGLAS.split(',') if nombre.strip()]
+            desconocidas = [nombre for nombre in nombres if nombre not in REGLAS]
+            if desconocidas:
+                logger.warning(f"ALERTAS | Reglas desconocidas ignoradas: {', '.join(desconocidas)}")
+            self._reglas = [REGLAS[nombre]() for nombre in nombres if nombre in REGLAS]
+        return self._reglas
+
+    def evaluar(self, lectura, nombre=None):
+        """
+        Evalúa las reglas con una lectura normalizada (normalizar_lectura)
+
+        Returns:
+            list de AlertaMonitoreo abiertas por esta lectura
+        """
+        temperatura = lectura['temperatura']
+        instante = datetime.combine(lectura['fecha_lectura'], lectura['hora_lectura'])
+        abrir, cerrar = [], []
+        with self._lock:
+            estado = self._estados.get(lectura['collar_id'])
+            if estado is None:
+                estado = self._estados[lectura['collar_id']] = EstadoCollar(settings.ALERTAS_VENTANA)
+            estado.nombre = nombre or lectura.get('nombre_vaca') or estado.nombre
+            estado.agregar(instante, temperatura, lectura.get('pulsaciones'))
+
+            for regla in self.reglas:
+                resultado = regla.evaluar(estado, temperatura)
+                abierta = estado.abiertas.get(regla.nombre)
+                if resultado is not None and abierta is not None:
+                    abierta[1] += 1
+                elif resultado is not None:
+                    abrir.append((regla.nombre, resultado))
+                elif abierta is not None:
+                    del estado.abiertas[regla.nombre]
+                    cerrar.append(abierta)
+            estado.actualizar_media_larga(temperatura)
+
+        # Escrituras fuera del lock: solo al abrir o cerrar alertas
+        fin = ZONA_HORARIA.localize(instante)
+        for alerta_id, repeticiones in cerrar:
+            AlertaMonitoreo.objects.filter(pk=alerta_id).update(
+                fin=fin, repeticiones=F('repeticiones') + repeticiones - 1,
+            )
+        return [
+            alerta for alerta in (
+                self._abrir(lectura['collar_id'], estado, regla, resultado, fin)
+                for regla, resultado in abrir
+            )
+            if alerta is not None
+        ]
+
+    def _abrir(self, collar_id, estado, regla, resultado, inicio):
+        severidad, valor, mensaje = resultado
+        supresion = timedelta(minutes=settings.ALERTAS_SUPRESION_MINUTOS)
+        # Dos intentos: si otro worker abre la misma alerta a la vez, la
+        # restricción única rechaza esta y en el segundo ya se encuentra la suya
+        for intento in range(2):
+            try:
+                with transaction.atomic():
+                    # Abierta por otro worker o cerrada hace poco: se reabre la misma
+                    existente = (
+                        AlertaMonitoreo.objects
+                        .select_for_update()
+                        .filter(collar_id=collar_id, regla=regla)
+                        .filter(Q(fin__isnull=True) | Q(fin__gte=inicio - supresion))
+                        .order_by(F('fin').desc(nulls_first=True), '-inicio')
+                        .first()
+                    )
+                    if existente is not None:
+                        AlertaMonitoreo.objects.filter(pk=existente.pk).update(
+                            fin=None, repeticiones=F('repeticiones') + 1,
+                        )
+                        alerta = None
+                    else:
+                        alerta = AlertaMonitoreo.objects.create(
+                            collar_id=collar_id,
+                            nombre=estado.nombre,
+                            regla=regla,
+                            severidad=severidad,
+                            valor=valor,
+                            mensaje=mensaje,
+                            inicio=inicio,
+                        )
+                break
+            except IntegrityError:
+                if intento:
+                    raise
+
+        with self._lock:
+            estado.abiertas[regla] = [existente.pk if alerta is None else alerta.pk, 1]
+        if alerta is None:
+            return None
+        MonitoringLogger.log_monitoring_alert(estado.nombre, collar_id, regla, valor)
+        publicar_alerta(alerta)
+        return alerta
+
+    def evaluar_lote(self, lecturas, nombres=None):
+        """
+        Evalúa varias lecturas sin interrumpir la ingesta si algo falla
+
+        Args:
+            lecturas: lecturas normalizadas
+            nombres: nombres de bovino en el mismo orden (opcional)
+        """
+        if not settings.ALERTAS_ACTIVAS:
+            return []
+        alertas = []
+        for indice, lectura in enumerate(lecturas):
+            try:
+                alertas += self.evaluar(lectura, nombres[indice] if nombres else None)
+            except Exception as e:
+                logger.warning(f"ALERTAS | Error evaluando collar {lectura.get('collar_id')}: {str(e)}")
+        return alertas
+
+
+motor_alertas = MotorAlertas()
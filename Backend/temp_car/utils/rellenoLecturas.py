@@ -0,0 +1,58 @@
+"""
+Relleno de temperatura y pulsaciones en la fila de Lectura desde las tablas legacy
+Se ejecuta por tramos de id_Lectura confirmados por separado, de modo que puede
+interrumpirse y reanudarse: solo toca lecturas que aún no tienen valores propios
+"""
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+
+def rellenar_lecturas(Lectura, Temperatura, Pulsaciones, tamano_tramo=5000, progreso=None):
+    """
+    Copia id_Temperatura.valor e id_Pulsaciones.valor a las columnas de Lectura
+
+    Recibe las clases de modelo como parámetros para poder usarse tanto desde
+    una migración (modelos históricos) como desde un comando de gestión.
+
+    Args:
+        tamano_tramo: cantidad de id_Lectura por UPDATE/commit
+        progreso: callable opcional (ultimo_id, id_maximo, actualizadas)
+
+    Returns:
+        int: total de lecturas actualizadas
+    """
+    pendientes = Lectura.objects.filter(
+        temperatura__isnull=True,
+        id_Temperatura__isnull=False
+    ).order_by('id_Lectura')
+
+    primera = pendientes.values_list('id_Lectura', flat=True).first()
+    if primera is None:
+        return 0
+    id_maximo = pendientes.order_by('-id_Lectura').values_list('id_Lectura', flat=True).first()
+
+    temperatura = Temperatura.objects.filter(
+        id_Temperatura=OuterRef('id_Temperatura')
+    ).values('valor')[:1]
+    pulsaciones = Pulsaciones.objects.filter(
+        id_Pulsaciones=OuterRef('id_Pulsaciones')
+    ).values('valor')[:1]
+
+    total = 0
+    inicio = primera
+    while inicio <= id_maximo:
+        fin = inicio + tamano_tramo
+        with transaction.atomic():
+            total += pendientes.filter(
+                id_Lectura__gte=inicio,
+                id_Lectura__lt=fin
+            ).update(
+                temperatura=Subquery(temperatura),
+                pulsaciones=Subquery(pulsaciones)
+            )
+        if progreso:
+            progreso(min(fin - 1, id_maximo), id_maximo, total)
+        inicio = fin
+
+    return total
@@ -0,0 +1,353 @@
+"""
+Generación de reportes PDF en segundo plano con caché en disco
+
+/generar_pdf/ ya no renderiza con xhtml2pdf dentro de la petición: calcula la
+clave del reporte y, si el PDF ya existe en REPORTES_PDF_DIRECTORIO, lo sirve
+al instante; si no, encola un trabajo en el pool de hilos local y responde con
+el id del trabajo para consultar su estado y descargarlo.
+
+La clave (y el id del trabajo) es el sha256 de los filtros normalizados más
+una marca de versión de los datos: cantidad de controles, máximo id_Control y
+máxima fecha_actualizacion del rango. Si se crea, edita o borra un control del
+rango, la marca cambia y el reporte se vuelve a generar; los días pasados
+quedan en caché indefinidamente.
+
+El estado vive en disco junto al PDF, así cualquier worker de gunicorn puede
+responder la consulta:
+    <clave>.json     trabajo encolado (filtros y hora de inicio)
+    <clave>.pdf      reporte terminado
+    <clave>.filtros  filtros del reporte terminado (nombre de la descarga)
+    <clave>.error    el trabajo falló (mensaje de error)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time as pytime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from html import escape
+from io import BytesIO
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Count, Max
+from xhtml2pdf import pisa
+
+from .exportacionReportes import filas_exportacion, filtrar_controles
+
+logger = logging.getLogger('temp_car')
+
+# Cambiarlo invalida todos los PDF en caché (p. ej. al modificar el diseño)
+VERSION_PLANTILLA = 1
+
+PARAMETROS_FILTRO = ('fecha_busqueda', 'desde', 'hasta', 'collar', 'turno')
+
+_CLAVE_VALIDA = re.compile(r'^[0-9a-f]{64}$')
+
+_ENCABEZADO = """
+<div style="text-align: center; margin: 20px 0;">
+    <h1 style="font-size: 24px; color: #333; margin: 0;">Reporte de Monitoreos al Ganado Bovino Lechero</h1>
+    <p style="font-size: 12px; color: #666; margin-top: 5px;">Universidad Nacional de Loja - Carrera de Ingeniería en Computación</p>
+</div>
+"""
+
+_PIE = """
+<footer style="text-align: center; margin-top: 20px; background-color: #f8f8f8; padding: 10px;">
+    <p style="font-size: 12px; color: #333; margin: 0;">© Todos los derechos reservados | Carrera de Ingeniería en Computación</p>
+</footer>
+"""
+
+_CELDA = 'padding: 8px; text-align: center; border: 1px solid #ddd;'
+_CABECERA = 'padding: 8px; text-align: center; background-color: #72b4fc; border: 1px solid #ddd;'
+
+
+# ----------------------------------------------------------------------
+# Construcción del PDF
+# ----------------------------------------------------------------------
+
+def _texto(valor):
+    return escape(str(valor)) if valor is not None else ''
+
+
+def construir_html(controles):
+    """Tabla HTML del reporte; las filas se acumulan en una lista y se unen una sola vez"""
+    filas = []
+    for collar, nombre, fecha, hora, _turno, temperatura, pulsaciones, *_ in filas_exportacion(controles):
+        filas.append(
+            '<tr>'
+            f'<td style="{_CELDA}">{_texto(collar)}</td>'
+            f'<td style="{_CELDA}">{_texto(nombre)}</td>'
+            f'<td style="{_CELDA}">{fecha.strftime("%d-%m-%Y")} {hora.strftime("%H:%M")}</td>'
+            f'<td style="{_CELDA}">{_texto(temperatura)}°C</td>'
+            f'<td style="{_CELDA}">{_texto(pulsaciones)} BPM</td>'
+            '</tr>'
+        )
+    if not filas:
+        filas.append('<tr><td colspan="5" style="padding: 8px; text-align: center;">No hay reportes disponibles</td></tr>')
+
+    cabeceras = ''.join(
+        f'<th style="{_CABECERA}">{titulo}</th>'
+        for titulo in ('Collar', 'Nombre', 'Fecha y Hora', 'Temperatura', 'Pulsaciones')
+    )
+    return ''.join([
+        _ENCABEZADO,
+        '<table id="tablaReportes" style="width: 95%; margin: 20px auto; border-collapse: collapse;">',
+        f'<thead><tr>{cabeceras}</tr></thead><tbody>',
+        '\n'.join(filas),
+        '</tbody></table>',
+        _PIE,
+    ])
+
+
+def renderizar_pdf(html):
+    """Convierte el HTML a PDF con xhtml2pdf; devuelve los bytes o None si falla"""
+    resultado = BytesIO()
+    pdf = pisa.pisaDocument(BytesIO(html.encode('ISO-8859-1', errors='replace')), resultado)
+    if pdf.err:
+        return None
+    return resultado.getvalue()
+
+
+# ----------------------------------------------------------------------
+# Clave de caché
+# ----------------------------------------------------------------------
+
+def filtros_normalizados(params):
+    """Filtros del reporte en forma canónica (el orden de los parámetros no cambia la clave)"""
+    filtros = {}
+    for nombre in PARAMETROS_FILTRO:
+        if nombre == 'collar':
+            valores = sorted(
+                valor.strip()
+                for parametro in params.getlist('collar')
+                for valor in parametro.split(',')
+                if valor.strip()
+            )
+            if valores:
+                filtros['collar'] = valores
+        elif params.get(nombre):
+            filtros[nombre] = params.get(nombre)
+    return filtros
+
+
+class _Parametros(dict):
+    """Filtros normalizados con la interfaz de QueryDict que espera filtrar_controles"""
+
+    def getlist(self, nombre):
+        valor = self.get(nombre)
+        if valor is None:
+            return []
+        return valor if isinstance(valor, list) else [valor]
+
+
+def version_datos(controles):
+    """Marca de versión de los controles filtrados: cambia con altas, ediciones y bajas"""
+    marca = controles.order_by().aggregate(
+        cantidad=Count('id_Control'),
+        ultimo=Max('id_Control'),
+        actualizado=Max('fecha_actualizacion'),
+    )
+    actualizado = marca['actualizado'].isoformat() if marca['actualizado'] else None
+    return f"{marca['cantidad']}:{marca['ultimo'] or 0}:{actualizado}"
+
+
+def clave_reporte(filtros, version):
+    contenido = json.dumps(
+        {'filtros': filtros, 'version': version, 'plantilla': VERSION_PLANTILLA},
+        sort_keys=True,
+    )
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def clave_valida(clave):
+    return bool(_CLAVE_VALIDA.match(clave or ''))
+
+
+# ----------------------------------------------------------------------
+# Archivos del trabajo
+# ----------------------------------------------------------------------
+
+def _ruta(clave, extension):
+    return os.path.join(settings.REPORTES_PDF_DIRECTORIO, f'{clave}.{extension}')
+
+
+def ruta_pdf(clave):
+    return _ruta(clave, 'pdf')
+
+
+def _escribir_atomico(ruta, contenido):
+    temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def _leer_trabajo(clave):
+    try:
+        with open(_ruta(clave, 'json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _borrar(ruta):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+# ----------------------------------------------------------------------
+# Pool de trabajos
+# ----------------------------------------------------------------------
+
+_pool = None
+_en_curso = set()
+_lock = threading.Lock()
+
+
+def _obtener_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.REPORTES_PDF_WORKERS,
+                thread_name_prefix='reporte-pdf',
+            )
+        return _pool
+
+
+def _generar(clave, filtros):
+    """Cuerpo del trabajo: consulta, renderiza y guarda el PDF"""
+    close_old_connections()
+    inicio = pytime.monotonic()
+    try:
+        controles = filtrar_controles(_Parametros(filtros))
+        pdf = renderizar_pdf(construir_html(controles))
+        if pdf is None:
+            raise RuntimeError('xhtml2pdf no pudo generar el documento')
+        _escribir_atomico(_ruta(clave, 'filtros'), json.dumps(filtros).encode('utf-8'))
+        _escribir_atomico(ruta_pdf(clave), pdf)
+        _borrar(_ruta(clave, 'error'))
+        logger.info(
+            f"REPORTE PDF | {clave[:12]} generado en {pytime.monotonic() - inicio:.1f}s "
+            f"({len(pdf)} bytes, filtros={filtros})"
+        )
+    except Exception as e:
+        logger.error(f"REPORTE PDF | {clave[:12]} falló: {str(e)}", exc_info=True)
+        _escribir_atomico(_ruta(clave, 'error'), str(e).encode('utf-8'))
+    finally:
+        _borrar(_ruta(clave, 'json'))
+        with _lock:
+            _en_curso.discard(clave)
+        connection.close()
+        limpiar_cache()
+
+
+def encolar(clave, filtros):
+    """Encola el trabajo en este proceso si no está ya en curso"""
+    with _lock:
+        if clave in _en_curso:
+            return
+        _en_curso.add(clave)
+
+    os.makedirs(settings.REPORTES_PDF_DIRECTORIO, exist_ok=True)
+    _borrar(_ruta(clave, 'error'))
+    trabajo = {'filtros': filtros, 'encolado': pytime.time(), 'pid': os.getpid()}
+    _escribir_atomico(_ruta(clave, 'json'), json.dumps(trabajo).encode('utf-8'))
+    _obtener_pool().submit(_generar, clave, filtros)
+
+
+def solicitar_reporte(params):
+    """
+    Resuelve la clave del reporte pedido y encola el trabajo si aún no hay PDF
+
+    Returns:
+        (clave, listo)
+
+    Raises:
+        ValueError: si algún filtro no es válido
+    """
+    filtros = filtros_normalizados(params)
+    controles = filtrar_controles(_Parametros(filtros))
+    clave = clave_reporte(filtros, version_datos(controles))
+
+    if os.path.exists(ruta_pdf(clave)):
+        return clave, True
+    encolar(clave, filtros)
+    return clave, False
+
+
+def estado_trabajo(clave):
+    """
+    Estado del trabajo visto desde cualquier worker
+
+    Returns:
+        dict con 'estado' ('listo', 'procesando', 'error' o 'desconocido') y datos extra
+    """
+    if os.path.exists(ruta_pdf(clave)):
+        return {'estado': 'listo', 'tamano': os.path.getsize(ruta_pdf(clave))}
+
+    try:
+        with open(_ruta(clave, 'error'), 'r', encoding='utf-8') as f:
+            return {'estado': 'error', 'detalle': f.read()}
+    except FileNotFoundError:
+        pass
+
+    trabajo = _leer_trabajo(clave)
+    if trabajo is None:
+        return {'estado': 'desconocido'}
+
+    # El proceso que lo tomó pudo haber terminado: se reintenta aquí
+    if clave not in _en_curso and pytime.time() - trabajo['encolado'] > settings.REPORTES_PDF_TIEMPO_MAXIMO:
+        logger.warning(f"REPORTE PDF | {clave[:12]} sin terminar, se reencola en pid {os.getpid()}")
+        encolar(clave, trabajo['filtros'])
+    return {'estado': 'procesando', 'segundos': int(pytime.time() - trabajo['encolado'])}
+
+
+def nombre_reporte(clave):
+    """Nombre del PDF descargado según los filtros con que se generó"""
+    try:
+        with open(_ruta(clave, 'filtros'), 'r', encoding='utf-8') as f:
+            filtros = json.load(f)
+    except (OSError, ValueError):
+        filtros = {}
+
+    if filtros.get('fecha_busqueda'):
+        fecha = filtros['fecha_busqueda']
+    elif filtros.get('desde') or filtros.get('hasta'):
+        fecha = f"{filtros.get('desde') or 'inicio'}_{filtros.get('hasta') or 'hoy'}"
+    else:
+        fecha = datetime.now().strftime('%Y-%m-%d')
+    return f'reporte_monitoreos_{fecha}.pdf'
+
+
+def marcar_uso(clave):
+    """Renueva la fecha del PDF al descargarlo para que limpiar_cache no lo borre"""
+    try:
+        os.utime(ruta_pdf(clave))
+    except OSError:
+        pass
+
+
+def limpiar_cache():
+    """Borra los PDF y errores sin descargar hace más de REPORTES_PDF_CADUCIDAD_DIAS"""
+    limite = pytime.time() - settings.REPORTES_PDF_CADUCIDAD_DIAS * 86400
+    try:
+        entradas = list(os.scandir(settings.REPORTES_PDF_DIRECTORIO))
+    except FileNotFoundError:
+        return
+    for entrada in entradas:
+        if not entrada.name.endswith(('.pdf', '.error', '.tmp')):
+            continue
+        try:
+            if entrada.stat().st_mtime < limite:
+                os.remove(entrada.path)
+                if entrada.name.endswith('.pdf'):
+                    _borrar(f'{entrada.path[:-len(".pdf")]}.filtros')
+        except OSError:
+            pass
@@ -0,0 +1,398 @@
+"""
+Resúmenes (rollups) horarios y diarios de lecturas por bovino
+
+Cada resumen guarda mínimo, máximo, suma y cantidad de temperatura y
+pulsaciones, y la última lectura del intervalo. La ingesta los actualiza
+incrementalmente dentro de su misma transacción (acumular_lecturas) y el
+comando resumir_lecturas los reconstruye desde las lecturas crudas
+(reconstruir_resumenes), de forma idempotente.
+
+Mínimo y máximo no se pueden restar: al borrar lecturas se reconstruye, al
+confirmar el borrado, el día de cada bovino afectado (programar_reconstruccion).
+
+Ingesta y reconstrucción bloquean las filas de los bovinos (select_for_update)
+antes de tocar sus resúmenes. Así una reconstrucción no se intercala con un
+lote de los mismos bovinos: o lee sus lecturas ya confirmadas, o el lote se
+suma después sobre los resúmenes reconstruidos.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from temp_car.models import Bovinos, Lectura, ResumenLecturaDia, ResumenLecturaHora
+
+CAMPOS_RESUMEN = [
+    'cantidad',
+    'temperatura_min', 'temperatura_max', 'temperatura_suma', 'temperatura_cantidad',
+    'pulsaciones_min', 'pulsaciones_max', 'pulsaciones_suma', 'pulsaciones_cantidad',
+    'ultima_temperatura', 'ultimas_pulsaciones', 'ultima_hora', 'ultima_lectura_id',
+    'fecha_actualizacion',
+]
+
+RESOLUCIONES = {
+    'hora': ResumenLecturaHora,
+    'dia': ResumenLecturaDia,
+}
+
+# Bovinos bloqueados por transacción al reconstruir un día
+BOVINOS_POR_TRANSACCION = 200
+
+
+def _menor(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _mayor(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+class Acumulado:
+    """Agregado en memoria de un intervalo; se combina con otros y se vuelca a un resumen"""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.temperatura_min = None
+        self.temperatura_max = None
+        self.temperatura_suma = 0.0
+        self.temperatura_cantidad = 0
+        self.pulsaciones_min = None
+        self.pulsaciones_max = None
+        self.pulsaciones_suma = 0
+        self.pulsaciones_cantidad = 0
+        self.ultima_temperatura = None
+        self.ultimas_pulsaciones = None
+        self.ultima_hora = None
+        self.ultima_lectura_id = None
+
+    def agregar(self, temperatura, pulsaciones, hora, lectura_id):
+        self.cantidad += 1
+        if temperatura is not None:
+            self.temperatura_min = _menor(self.temperatura_min, temperatura)
+            self.temperatura_max = _mayor(self.temperatura_max, temperatura)
+            self.temperatura_suma += temperatura
+            self.temperatura_cantidad += 1
+        if pulsaciones is not None:
+            self.pulsaciones_min = _menor(self.pulsaciones_min, pulsaciones)
+            self.pulsaciones_max = _mayor(self.pulsaciones_max, pulsaciones)
+            self.pulsaciones_suma += pulsaciones
+            self.pulsaciones_cantidad += 1
+        if self.ultima_hora is None or (hora, lectura_id) >= (self.ultima_hora, self.ultima_lectura_id):
+            self.ultima_temperatura = temperatura
+            self.ultimas_pulsaciones = pulsaciones
+            self.ultima_hora = hora
+            self.ultima_lectura_id = lectura_id
+
+    def combinar(self, otro):
+        self.cantidad += otro.cantidad
+        self.temperatura_min = _menor(self.temperatura_min, otro.temperatura_min)
+        self.temperatura_max = _mayor(self.temperatura_max, otro.temperatura_max)
+        self.temperatura_suma += otro.temperatura_suma
+        self.temperatura_cantidad += otro.temperatura_cantidad
+        self.pulsaciones_min = _menor(self.pulsaciones_min, otro.pulsaciones_min)
+        self.pulsaciones_max = _mayor(self.pulsaciones_max, otro.pulsaciones_max)
+        self.pulsaciones_suma += otro.pulsaciones_suma
+        self.pulsaciones_cantidad += otro.pulsaciones_cantidad
+        if otro.ultima_hora is not None and (
+            self.ultima_hora is None
+            or (otro.ultima_hora, otro.ultima_lectura_id) >= (self.ultima_hora, self.ultima_lectura_id)
+        ):
+            self.ultima_temperatura = otro.ultima_temperatura
+            self.ultimas_pulsaciones = otro.ultimas_pulsaciones
+            self.ultima_hora = otro.ultima_hora
+            self.ultima_lectura_id = otro.ultima_lectura_id
+
+    @classmethod
+    def desde_resumen(cls, resumen):
+        acumulado = cls()
+        for campo in CAMPOS_RESUMEN[:-1]:
+            setattr(acumulado, campo, getattr(resumen, campo))
+        return acumulado
+
+    def volcar(self, resumen):
+        for campo in CAMPOS_RESUMEN[:-1]:
+            setattr(resumen, campo, getattr(self, campo))
+        resumen.fecha_actualizacion = timezone.now()
+        return resumen
+
+
+def _clave_hora(resumen):
+    return (resumen.id_Bovino_id, resumen.fecha, resumen.hora)
+
+
+def _clave_dia(resumen):
+    return (resumen.id_Bovino_id, resumen.fecha)
+
+
+def _fusionar(modelo, campos_clave, clave, acumulados):
+    """Suma los acumulados a los resúmenes existentes (bloqueados) o los crea"""
+    bovinos = {k[0] for k in acumulados}
+    fechas = {k[1] for k in acumulados}
+
+    # Dos ingestas pueden crear el mismo resumen a la vez: la segunda reintenta sumando
+    for intento in range(2):
+        try:
+            with transaction.atomic():
+                existentes = {
+                    clave(resumen): resumen
+                    for resumen in modelo.objects
+                    .select_for_update()
+                    .filter(id_Bovino_id__in=bovinos, fecha__in=fechas)
+                    .order_by('pk')
+                }
+                nuevos = []
+                modificados = []
+                for k, acumulado in acumulados.items():
+                    resumen = existentes.get(k)
+                    if resumen is None:
+                        nuevos.append(acumulado.volcar(modelo(**dict(zip(campos_clave, k)))))
+                    else:
+                        total = Acumulado.desde_resumen(resumen)
+                        total.combinar(acumulado)
+                        modificados.append(total.volcar(resumen))
+
+                if nuevos:
+                    modelo.objects.bulk_create(nuevos)
+                if modificados:
+                    modelo.objects.bulk_update(modificados, CAMPOS_RESUMEN)
+            return
+        except IntegrityError:
+            if intento:
+                raise
+
+
+def bloquear_bovinos(bovino_ids):
+    """Bloquea las filas de los bovinos hasta el fin de la transacción, siempre en el mismo orden"""
+    list(
+        Bovinos.objects
+        .select_for_update()
+        .filter(pk__in=bovino_ids)
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+
+def acumular_lecturas(lecturas):
+    """
+    Suma un lote de lecturas recién guardadas a los resúmenes horario y diario
+    Debe llamarse dentro de la transacción que guardó las lecturas, con sus
+    bovinos bloqueados (bloquear_bovinos) desde antes de insertarlas
+    """
+    horas = defaultdict(Acumulado)
+    dias = defaultdict(Acumulado)
+    for lectura in lecturas:
+        datos = (lectura.temperatura_valor, lectura.pulsaciones_valor, lectura.hora_lectura, lectura.id_Lectura)
+        horas[(lectura.id_Bovino_id, lectura.fecha_lectura, lectura.hora_lectura.hour)].agregar(*datos)
+        dias[(lectura.id_Bovino_id, lectura.fecha_lectura)].agregar(*datos)
+
+    if horas:
+        _fusionar(ResumenLecturaHora, ('id_Bovino_id', 'fecha', 'hora'), _clave_hora, horas)
+        _fusionar(ResumenLecturaDia, ('id_Bovino_id', 'fecha'), _clave_dia, dias)
+
+
+def _reconstruir_dia(fecha, bovino_ids, lecturas, resumenes, tamano_lote):
+    """
+    Reemplaza en una transacción los resúmenes del día de esos bovinos
+
+    Returns:
+        (cantidad de resúmenes por hora, cantidad por día)
+    """
+    horas = defaultdict(Acumulado)
+    dias = defaultdict(Acumulado)
+    with transaction.atomic():
+        bloquear_bovinos(bovino_ids)
+        filas = (
+            lecturas
+            .filter(fecha_lectura=fecha, id_Bovino_id__in=bovino_ids)
+            .annotate(
+                temperatura_real=Coalesce('temperatura', F('id_Temperatura__valor')),
+                pulsaciones_real=Coalesce('pulsaciones', F('id_Pulsaciones__valor')),
+            )
+            .order_by()
+            .values_list('id_Bovino_id', 'hora_lectura', 'id_Lectura', 'temperatura_real', 'pulsaciones_real')
+        )
+        for bovino_id, hora, lectura_id, temperatura, pulsaciones in filas.iterator(chunk_size=5000):
+            datos = (temperatura, pulsaciones, hora, lectura_id)
+            horas[(bovino_id, fecha, hora.hour)].agregar(*datos)
+            dias[(bovino_id, fecha)].agregar(*datos)
+
+        for queryset in resumenes.values():
+            queryset.filter(fecha=fecha, id_Bovino_id__in=bovino_ids).delete()
+        ResumenLecturaHora.objects.bulk_create(
+            [a.volcar(ResumenLecturaHora(id_Bovino_id=b, fecha=f, hora=h)) for (b, f, h), a in horas.items()],
+            batch_size=tamano_lote,
+        )
+        ResumenLecturaDia.objects.bulk_create(
+            [a.volcar(ResumenLecturaDia(id_Bovino_id=b, fecha=f)) for (b, f), a in dias.items()],
+            batch_size=tamano_lote,
+        )
+    return len(horas), len(dias)
+
+
+def reconstruir_resumenes(desde=None, hasta=None, collares=None, tamano_lote=1000, progreso=None):
+    """
+    Recalcula desde las lecturas crudas los resúmenes de cada día del rango
+
+    Cada día se reemplaza por tramos de BOVINOS_POR_TRANSACCION bovinos, cada
+    tramo en su propia transacción con sus bovinos bloqueados: el comando se
+    puede interrumpir y repetir sin duplicar datos, y la ingesta de esos
+    bovinos solo espera lo que tarda un tramo. También elimina resúmenes de
+    días que ya no tienen lecturas.
+
+    Args:
+        desde, hasta: fechas límite (inclusive), None para no acotar
+        collares: lista de idCollar a reconstruir, None para todo el hato
+        progreso: callable(fecha, horas, dias) opcional
+    """
+    lecturas = Lectura.objects.all()
+    resumenes = {modelo: modelo.objects.all() for modelo in RESOLUCIONES.values()}
+    if desde:
+        lecturas = lecturas.filter(fecha_lectura__gte=desde)
+        resumenes = {m: q.filter(fecha__gte=desde) for m, q in resumenes.items()}
+    if hasta:
+        lecturas = lecturas.filter(fecha_lectura__lte=hasta)
+        resumenes = {m: q.filter(fecha__lte=hasta) for m, q in resumenes.items()}
+    if collares:
+        lecturas = lecturas.filter(id_Bovino__idCollar__in=collares)
+        resumenes = {m: q.filter(id_Bovino__idCollar__in=collares) for m, q in resumenes.items()}
+
+    fechas = set(lecturas.values_list('fecha_lectura', flat=True).distinct())
+    for queryset in resumenes.values():
+        fechas.update(queryset.values_list('fecha', flat=True).distinct())
+
+    total = 0
+    for fecha in sorted(fechas):
+        bovino_ids = set(lecturas.filter(fecha_lectura=fecha).values_list('id_Bovino_id', flat=True).distinct())
+        for queryset in resumenes.values():
+            bovino_ids.update(queryset.filter(fecha=fecha).values_list('id_Bovino_id', flat=True).distinct())
+        bovino_ids = sorted(bovino_ids)
+
+        horas = dias = 0
+        for inicio in range(0, len(bovino_ids), BOVINOS_POR_TRANSACCION):
+            tramo = bovino_ids[inicio:inicio + BOVINOS_POR_TRANSACCION]
+            cantidad_horas, cantidad_dias = _reconstruir_dia(fecha, tramo, lecturas, resumenes, tamano_lote)
+            horas += cantidad_horas
+            dias += cantidad_dias
+
+        total += 1
+        if progreso:
+            progreso(fecha, horas, dias)
+
+    return total
+
+
+def recalcular_dias(pares):
+    """Reconstruye los resúmenes de cada (id_Bovino, fecha) desde las lecturas crudas"""
+    por_fecha = defaultdict(set)
+    for bovino_id, fecha in pares:
+        por_fecha[fecha].add(bovino_id)
+    resumenes = {modelo: modelo.objects.all() for modelo in RESOLUCIONES.values()}
+    for fecha, bovino_ids in sorted(por_fecha.items()):
+        _reconstruir_dia(fecha, sorted(bovino_ids), Lectura.objects.all(), resumenes, 1000)
+
+
+def programar_reconstruccion(bovino_id, fecha, origen=None):
+    """
+    Reconstruye, al confirmar la transacción, el día del bovino de una lectura borrada o editada
+
+    Los días de un mismo origen (el `origin` de post_delete, p. ej. un
+    queryset.delete(), o la lectura editada) se agrupan en una sola
+    reconstrucción por bovino y día.
+    """
+    pendientes = getattr(origen, '_dias_por_reconstruir', None)
+    if pendientes is not None:
+        pendientes.add((bovino_id, fecha))
+        return
+
+    # El día se agrega antes de registrar: fuera de una transacción on_commit ejecuta en el acto
+    pendientes = {(bovino_id, fecha)}
+    if origen is not None:
+        origen._dias_por_reconstruir = pendientes
+
+    def _reconstruir():
+        if origen is not None:
+            origen.__dict__.pop('_dias_por_reconstruir', None)
+        recalcular_dias(pendientes)
+
+    transaction.on_commit(_reconstruir)
+
+
+def leer_rango(params):
+    """
+    Lee desde/hasta (YYYY-MM-DD) y resolucion ('hora' o 'dia') de los parámetros GET
+
+    Returns:
+        (desde, hasta, resolucion) o None si no se pidió un rango
+
+    Raises:
+        ValueError: si las fechas o la resolución no son válidas
+    """
+    desde = params.get('desde')
+    hasta = params.get('hasta')
+    if not desde and not hasta:
+        return None
+
+    desde = datetime.strptime(desde, '%Y-%m-%d').date() if desde else None
+    hasta = datetime.strptime(hasta, '%Y-%m-%d').date() if hasta else None
+    if desde and hasta and desde > hasta:
+        raise ValueError('desde no puede ser posterior a hasta')
+
+    resolucion = params.get('resolucion') or 'dia'
+    if resolucion not in RESOLUCIONES:
+        raise ValueError("resolucion debe ser 'hora' o 'dia'")
+    return desde, hasta, resolucion
+
+
+# Clave de orden única de cada resolución para paginar_por_cursor (la PK al final)
+CAMPOS_CURSOR_RESUMEN = {
+    'hora': ('fecha', 'hora', 'id'),
+    'dia': ('fecha', 'id_Bovino_id', 'id'),
+}
+
+
+def resumenes_en_rango(desde, hasta, resolucion, **filtros):
+    """QuerySet de resúmenes del rango con su bovino, del más reciente al más antiguo"""
+    orden = ('-fecha', '-hora') if resolucion == 'hora' else ('-fecha',)
+    resumenes = (
+        RESOLUCIONES[resolucion].objects
+        .filter(**filtros)
+        .select_related('id_Bovino')
+        .order_by(*orden, 'id_Bovino__nombre')
+    )
+    if desde:
+        resumenes = resumenes.filter(fecha__gte=desde)
+    if hasta:
+        resumenes = resumenes.filter(fecha__lte=hasta)
+    return resumenes
+
+
+def serie_resumida(desde, hasta, resolucion, **filtros):
+    """Resúmenes del rango serializados en orden cronológico, para gráficas"""
+    orden = ('fecha', 'hora') if resolucion == 'hora' else ('fecha',)
+    return [
+        serializar_resumen(resumen)
+        for resumen in resumenes_en_rango(desde, hasta, resolucion, **filtros).order_by(*orden)
+    ]
+
+
+def serializar_resumen(resumen):
+    datos = {
+        'fecha': resumen.fecha.strftime('%Y-%m-%d'),
+        'cantidad': resumen.cantidad,
+        'temperatura_min': resumen.temperatura_min,
+        'temperatura_max': resumen.temperatura_max,
+        'temperatura_promedio': resumen.temperatura_promedio,
+        'pulsaciones_min': resumen.pulsaciones_min,
+        'pulsaciones_max': resumen.pulsaciones_max,
+        'pulsaciones_promedio': resumen.pulsaciones_promedio,
+        'ultima_temperatura': resumen.ultima_temperatura,
+        'ultimas_pulsaciones': resumen.ultimas_pulsaciones,
+        'ultima_hora': resumen.ultima_hora.strftime('%H:%M:%S') if resumen.ultima_hora else None,
+    }
+    if isinstance(resumen, ResumenLecturaHora):
+        datos['hora'] = resumen.hora
+    return datos
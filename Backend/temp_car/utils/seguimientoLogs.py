@@ -0,0 +1,258 @@
+"""
+Seguimiento en vivo de un archivo de log (tail -F) para /logs/stream/<archivo>/
+
+El archivo se consulta cada LOGS_STREAM_INTERVALO segundos: primero se lee
+desde la última posición y, solo si no hay nada nuevo, se compara el inodo
+y el tamaño de la ruta con os.stat. Así cada consulta cuesta una lectura
+vacía y un stat, y se envían únicamente las líneas agregadas.
+
+Rotación: RotatingFileHandler renombra el archivo (el descriptor abierto
+sigue apuntando al respaldo); al llegar a su final se detecta el inodo nuevo
+en la ruta y se continúa desde el inicio del archivo nuevo sin perder
+líneas. Si el archivo se vacía (clear_log_file), se vuelve a leer desde 0.
+
+El id de cada evento es "<inodo>:<offset>"; al reconectar con Last-Event-ID
+se retoma desde ahí, aunque entretanto el archivo haya rotado.
+
+Eventos enviados:
+    conectado: al abrir el stream, con el archivo y los filtros
+    lineas:    lote de líneas nuevas que pasan los filtros
+    rotado:    la ruta pasó a ser un archivo nuevo (rotación o vaciado)
+"""
+
+import asyncio
+import os
+import time as pytime
+
+from django.conf import settings
+
+from .busquedaLogs import NIVELES, interpretar_linea
+from .lectorLogs import inicio_cola, listar_logs
+from .sse import comentario_sse, evento_sse
+
+REINTENTO_MS = 3000
+LINEAS_INICIALES_MAXIMO = 500
+# Bytes leídos como máximo por consulta; el resto se envía en la siguiente
+BYTES_POR_LECTURA = 256 * 1024
+LARGO_MAXIMO_LINEA = 4000
+
+
+def _leer_ultimo_evento(ultimo_evento):
+    """(inodo, offset) del Last-Event-ID, o None si no es válido"""
+    try:
+        inodo, offset = (ultimo_evento or '').split(':')
+        return int(inodo), int(offset)
+    except ValueError:
+        return None
+
+
+class SeguidorLog:
+    """Estado de un stream que sigue un archivo de log para un cliente"""
+
+    def __init__(self, ruta, nivel=None, contiene=None, lineas=0, ultimo_evento=None):
+        """
+        Args:
+            ruta: archivo de log a seguir
+            nivel: nivel mínimo de las líneas enviadas (DEBUG ... CRITICAL)
+            contiene: texto que deben contener las líneas (sin distinguir mayúsculas)
+            lineas: líneas ya escritas a enviar al conectar
+            ultimo_evento: Last-Event-ID del navegador al reconectar
+
+        Raises:
+            ValueError: si el nivel no es válido
+        """
+        if nivel and nivel.upper() not in NIVELES:
+            raise ValueError(f'nivel debe ser uno de: {", ".join(NIVELES)}')
+        self.ruta = ruta
+        self.nivel = NIVELES[nivel.upper()] if nivel else None
+        self.contiene = contiene.lower() if contiene else None
+        self.lineas_iniciales = max(0, min(int(lineas), LINEAS_INICIALES_MAXIMO))
+        self.ultimo_evento = _leer_ultimo_evento(ultimo_evento)
+        self.latido = settings.MONITOR_SSE_LATIDO
+        self.intervalo = settings.LOGS_STREAM_INTERVALO
+
+        self.archivo = None
+        self.inodo = None
+        self.modificado = None
+        self.tamano_visto = None
+        self.posicion = 0
+        self.pendiente = b''
+        self.contexto = {}
+
+    # ------------------------------------------------------------------
+    # Archivo
+    # ------------------------------------------------------------------
+
+    def _abrir(self, ruta, posicion):
+        archivo = open(ruta, 'rb')
+        estado = os.fstat(archivo.fileno())
+        posicion = min(posicion, estado.st_size)
+        archivo.seek(posicion)
+        self._cerrar()
+        self.archivo = archivo
+        self.inodo = estado.st_ino
+        self.modificado = estado.st_mtime_ns
+        self.tamano_visto = estado.st_size
+        self.posicion = posicion
+        self.pendiente = b''
+        self.contexto = {}
+
+    def _cerrar(self):
+        if self.archivo is not None:
+            self.archivo.close()
+            self.archivo = None
+
+    def _ruta_de_inodo(self, inodo):
+        """Archivo actual o rotado con ese inodo (para retomar tras una rotación)"""
+        for info in listar_logs(incluir_rotados=True).values():
+            try:
+                if os.stat(info['path']).st_ino == inodo:
+                    return info['path']
+            except OSError:
+                continue
+        return None
+
+    def preparar(self):
+        """Abre el archivo en la posición de retoma o al final (menos las líneas iniciales)"""
+        ruta, posicion = None, None
+        if self.ultimo_evento is not None:
+            inodo, offset = self.ultimo_evento
+            ruta = self._ruta_de_inodo(inodo)
+            posicion = offset
+        if ruta is None:
+            ruta = self.ruta
+            posicion = inicio_cola(ruta, self.lineas_iniciales)
+        self._abrir(ruta, posicion)
+        return evento_sse(
+            {
+                'archivo': os.path.basename(self.ruta),
+                'nivel': next((n for n, v in NIVELES.items() if v == self.nivel), None),
+                'contiene': self.contiene,
+            },
+            evento='conectado',
+            id_evento=self.id_evento,
+            reintento=REINTENTO_MS,
+        )
+
+    @property
+    def id_evento(self):
+        return f'{self.inodo}:{self.posicion}'
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def _pasa_filtros(self, texto):
+        datos, self.contexto = interpretar_linea(texto, self.contexto)
+        if self.nivel is not None and (datos.get('nivel') or 0) < self.nivel:
+            return False
+        if self.contiene is not None and self.contiene not in texto.lower():
+            return False
+        return True
+
+    def _procesar(self, datos, final=False):
+        """Líneas completas de `datos` que pasan los filtros; lo incompleto queda pendiente"""
+        datos = self.pendiente + datos
+        completas = datos.split(b'\n')
+        self.pendiente = b'' if final else completas.pop()
+        lineas = []
+        for linea in completas:
+            texto = linea.rstrip(b'\r').decode('utf-8', errors='replace')
+            if texto and self._pasa_filtros(texto):
+                lineas.append(texto[:LARGO_MAXIMO_LINEA])
+        return lineas
+
+    def leer_nuevas(self):
+        """
+        Eventos con lo agregado desde la última consulta
+
+        Returns:
+            lista de eventos SSE (vacía si no hay novedades)
+        """
+        eventos = []
+        lineas = []
+        while True:
+            datos = self.archivo.read(BYTES_POR_LECTURA)
+            if datos:
+                self.posicion += len(datos)
+                lineas += self._procesar(datos)
+                if len(datos) == BYTES_POR_LECTURA:
+                    break
+                continue
+
+            # Final del archivo abierto: ¿la ruta sigue siendo el mismo archivo?
+            try:
+                estado = os.stat(self.ruta)
+            except FileNotFoundError:
+                break
+            if estado.st_ino != self.inodo:
+                lineas += self._procesar(b'', final=True)
+                if lineas:
+                    eventos.append(self._evento_lineas(lineas))
+                    lineas = []
+                self._abrir(self.ruta, 0)
+                eventos.append(evento_sse({'motivo': 'rotacion'}, evento='rotado', id_evento=self.id_evento))
+                continue
+            # Vaciado: más chico que lo leído, o del mismo tamaño que ya tenía pero modificado
+            if estado.st_size < self.posicion or (
+                estado.st_size == self.posicion == self.tamano_visto and estado.st_mtime_ns != self.modificado
+            ):
+                self._abrir(self.ruta, 0)
+                eventos.append(evento_sse({'motivo': 'vaciado'}, evento='rotado', id_evento=self.id_evento))
+                continue
+            self.modificado = estado.st_mtime_ns
+            self.tamano_visto = estado.st_size
+            break
+
+        if lineas:
+            eventos.append(self._evento_lineas(lineas))
+        return eventos
+
+    def _evento_lineas(self, lineas):
+        # El offset del id no incluye la línea incompleta: al retomar se lee entera
+        return evento_sse(
+            {'lineas': lineas},
+            evento='lineas',
+            id_evento=f'{self.inodo}:{self.posicion - len(self.pendiente)}',
+        )
+
+    # ------------------------------------------------------------------
+    # Generadores
+    # ------------------------------------------------------------------
+
+    def iterar(self, duracion):
+        """Generador síncrono (WSGI); termina tras `duracion` segundos y el navegador reconecta"""
+        try:
+            yield self.preparar()
+            fin = pytime.monotonic() + duracion
+            proximo_latido = pytime.monotonic() + self.latido
+            while pytime.monotonic() < fin:
+                eventos = self.leer_nuevas()
+                if eventos:
+                    yield from eventos
+                    proximo_latido = pytime.monotonic() + self.latido
+                elif pytime.monotonic() >= proximo_latido:
+                    yield comentario_sse()
+                    proximo_latido = pytime.monotonic() + self.latido
+                pytime.sleep(self.intervalo)
+        finally:
+            self._cerrar()
+
+    async def iterar_async(self, duracion):
+        """Generador asíncrono (ASGI); entre consultas solo espera en el event loop"""
+        try:
+            yield self.preparar()
+            fin = pytime.monotonic() + duracion
+            proximo_latido = pytime.monotonic() + self.latido
+            while pytime.monotonic() < fin:
+                eventos = self.leer_nuevas()
+                if eventos:
+                    for evento in eventos:
+                        yield evento
+                    proximo_latido = pytime.monotonic() + self.latido
+                elif pytime.monotonic() >= proximo_latido:
+                    yield comentario_sse()
+                    proximo_latido = pytime.monotonic() + self.latido
+                await asyncio.sleep(self.intervalo)
+        finally:
+            self._cerrar()
@@ -0,0 +1,153 @@
+"""
+Series de temperatura y pulsaciones para gráficas de rangos largos (/monitor/serie/)
+
+Las lecturas del rango se leen con values_list (sin instanciar modelos), se
+pasan a arreglos de NumPy y cada serie se reduce a `puntos` con
+Largest-Triangle-Three-Buckets (LTTB): se conservan el primer y el último
+punto y, de cada cubeta intermedia, el que forma el triángulo de mayor área
+con el punto elegido antes y el promedio de la cubeta siguiente. La forma de
+la curva (picos de fiebre incluidos) se mantiene con muchos menos puntos.
+
+Los promedios de todas las cubetas se calculan de una vez con sumas
+acumuladas; solo la elección por cubeta recorre un bucle de `puntos` pasos.
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models.functions import Coalesce
+
+from temp_car.models import Lectura
+
+from .calendarioTurnos import hoy
+
+PUNTOS_MINIMOS = 3
+_EPOCA = date(1970, 1, 1).toordinal()
+
+
+def leer_parametros_serie(params):
+    """
+    desde/hasta (YYYY-MM-DD) y puntos de los parámetros GET
+
+    Sin rango se usan los últimos SERIE_DIAS_POR_DEFECTO días; sin puntos,
+    SERIE_PUNTOS_POR_DEFECTO.
+
+    Returns:
+        (desde, hasta, puntos)
+
+    Raises:
+        ValueError: si las fechas o los puntos no son válidos
+    """
+    hasta = params.get('hasta')
+    hasta = datetime.strptime(hasta, '%Y-%m-%d').date() if hasta else hoy()
+    desde = params.get('desde')
+    desde = (
+        datetime.strptime(desde, '%Y-%m-%d').date() if desde
+        else hasta - timedelta(days=settings.SERIE_DIAS_POR_DEFECTO)
+    )
+    if desde > hasta:
+        raise ValueError('desde no puede ser posterior a hasta')
+
+    puntos = int(params.get('puntos') or settings.SERIE_PUNTOS_POR_DEFECTO)
+    if not PUNTOS_MINIMOS <= puntos <= settings.SERIE_PUNTOS_MAXIMO:
+        raise ValueError(f'puntos debe estar entre {PUNTOS_MINIMOS} y {settings.SERIE_PUNTOS_MAXIMO}')
+    return desde, hasta, puntos
+
+
+def lttb(x, y, puntos):
+    """
+    Índices de los puntos elegidos por Largest-Triangle-Three-Buckets
+
+    Args:
+        x: arreglo creciente (segundos)
+        y: valores, del mismo largo que x
+        puntos: cantidad de puntos a conservar
+
+    Returns:
+        np.ndarray de índices en orden creciente
+    """
+    total = len(x)
+    if puntos >= total or puntos < PUNTOS_MINIMOS:
+        return np.arange(total)
+
+    # Cubetas [inicios[i], fines[i]) entre el primer y el último punto
+    tamano = (total - 2) / (puntos - 2)
+    bordes = (np.arange(puntos - 1) * tamano).astype(np.int64) + 1
+    bordes[-1] = total - 1
+    inicios, fines = bordes[:-1], bordes[1:]
+
+    # Promedio de la cubeta siguiente a cada una (la última usa el punto final)
+    suma_x = np.concatenate(([0.0], np.cumsum(x)))
+    suma_y = np.concatenate(([0.0], np.cumsum(y)))
+    siguientes_inicio = np.append(fines[:-1], total - 1)
+    siguientes_fin = np.append(fines[1:], total)
+    cantidad = siguientes_fin - siguientes_inicio
+    promedio_x = (suma_x[siguientes_fin] - suma_x[siguientes_inicio]) / cantidad
+    promedio_y = (suma_y[siguientes_fin] - suma_y[siguientes_inicio]) / cantidad
+
+    elegidos = np.empty(puntos, dtype=np.int64)
+    elegidos[0] = anterior = 0
+    for cubeta, (inicio, fin) in enumerate(zip(inicios, fines)):
+        # Doble del área del triángulo (anterior, candidato, promedio siguiente)
+        areas = np.abs(
+            (x[anterior] - promedio_x[cubeta]) * (y[inicio:fin] - y[anterior])
+            - (x[anterior] - x[inicio:fin]) * (promedio_y[cubeta] - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        elegidos[cubeta + 1] = anterior
+    elegidos[-1] = total - 1
+    return elegidos
+
+
+def _serie(segundos, valores, puntos):
+    validos = ~np.isnan(valores)
+    segundos, valores = segundos[validos], valores[validos]
+    elegidos = lttb(segundos, valores, puntos)
+    tiempos = np.datetime_as_string(segundos[elegidos].astype('datetime64[s]'))
+    return {
+        'tiempos': tiempos.tolist(),
+        'valores': np.round(valores[elegidos], 2).tolist(),
+        'total': int(len(valores)),
+    }
+
+
+def serie_collar(bovino, desde, hasta, puntos):
+    """
+    Series de temperatura y pulsaciones del bovino en [desde, hasta] reducidas a `puntos`
+
+    Returns:
+        dict con 'temperatura' y 'pulsaciones' ({tiempos, valores, total}) y
+        'total_lecturas'
+    """
+    filas = (
+        Lectura.objects
+        .filter(id_Bovino=bovino, fecha_lectura__gte=desde, fecha_lectura__lte=hasta)
+        # Mismo orden que el índice (id_Bovino, fecha_lectura, hora_lectura): sin ordenar en memoria
+        .order_by('fecha_lectura', 'hora_lectura')
+        .values_list(
+            'fecha_lectura',
+            'hora_lectura',
+            Coalesce('temperatura', 'id_Temperatura__valor'),
+            Coalesce('pulsaciones', 'id_Pulsaciones__valor'),
+        )
+    )
+    columnas = list(zip(*filas.iterator(chunk_size=5000)))
+    if not columnas:
+        vacia = {'tiempos': [], 'valores': [], 'total': 0}
+        return {'temperatura': vacia, 'pulsaciones': dict(vacia), 'total_lecturas': 0}
+
+    fechas, horas, temperaturas, pulsaciones = columnas
+    # Segundos desde 1970 (toordinal es mucho más rápido que convertir date a datetime64)
+    segundos = (
+        (np.fromiter((fecha.toordinal() for fecha in fechas), dtype=np.int64, count=len(fechas)) - _EPOCA) * 86400
+        + np.fromiter(
+            (hora.hour * 3600 + hora.minute * 60 + hora.second for hora in horas),
+            dtype=np.int64, count=len(horas),
+        )
+    ).astype(np.float64)
+    return {
+        'temperatura': _serie(segundos, np.array(temperaturas, dtype=np.float64), puntos),
+        'pulsaciones': _serie(segundos, np.array(pulsaciones, dtype=np.float64), puntos),
+        'total_lecturas': len(fechas),
+    }
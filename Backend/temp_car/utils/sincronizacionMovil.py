@@ -0,0 +1,207 @@
+"""
+Sincronización por lotes de los controles registrados sin conexión en la app
+
+La app guarda en cola cada control con un UUID propio y, al recuperar la
+señal, envía la ronda completa a /api/movil/sync/. El lote se valida con
+pocas consultas (lecturas, UUID ya aplicados y lecturas ya controladas
+por clave) y se guarda con bulk_create en una transacción:
+- el UUID queda en ControlMonitoreo.uuid_cliente (único): un reintento del
+  mismo lote no duplica controles, devuelve los ya creados
+- cada control nuevo dispara post_save como si se hubiera creado con
+  save(), así las señales mantienen la tabla de turnos completados, la
+  caché del hato y el canal de monitoreo en vivo
+
+Estados por ítem (campo "estado" del resultado):
+    creado:     control guardado en esta petición
+    duplicado:  el UUID ya estaba aplicado (control_id del existente)
+    rechazado:  no se guardó; "error" indica el motivo
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models.signals import post_save
+
+from temp_car.models import ControlMonitoreo, Lectura
+
+from .calendarioTurnos import hoy, turno_de_hora
+from .cambiosMovil import cursor_actual
+
+LARGO_MAXIMO_OBSERVACIONES = 2000
+
+# Motivos de rechazo
+ERROR_FORMATO = 'formato_invalido'
+ERROR_LECTURA = 'lectura_no_encontrada'
+ERROR_COLLAR = 'collar_no_coincide'
+ERROR_ANTIGUA = 'lectura_antigua'
+ERROR_REGISTRADA = 'lectura_ya_controlada'
+
+
+class LoteInvalido(ValueError):
+    """Cuerpo de sincronización que no es una lista de controles válida"""
+
+
+def _leer_item(item):
+    """(uuid, lectura_id, collar_id, observaciones, accion_tomada) o None si el formato no es válido"""
+    if not isinstance(item, dict):
+        return None
+    try:
+        uuid_cliente = uuid.UUID(str(item['uuid']))
+        lectura_id = int(item['lectura_id'])
+        collar_id = int(item['collar_id']) if item.get('collar_id') is not None else None
+    except (KeyError, TypeError, ValueError):
+        return None
+    observaciones = str(item.get('observaciones') or '')[:LARGO_MAXIMO_OBSERVACIONES]
+    accion_tomada = str(item.get('accion_tomada') or '')[:200] or None
+    return uuid_cliente, lectura_id, collar_id, observaciones, accion_tomada
+
+
+def _resultado(uuid_cliente, estado, control_id=None, error=None):
+    resultado = {'uuid': uuid_cliente, 'estado': estado}
+    if control_id is not None:
+        resultado['control_id'] = control_id
+    if error is not None:
+        resultado['error'] = error
+    return resultado
+
+
+def sincronizar_controles(items, usuario):
+    """
+    Aplica un lote de controles de la app de forma idempotente
+
+    Args:
+        items: lista de dicts {uuid, lectura_id, collar_id?, observaciones?, accion_tomada?}
+        usuario: User que registra los controles
+
+    Returns:
+        dict con 'resultados' (uno por ítem, en el mismo orden), los totales y 'cursor'
+
+    Raises:
+        LoteInvalido: si items no es una lista o supera API_MOVIL_SYNC_MAXIMO
+    """
+    if not isinstance(items, list):
+        raise LoteInvalido('controles debe ser una lista')
+    if len(items) > settings.API_MOVIL_SYNC_MAXIMO:
+        raise LoteInvalido(f'Se aceptan como máximo {settings.API_MOVIL_SYNC_MAXIMO} controles por petición')
+
+    resultados = [None] * len(items)
+    leidos = {}
+    for indice, item in enumerate(items):
+        datos = _leer_item(item)
+        if datos is None:
+            uuid_recibido = item.get('uuid') if isinstance(item, dict) else None
+            resultados[indice] = _resultado(str(uuid_recibido) if uuid_recibido else None, 'rechazado', error=ERROR_FORMATO)
+        else:
+            leidos[indice] = datos
+
+    # Validación del lote completo: tres consultas por clave
+    uuids = {datos[0] for datos in leidos.values()}
+    aplicados = dict(
+        ControlMonitoreo.objects.filter(uuid_cliente__in=uuids).values_list('uuid_cliente', 'id_Control')
+    )
+    lecturas = Lectura.objects.select_related('id_Bovino').in_bulk({datos[1] for datos in leidos.values()})
+    # Sin filtrar por turno: los controles guardados en línea antes de fijar el
+    # turno por la hora de la lectura quedaron como 'morning'
+    controladas = set(
+        ControlMonitoreo.objects.filter(id_Lectura_id__in=list(lecturas)).values_list('id_Lectura_id', flat=True)
+    )
+    fecha_minima = hoy() - timedelta(days=settings.API_MOVIL_SYNC_DIAS)
+
+    nuevos = {}
+    for indice, (uuid_cliente, lectura_id, collar_id, observaciones, accion_tomada) in leidos.items():
+        texto_uuid = str(uuid_cliente)
+        if uuid_cliente in aplicados:
+            resultados[indice] = _resultado(texto_uuid, 'duplicado', control_id=aplicados[uuid_cliente])
+            continue
+        if uuid_cliente in nuevos:
+            continue  # Repetido dentro del mismo lote: se resuelve al guardar el primero
+        lectura = lecturas.get(lectura_id)
+        if lectura is None:
+            resultados[indice] = _resultado(texto_uuid, 'rechazado', error=ERROR_LECTURA)
+            continue
+        if collar_id is not None and lectura.id_Bovino.idCollar != collar_id:
+            resultados[indice] = _resultado(texto_uuid, 'rechazado', error=ERROR_COLLAR)
+            continue
+        if lectura.fecha_lectura < fecha_minima:
+            resultados[indice] = _resultado(texto_uuid, 'rechazado', error=ERROR_ANTIGUA)
+            continue
+        if lectura_id in controladas:
+            resultados[indice] = _resultado(texto_uuid, 'rechazado', error=ERROR_REGISTRADA)
+            continue
+        controladas.add(lectura_id)
+        nuevos[uuid_cliente] = ControlMonitoreo(
+            id_Lectura=lectura,
+            id_User=usuario,
+            fecha_lectura=lectura.fecha_lectura,
+            hora_lectura=lectura.hora_lectura,
+            turno=turno_de_hora(lectura.hora_lectura),
+            observaciones=observaciones,
+            accion_tomada=accion_tomada,
+            uuid_cliente=uuid_cliente,
+        )
+
+    creados = _guardar(list(nuevos.values()))
+
+    # Resultados de lo guardado (y de los UUID repetidos dentro del lote)
+    guardados = {control.uuid_cliente: control.id_Control for control in creados}
+    pendientes = [uuid_cliente for uuid_cliente in nuevos if uuid_cliente not in guardados]
+    if pendientes:
+        # Aplicados a la vez por otra petición (un reintento concurrente)
+        aplicados.update(
+            ControlMonitoreo.objects.filter(uuid_cliente__in=pendientes).values_list('uuid_cliente', 'id_Control')
+        )
+    vistos = set()
+    for indice, datos in leidos.items():
+        uuid_cliente = datos[0]
+        if resultados[indice] is not None:
+            continue
+        texto_uuid = str(uuid_cliente)
+        if uuid_cliente in guardados and uuid_cliente not in vistos:
+            resultados[indice] = _resultado(texto_uuid, 'creado', control_id=guardados[uuid_cliente])
+        elif uuid_cliente in guardados or uuid_cliente in aplicados:
+            resultados[indice] = _resultado(
+                texto_uuid, 'duplicado', control_id=guardados.get(uuid_cliente) or aplicados[uuid_cliente]
+            )
+        else:
+            resultados[indice] = _resultado(texto_uuid, 'rechazado', error=ERROR_REGISTRADA)
+        vistos.add(uuid_cliente)
+
+    totales = {'creados': 0, 'duplicados': 0, 'rechazados': 0}
+    for resultado in resultados:
+        totales[{'creado': 'creados', 'duplicado': 'duplicados', 'rechazado': 'rechazados'}[resultado['estado']]] += 1
+
+    return {'resultados': resultados, **totales, 'cursor': cursor_actual()}
+
+
+def _guardar(controles):
+    """
+    Guarda los controles con bulk_create y emite post_save por cada uno
+
+    Si el lote choca con una restricción única (otra petición guardó el
+    mismo UUID o la misma lectura a la vez), se guardan uno por uno y se
+    omiten los que chocan.
+    """
+    if not controles:
+        return []
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                creados = ControlMonitoreo.objects.bulk_create(controles)
+        except IntegrityError:
+            creados = []
+            for control in controles:
+                try:
+                    with transaction.atomic():
+                        creados += ControlMonitoreo.objects.bulk_create([control])
+                except IntegrityError:
+                    control.pk = None
+                    continue
+
+        for control in creados:
+            post_save.send(
+                sender=ControlMonitoreo, instance=control, created=True,
+                update_fields=None, raw=False, using=DEFAULT_DB_ALIAS,
+            )
+    return creados
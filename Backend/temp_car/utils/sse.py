@@ -0,0 +1,50 @@
+"""
+Utilidades para respuestas Server-Sent Events (text/event-stream)
+"""
+
+import json
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+
+def evento_sse(datos, evento=None, id_evento=None, reintento=None):
+    """
+    Formatea un evento SSE
+
+    Args:
+        datos: str ya serializado o cualquier objeto serializable a JSON
+        evento: nombre del evento (campo event:)
+        id_evento: id que el navegador reenvía en Last-Event-ID al reconectar
+        reintento: milisegundos que espera el navegador antes de reconectar
+    """
+    if not isinstance(datos, str):
+        datos = json.dumps(datos, ensure_ascii=False)
+
+    lineas = []
+    if reintento is not None:
+        lineas.append(f'retry: {int(reintento)}')
+    if id_evento is not None:
+        lineas.append(f'id: {id_evento}')
+    if evento:
+        lineas.append(f'event: {evento}')
+    lineas.extend(f'data: {linea}' for linea in datos.split('\n'))
+    return '\n'.join(lineas) + '\n\n'
+
+
+def comentario_sse(texto='ping'):
+    """Comentario SSE, usado como latido para mantener viva la conexión"""
+    return f': {texto}\n\n'
+
+
+def es_asgi(request):
+    """Indica si la petición se sirve bajo ASGI (permite generadores asíncronos)"""
+    return isinstance(request, ASGIRequest)
+
+
+def respuesta_sse(flujo):
+    """Envuelve un generador (síncrono o asíncrono) de eventos en una respuesta SSE"""
+    response = StreamingHttpResponse(flujo, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Desactiva el buffering de nginx
+    return response
@@ -0,0 +1,60 @@
+"""
+Respuestas en streaming que no cargan el contenido completo en memoria
+
+Bajo ASGI Django consume los iteradores síncronos con list() antes de
+enviarlos; para mantener la memoria constante el generador se recorre de a
+un bloque por vez en el hilo de sync_to_async (siempre el mismo hilo, así un
+cursor de base de datos abierto sigue siendo válido entre bloques).
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+
+from .sse import es_asgi
+
+TAMANO_BLOQUE_ARCHIVO = 64 * 1024
+
+_FIN = object()
+
+
+async def iterar_async(generador):
+    """Adapta un generador síncrono a uno asíncrono sin materializarlo"""
+    siguiente = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            parte = await siguiente(generador, _FIN)
+            if parte is _FIN:
+                return
+            yield parte
+    finally:
+        await sync_to_async(generador.close, thread_sensitive=True)()
+
+
+def leer_archivo(archivo, tamano_bloque=TAMANO_BLOQUE_ARCHIVO):
+    """Generador de bloques de un archivo abierto; lo cierra al terminar"""
+    try:
+        while True:
+            bloque = archivo.read(tamano_bloque)
+            if not bloque:
+                return
+            yield bloque
+    finally:
+        archivo.close()
+
+
+def respuesta_streaming(request, generador, content_type, nombre_archivo=None):
+    """
+    StreamingHttpResponse sobre un generador síncrono, asíncrono bajo ASGI
+
+    Args:
+        request: HttpRequest (define si se sirve por WSGI o ASGI)
+        generador: generador síncrono de str o bytes
+        content_type: tipo MIME de la respuesta
+        nombre_archivo: si se indica, se descarga como adjunto con ese nombre
+    """
+    flujo = iterar_async(generador) if es_asgi(request) else generador
+    response = StreamingHttpResponse(flujo, content_type=content_type)
+    if nombre_archivo:
+        response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
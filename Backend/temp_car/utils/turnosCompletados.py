@@ -0,0 +1,166 @@
+"""
+Tabla materializada de turnos completados (TurnoCompletado)
+
+Una fila por (bovino, fecha, turno) con al menos un ControlMonitoreo en el
+rango del turno según el calendario (utils/calendarioTurnos.py). Las señales
+de ControlMonitoreo recalculan la fila afectada dentro de la misma
+transacción al crear, editar o borrar un control, de modo que:
+- saber si un bovino ya tiene control en el turno es una lectura por clave
+- la lista de bovinos pendientes del hato es una sola consulta indexada
+  por (fecha, turno)
+
+reconstruir_turnos rehace la tabla desde los controles (migración y comando
+recalcular_turnos), por ejemplo tras cambios hechos con queryset.update().
+"""
+
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+
+from temp_car.models import Bovinos, ControlMonitoreo, Lectura, TurnoCompletado
+
+from .calendarioTurnos import filtro_turno, turno_de_hora
+
+
+def clave_control(control):
+    """
+    (id_Bovino, fecha, turno) del control, o None si no tiene lectura
+
+    Usa la lectura ya cargada si la hay; si no, solo consulta su id_Bovino
+    """
+    if control.id_Lectura_id is None or control.fecha_lectura is None or control.hora_lectura is None:
+        return None
+    lectura = ControlMonitoreo.id_Lectura.field.get_cached_value(control, None)
+    if lectura is not None and lectura.pk == control.id_Lectura_id:
+        bovino_id = lectura.id_Bovino_id
+    else:
+        bovino_id = (
+            Lectura.objects.filter(pk=control.id_Lectura_id)
+            .values_list('id_Bovino_id', flat=True)
+            .first()
+        )
+        if bovino_id is None:
+            return None
+    return (bovino_id, control.fecha_lectura, turno_de_hora(control.hora_lectura))
+
+
+def recalcular_turno(bovino_id, fecha, turno):
+    """
+    Actualiza la fila de (bovino, fecha, turno) desde sus controles; la borra si no quedan
+
+    Returns:
+        TurnoCompletado o None
+    """
+    controles = ControlMonitoreo.objects.filter(
+        filtro_turno(turno),
+        fecha_lectura=fecha,
+        id_Lectura__id_Bovino_id=bovino_id,
+    )
+    ultimo = controles.order_by('-hora_lectura', '-pk').values_list('pk', 'hora_lectura').first()
+    if ultimo is None:
+        TurnoCompletado.objects.filter(id_Bovino_id=bovino_id, fecha=fecha, turno=turno).delete()
+        return None
+
+    valores = {
+        'controles': controles.count(),
+        'ultimo_control_id': ultimo[0],
+        'ultima_hora': ultimo[1],
+    }
+    # Dos controles simultáneos pueden crear la misma fila: el segundo reintenta actualizando
+    for intento in range(2):
+        try:
+            with transaction.atomic():
+                turno_completado, _ = TurnoCompletado.objects.update_or_create(
+                    id_Bovino_id=bovino_id, fecha=fecha, turno=turno, defaults=valores
+                )
+            return turno_completado
+        except IntegrityError:
+            if intento:
+                raise
+
+
+def turno_completado(bovino, turno):
+    """TurnoCompletado del bovino en el Turno del calendario, o None"""
+    return TurnoCompletado.objects.filter(id_Bovino=bovino, fecha=turno.fecha, turno=turno.clave).first()
+
+
+def pendientes_turno(turno):
+    """
+    Bovinos activos sin control en el Turno, ordenados por idCollar
+
+    Returns:
+        QuerySet de dicts con idCollar y nombre (una sola consulta)
+    """
+    completados = TurnoCompletado.objects.filter(fecha=turno.fecha, turno=turno.clave).values('id_Bovino_id')
+    return (
+        Bovinos.objects
+        .filter(activo=True)
+        .exclude(pk__in=completados)
+        .order_by('idCollar')
+        .values('idCollar', 'nombre')
+    )
+
+
+def reconstruir_turnos(ControlMonitoreo, TurnoCompletado, desde=None, hasta=None, tamano_lote=1000, progreso=None):
+    """
+    Rehace TurnoCompletado desde los controles, día por día (idempotente)
+
+    Recibe las clases de modelo como parámetros para poder usarse tanto desde
+    una migración (modelos históricos) como desde un comando de gestión.
+
+    Args:
+        desde, hasta: fechas límite (inclusive), None para no acotar
+        progreso: callable(fecha, turnos) opcional
+
+    Returns:
+        int: días reconstruidos
+    """
+    controles = ControlMonitoreo.objects.filter(id_Lectura__isnull=False)
+    turnos = TurnoCompletado.objects.all()
+    if desde:
+        controles = controles.filter(fecha_lectura__gte=desde)
+        turnos = turnos.filter(fecha__gte=desde)
+    if hasta:
+        controles = controles.filter(fecha_lectura__lte=hasta)
+        turnos = turnos.filter(fecha__lte=hasta)
+
+    fechas = set(controles.values_list('fecha_lectura', flat=True).distinct())
+    fechas.update(turnos.values_list('fecha', flat=True).distinct())
+
+    total = 0
+    for fecha in sorted(fechas):
+        acumulados = defaultdict(lambda: [0, None, None])
+        filas = (
+            controles
+            .filter(fecha_lectura=fecha)
+            .order_by('hora_lectura', 'pk')
+            .values_list('id_Lectura__id_Bovino_id', 'hora_lectura', 'pk')
+        )
+        for bovino_id, hora, control_id in filas.iterator(chunk_size=5000):
+            acumulado = acumulados[(bovino_id, turno_de_hora(hora))]
+            acumulado[0] += 1
+            acumulado[1] = control_id
+            acumulado[2] = hora
+
+        with transaction.atomic():
+            turnos.filter(fecha=fecha).delete()
+            TurnoCompletado.objects.bulk_create(
+                [
+                    TurnoCompletado(
+                        id_Bovino_id=bovino_id,
+                        fecha=fecha,
+                        turno=turno,
+                        controles=cantidad,
+                        ultimo_control_id=control_id,
+                        ultima_hora=hora,
+                    )
+                    for (bovino_id, turno), (cantidad, control_id, hora) in acumulados.items()
+                ],
+                batch_size=tamano_lote,
+            )
+
+        total += 1
+        if progreso:
+            progreso(fecha, len(acumulados))
+
+    return total
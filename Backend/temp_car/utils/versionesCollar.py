@@ -0,0 +1,166 @@
+"""
+Versiones por collar en memoria para GET condicionales (ETag / If-None-Match)
+
+Las vistas de un collar que el dashboard y la app consultan sin parar
+(ultimoRegistro, dashBoardData, obtener_datos_collar y
+verificar_lectura_turno) solo cambian cuando llega una lectura o se escribe
+un control. Cada collar tiene un número de versión que se incrementa al
+confirmar esas escrituras; el ETag combina la versión con la época del
+proceso y lo que varía por petición (turno actual, parámetros). Si el
+cliente envía el mismo ETag en If-None-Match se responde 304 sin tocar la
+base de datos.
+
+Como cada worker tiene sus propias versiones:
+- la época cambia en cada proceso, así un ETag de otro worker nunca coincide
+- cada VERSIONES_COLLAR_SINCRONIZACION segundos se leen las lecturas nuevas
+  y el diario CambioRegistro escritos por otros procesos y se incrementan
+  los collares afectados (dos consultas de topes y dos de rango)
+- las marcas solo avanzan hasta las filas asentadas (topes_asentados de
+  utils/cambiosMovil.py): las de los últimos API_MOVIL_CAMBIOS_MARGEN
+  segundos se vuelven a leer en cada sincronización, así una transacción
+  que confirma fuera de orden no se salta
+"""
+
+import itertools
+import logging
+import threading
+import time as pytime
+import uuid
+import zlib
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+
+from temp_car.models import CambioRegistro, Lectura
+
+from .cambiosMovil import topes_asentados
+
+logger = logging.getLogger('temp_car')
+
+
+class VersionesCollar:
+    """Número de versión por idCollar; 0 para los collares sin cambios en este proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._epoca = uuid.uuid4().hex[:8]
+        self._contador = itertools.count(1)
+        self._versiones = {}
+        self._marca_lectura = None
+        self._marca_cambio = None
+        # Ids ya contados por encima de las marcas (filas aún sin asentar)
+        self._lecturas_vistas = set()
+        self._cambios_vistos = set()
+        self._sincronizada_en = 0.0
+
+    def incrementar(self, *collares):
+        with self._lock:
+            for collar_id in collares:
+                if collar_id is not None:
+                    self._versiones[collar_id] = next(self._contador)
+
+    def reiniciar(self):
+        """Invalida todos los ETag emitidos por este proceso"""
+        with self._lock:
+            self._epoca = uuid.uuid4().hex[:8]
+            self._versiones.clear()
+
+    def version(self, collar_id):
+        return self._versiones.get(collar_id, 0)
+
+    def sincronizar(self):
+        """Incrementa los collares escritos por otros procesos desde la última sincronización"""
+        ahora = pytime.monotonic()
+        if ahora - self._sincronizada_en < settings.VERSIONES_COLLAR_SINCRONIZACION:
+            return
+        self._sincronizada_en = ahora
+
+        marca_lectura, marca_cambio = topes_asentados()
+        if self._marca_lectura is None:
+            # Primera vez: la época nueva ya invalida los ETag de antes del arranque
+            self._marca_lectura, self._marca_cambio = marca_lectura, marca_cambio
+            return
+
+        lecturas = list(
+            Lectura.objects
+            .filter(id_Lectura__gt=self._marca_lectura)
+            .values_list('id_Lectura', 'id_Bovino__idCollar')
+        )
+        cambios = list(
+            CambioRegistro.objects
+            .filter(id__gt=self._marca_cambio)
+            .values_list('id', 'collar_id')
+        )
+        collares = {collar for pk, collar in lecturas if pk not in self._lecturas_vistas}
+        collares.update(collar for pk, collar in cambios if pk not in self._cambios_vistos)
+
+        self._marca_lectura = max(self._marca_lectura, marca_lectura)
+        self._marca_cambio = max(self._marca_cambio, marca_cambio)
+        self._lecturas_vistas = {pk for pk, _ in lecturas if pk > self._marca_lectura}
+        self._cambios_vistos = {pk for pk, _ in cambios if pk > self._marca_cambio}
+        if collares:
+            self.incrementar(*collares)
+
+    def etag(self, collar_id, *variante):
+        """ETag débil con la época, la versión del collar y un resumen de la variante"""
+        resumen = zlib.crc32('|'.join(str(parte) for parte in variante).encode())
+        return f'W/"{self._epoca}.{self.version(collar_id)}.{resumen:08x}"'
+
+
+versiones_collar = VersionesCollar()
+
+
+def _coincide(etag, if_none_match):
+    # Comparación débil (RFC 9110 13.1.2): se ignora el prefijo W/
+    etiquetas = parse_etags(if_none_match)
+    return '*' in etiquetas or etag.removeprefix('W/') in {e.removeprefix('W/') for e in etiquetas}
+
+
+def condicional_por_collar(variante=None):
+    """
+    Decorador de vistas GET de un collar (kwarg collar_id o id_collar)
+
+    Calcula el ETag antes de ejecutar la vista: si coincide con If-None-Match
+    responde 304; si no, agrega el ETag a las respuestas 200. Como el ETag se
+    toma antes de leer, una escritura concurrente en este mismo worker solo
+    puede provocar un 200 de más. Una escritura hecha en otro worker se nota
+    en la siguiente sincronización: durante hasta VERSIONES_COLLAR_SINCRONIZACION
+    segundos este worker puede responder 304 con datos viejos. Si su
+    transacción tarda en confirmar más de API_MOVIL_CAMBIOS_MARGEN segundos,
+    el 304 viejo puede seguir hasta la siguiente escritura del collar.
+
+    Args:
+        variante: función opcional request -> tupla con lo que además de la
+                  versión del collar cambia la respuesta (turno, parámetros)
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            collar_id = kwargs.get('collar_id', kwargs.get('id_collar'))
+            if request.method not in ('GET', 'HEAD') or collar_id is None:
+                return vista(request, *args, **kwargs)
+
+            try:
+                versiones_collar.sincronizar()
+            except Exception as e:
+                logger.warning(f"VERSIONES COLLAR | No se pudo sincronizar: {str(e)}")
+                return vista(request, *args, **kwargs)
+
+            etag = versiones_collar.etag(
+                collar_id, vista.__name__, *(variante(request) if variante else ())
+            )
+            if_none_match = request.headers.get('If-None-Match')
+            if if_none_match and _coincide(etag, if_none_match):
+                respuesta = HttpResponseNotModified()
+            else:
+                respuesta = vista(request, *args, **kwargs)
+                if respuesta.status_code != 200:
+                    return respuesta
+            respuesta['ETag'] = etag
+            # El navegador guarda la respuesta pero la revalida en cada consulta
+            respuesta['Cache-Control'] = 'private, no-cache'
+            return respuesta
+        return envoltura
+    return decorador